@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from coefficienti import copertura_mesi
+from dati_comuni import NOMI_MESI
+
+# Finestra (giorni, centrata) della mediana mobile delle colazioni giornaliere
+FINESTRA_GIORNI = 7
+
+# Soglia sullo scarto robusto |0.6745 × (x - mediana) / MAD| oltre cui un valore è anomalo
+SOGLIA_MAD = 3.5
+
+# Mesi con colazioni, oltre a quello controllato, necessari per confrontarne il costo
+MESI_CONFRONTO_MINIMI = 3
+
+# Quota minima dei giorni di servizio del mese con colazioni registrate (vedi coefficienti.copertura_mesi)
+COPERTURA_MINIMA = 0.75
+
+# Rapporto massimo tra coefficiente del mese e mediana dell'articolo sugli altri mesi
+SOGLIA_SALTO_COEFFICIENTE = 3.0
+
+# Costante che rende la MAD confrontabile con la deviazione standard di una normale
+FATTORE_MAD = 0.6745
+
+
+def scarto_robusto(valori, mediana, mad):
+    """Scarto dalla mediana in unità di MAD (0 dove la MAD è nulla e il valore coincide)"""
+    differenza = valori - mediana
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scarto = FATTORE_MAD * differenza / mad
+        return np.where(mad > 0, scarto, np.where(differenza == 0, 0.0, np.sign(differenza) * np.inf))
+
+
+def mediana_mobile(valori, finestra=FINESTRA_GIORNI):
+    """Mediana e MAD mobili centrate, calcolate su tutte le finestre in un'unica operazione.
+
+    Ai bordi la finestra è troncata (i valori mancanti sono ignorati), così
+    anche i primi e gli ultimi giorni hanno una stima.
+    """
+    valori = np.asarray(valori, dtype=float)
+    meta = finestra // 2
+    estesi = np.pad(valori, (meta, finestra - 1 - meta), constant_values=np.nan)
+    finestre = sliding_window_view(estesi, finestra)
+    mediana = np.nanmedian(finestre, axis=1)
+    mad = np.nanmedian(np.abs(finestre - mediana[:, None]), axis=1)
+    return mediana, mad
+
+
+def anomalie_giornaliere(df_colazioni, finestra=FINESTRA_GIORNI, soglia=SOGLIA_MAD):
+    """Giorni con colazioni servite lontane dalla mediana mobile dei giorni vicini"""
+    colazioni = df_colazioni.sort_values('data')
+    presenze = colazioni['CONSUMO REALE COLAZIONI'].to_numpy(dtype=float, na_value=np.nan)
+    mediana, mad = mediana_mobile(presenze, finestra)
+    scarto = scarto_robusto(presenze, mediana, mad)
+    return pd.DataFrame({
+        'data': colazioni['data'].to_numpy(),
+        'mese': colazioni['mese'].to_numpy(),
+        'Colazioni': presenze,
+        'Mediana Mobile': mediana,
+        'Scarto Robusto': scarto,
+        'Anomalo': np.abs(scarto) > soglia
+    }, index=colazioni.index)
+
+
+def anomalie_mensili(df_riepilogo, df_colazioni, soglia=SOGLIA_MAD, copertura_minima=COPERTURA_MINIMA):
+    """Controlli sul riepilogo mensile (vedi calcolo_costi_reali.calcola_riepilogo_mensile).
+
+    Un mese è sospetto se il costo per colazione si discosta dalla mediana
+    degli altri mesi oltre `soglia` MAD (mediana e MAD escludono il mese
+    controllato e servono almeno MESI_CONFRONTO_MINIMI altri mesi con
+    colazioni), oppure se i giorni con colazioni
+    registrate coprono meno di `copertura_minima` dei giorni di servizio del
+    mese, con la stessa definizione di copertura usata per normalizzare i
+    coefficienti (coefficienti.copertura_mesi).
+    """
+    riepilogo = df_riepilogo.copy()
+    riepilogo['numero'] = riepilogo['Mese'].str.split('_').str[0].astype(int)
+    riepilogo = riepilogo.sort_values('numero').reset_index(drop=True)
+    nomi = [NOMI_MESI.get(n, codice.split('_')[-1]) for n, codice in zip(riepilogo['numero'], riepilogo['Mese'])]
+
+    costo = riepilogo['Costo Medio per Colazione'].to_numpy(dtype=float)
+    con_colazioni = riepilogo['Numero Colazioni'].to_numpy() > 0
+    # Riga i: costo degli altri mesi con colazioni, NaN per il mese i stesso
+    altri = np.where(con_colazioni & ~np.eye(len(costo), dtype=bool), costo, np.nan)
+    confrontabili = con_colazioni & (np.sum(~np.isnan(altri), axis=1) >= MESI_CONFRONTO_MINIMI)
+    mediana = np.full(len(costo), np.nan)
+    mad = np.full(len(costo), np.nan)
+    mediana[confrontabili] = np.nanmedian(altri[confrontabili], axis=1)
+    mad[confrontabili] = np.nanmedian(np.abs(altri[confrontabili] - mediana[confrontabili, None]), axis=1)
+    scarto = np.zeros(len(costo))
+    scarto[confrontabili] = scarto_robusto(costo[confrontabili], mediana[confrontabili], mad[confrontabili])
+    copertura = copertura_mesi(df_colazioni, nomi)['Copertura'].to_numpy()
+
+    precedente = np.concatenate([[np.nan], costo[:-1]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variazione = np.where(con_colazioni & (precedente > 0), (costo / precedente - 1) * 100, np.nan)
+
+    costo_anomalo = np.abs(scarto) > soglia
+    copertura_bassa = con_colazioni & (copertura < copertura_minima)
+    controlli = pd.DataFrame({
+        'nessuna colazione registrata': ~con_colazioni,
+        'costo per colazione anomalo': costo_anomalo,
+        'mese registrato solo in parte': copertura_bassa
+    })
+    # Motivi dei controlli non superati, separati da virgole
+    motivi = controlli.dot(controlli.columns + ', ').str.rstrip(', ').to_numpy()
+
+    return pd.DataFrame({
+        'Mese': nomi,
+        'Costo Medio per Colazione': costo,
+        'Variazione su Mese Precedente (%)': variazione,
+        'Scarto Robusto': scarto,
+        'Copertura Giorni': copertura,
+        'Anomalo': motivi != '',
+        'Motivo': motivi
+    })
+
+
+def salti_coefficienti(dati, soglia=SOGLIA_SALTO_COEFFICIENTE):
+    """Coefficienti che si discostano di oltre `soglia` volte dalla mediana dell'articolo.
+
+    Il confronto avviene su tutta la matrice articoli × mesi in un solo
+    passaggio; sono considerati solo gli articoli con coefficiente positivo
+    in almeno due mesi.
+    """
+    mesi = list(dati.mesi)
+    colonne = ['id', 'Categoria', 'Articolo', 'Mese', 'Coefficiente', 'Mediana Articolo', 'Rapporto']
+    if not mesi:
+        return pd.DataFrame(columns=colonne)
+
+    coefficienti = dati.matrice_coefficienti()
+    positivi = np.where(coefficienti > 0, coefficienti, np.nan)
+    confrontabili = np.sum(~np.isnan(positivi), axis=1) >= 2
+    mediana = np.full(len(positivi), np.nan)
+    mediana[confrontabili] = np.nanmedian(positivi[confrontabili], axis=1)
+    rapporto = positivi / mediana[:, None]
+    salto = (rapporto > soglia) | (rapporto < 1 / soglia)
+
+    ids, colonne_mese = np.nonzero(salto)
+    return pd.DataFrame({
+        'id': ids,
+        'Categoria': dati.articoli['Categoria'].to_numpy()[ids],
+        'Articolo': dati.articoli['Articolo'].to_numpy()[ids],
+        'Mese': np.array(mesi, dtype=object)[colonne_mese],
+        'Coefficiente': positivi[ids, colonne_mese],
+        'Mediana Articolo': mediana[ids],
+        'Rapporto': rapporto[ids, colonne_mese]
+    }, columns=colonne).astype({'Categoria': object, 'Articolo': object})
+
+
+class Anomalie:
+    """Risultato dei controlli eseguiti al caricamento dei dati"""
+
+    def __init__(self, giorni, mesi, coefficienti):
+        self.giorni = giorni
+        self.mesi = mesi
+        self.coefficienti = coefficienti
+
+    def mesi_sospetti(self):
+        """Nome dei mesi segnalati con il relativo motivo"""
+        if self.mesi is None:
+            return {}
+        segnalati = self.mesi[self.mesi['Anomalo']]
+        return dict(zip(segnalati['Mese'], segnalati['Motivo']))
+
+    def escludi_mesi(self, mesi, pesi):
+        """Pesi (nell'ordine di `mesi`) con peso zero per i mesi segnalati.
+
+        Così i mesi sospetti non entrano nei coefficienti dell'ordine; se
+        fossero segnalati tutti i mesi pesati i pesi restano invariati.
+        """
+        pesi = np.asarray(pesi, dtype=float)
+        esclusi = np.isin(np.asarray(list(mesi), dtype=object), list(self.mesi_sospetti()))
+        pesi_validi = np.where(esclusi, 0.0, pesi)
+        return pesi_validi if pesi_validi.sum() > 0 else pesi
+
+    def giorni_mese(self, numero_mese):
+        """Giorni anomali del mese indicato"""
+        giorni = self.giorni
+        if giorni is None:
+            return None
+        return giorni[(giorni['mese'] == numero_mese) & giorni['Anomalo']]
+
+    def coefficienti_mese(self, nome_mese):
+        """Articoli con un salto di coefficiente nel mese indicato"""
+        return self.coefficienti[self.coefficienti['Mese'] == nome_mese]
+
+
+def rileva_anomalie(dati, df_riepilogo):
+    """Esegue tutti i controlli su un DatiCompatti e sul riepilogo mensile dei costi"""
+    colazioni = dati.colazioni
+    giorni = anomalie_giornaliere(colazioni) if colazioni is not None else None
+    mesi = anomalie_mensili(df_riepilogo, colazioni) if colazioni is not None and df_riepilogo is not None else None
+    return Anomalie(giorni, mesi, salti_coefficienti(dati))
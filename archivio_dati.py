@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from cache_risultati import CARTELLA_CACHE
+from dati_comuni import DatiCondivisi, versione_dati
+from modello_dati import COLONNE_ARTICOLO, espandi_valori
+from schemi_input import SCHEMI
+
+# Archivi SQLite dei dati di input, un file per versione dei dati
+PREFISSO_ARCHIVIO = 'archivio-'
+
+# Archivi di versioni diverse conservati nella cartella della cache (i più vecchi vengono eliminati)
+ARCHIVI_CONSERVATI = 4
+
+# Indici creati sulle tabelle dell'archivio (nome indice -> tabella, colonne)
+INDICI = {
+    'idx_coefficienti_articolo': ('coefficienti', ['id_articolo']),
+    'idx_articoli_categoria': ('articoli', ['Categoria']),
+    'idx_colazioni_mese': ('colazioni', ['mese']),
+}
+
+
+def _mancanti_come_nan(df, colonne):
+    """NULL letti da SQLite come np.nan, come nelle viste in memoria"""
+    for nome in colonne:
+        valori = df[nome].to_numpy(dtype=object).copy()
+        valori[pd.isna(valori)] = np.nan
+        df[nome] = valori
+    return df
+
+
+def percorso_archivio(versione, cartella_cache=CARTELLA_CACHE):
+    """File dell'archivio di una versione dei dati: cartelle e versioni diverse non si sovrascrivono"""
+    impronta = hashlib.sha256(versione.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cartella_cache, f"{PREFISSO_ARCHIVIO}{impronta}.sqlite")
+
+
+def _elimina_vecchi(percorso, conservati=ARCHIVI_CONSERVATI):
+    """Elimina gli archivi meno recenti della cartella di `percorso` oltre i `conservati`"""
+    cartella = os.path.dirname(percorso) or '.'
+    archivi = [os.path.join(cartella, nome) for nome in os.listdir(cartella)
+               if nome.startswith(PREFISSO_ARCHIVIO) and nome.endswith('.sqlite')]
+    archivi = [a for a in archivi if os.path.abspath(a) != os.path.abspath(percorso)]
+    archivi.sort(key=os.path.getmtime, reverse=True)
+    for vecchio in archivi[max(conservati - 1, 0):]:
+        try:
+            os.remove(vecchio)
+        except OSError:
+            pass
+
+
+def costruisci_archivio(dati, versione, percorso=None):
+    """Scrive l'archivio SQLite da un DatiCompatti (id articolo e valori identici).
+
+    L'archivio viene scritto in un file temporaneo e poi sostituito in modo
+    atomico, così le sessioni che lo stanno leggendo non vedono mai un file
+    a metà. Il file predefinito dipende dalla versione (vedi percorso_archivio).
+    """
+    percorso = percorso_archivio(versione) if percorso is None else percorso
+    cartella = os.path.dirname(percorso)
+    if cartella:
+        os.makedirs(cartella, exist_ok=True)
+    temporaneo = f"{percorso}.{os.getpid()}.tmp"
+    if os.path.exists(temporaneo):
+        os.remove(temporaneo)
+
+    connessione = sqlite3.connect(temporaneo)
+    try:
+        with connessione:
+            connessione.execute("CREATE TABLE meta (chiave TEXT PRIMARY KEY, valore TEXT)")
+            connessione.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ('versione', versione),
+                ('mesi', '|'.join(dati.mesi)),
+            ])
+
+            # Dizionario degli articoli con gli stessi id del modello compatto
+            articoli = dati.articoli.astype(object).where(dati.articoli.notna(), None)
+            connessione.execute(
+                "CREATE TABLE articoli (id INTEGER PRIMARY KEY, Categoria TEXT, Prodotto TEXT, Articolo TEXT, UDM TEXT)"
+            )
+            connessione.executemany(
+                "INSERT INTO articoli VALUES (?, ?, ?, ?, ?)",
+                zip(articoli.index.tolist(), *(articoli[nome].tolist() for nome in COLONNE_ARTICOLO))
+            )
+
+            # Coefficienti in formato lungo: una riga per articolo presente nel mese
+            connessione.execute("""
+                CREATE TABLE coefficienti (
+                    mese TEXT, id_articolo INTEGER, quantita REAL, coefficiente REAL,
+                    PRIMARY KEY (mese, id_articolo)
+                ) WITHOUT ROWID
+            """)
+            coefficienti = espandi_valori(dati.coefficienti, dati.decimali_coefficienti)
+            quantita = espandi_valori(dati.quantita, dati.decimali_quantita)
+            ids, colonne = np.nonzero(dati.presenza)
+            righe = pd.DataFrame({
+                'mese': np.array(dati.mesi, dtype=object)[colonne],
+                'id_articolo': ids,
+                'quantita': quantita[ids, colonne],
+                'coefficiente': coefficienti[ids, colonne]
+            })
+            connessione.executemany(
+                "INSERT INTO coefficienti VALUES (?, ?, ?, ?)",
+                righe.astype(object).where(righe.notna(), None).itertuples(index=False, name=None)
+            )
+
+            if dati.consumi is not None:
+                consumi = dati.consumi.astype({nome: object for nome in dati.consumi.select_dtypes('category')})
+                consumi.to_sql('consumi', connessione, index=False)
+
+            if dati.colazioni is not None:
+                colazioni = dati.colazioni.assign(data=dati.colazioni['data'].dt.strftime('%Y-%m-%d %H:%M:%S'))
+                colazioni.to_sql('colazioni', connessione, index=True, index_label='indice')
+
+            tabelle = {riga[0] for riga in connessione.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for nome_indice, (tabella, colonne_indice) in INDICI.items():
+                if tabella in tabelle:
+                    elenco = ', '.join(f'"{c}"' for c in colonne_indice)
+                    connessione.execute(f'CREATE INDEX {nome_indice} ON {tabella} ({elenco})')
+            connessione.execute("ANALYZE")
+    except Exception:
+        connessione.close()
+        os.remove(temporaneo)
+        raise
+    connessione.close()
+
+    os.replace(temporaneo, percorso)
+    _elimina_vecchi(percorso)
+    return ArchivioDati(percorso)
+
+
+def versione_archivio(percorso):
+    """Versione dei dati salvata nell'archivio, None se assente o illeggibile"""
+    if not os.path.exists(percorso):
+        return None
+    try:
+        return ArchivioDati(percorso).meta('versione')
+    except sqlite3.Error:
+        return None
+
+
+def apri_archivio(costruisci, versione, cartella_cache=CARTELLA_CACHE):
+    """Archivio della versione indicata, scritto con il DatiCompatti di costruisci() solo se manca"""
+    percorso = percorso_archivio(versione, cartella_cache)
+    if versione_archivio(percorso) == versione:
+        return ArchivioDati(percorso)
+    return costruisci_archivio(costruisci(), versione, percorso)
+
+
+class ArchivioDati:
+    """Interrogazioni sull'archivio SQLite dei dati.
+
+    Le viste hanno la stessa forma di quelle di modello_dati.DatiCompatti
+    (indice = id articolo, righe nell'ordine degli id), ma leggono solo le
+    righe del mese e delle categorie richieste grazie agli indici. Ogni
+    interrogazione apre una propria connessione in sola lettura, quindi
+    un'istanza può essere condivisa da tutte le sessioni.
+    """
+
+    def __init__(self, percorso):
+        self.percorso = percorso
+        mesi = self.meta('mesi')
+        self.mesi = tuple(mesi.split('|')) if mesi else ()
+
+    def _connessione(self):
+        return sqlite3.connect(f"file:{self.percorso}?mode=ro", uri=True, timeout=10)
+
+    def interroga(self, sql, parametri=()):
+        """Esegue una query e restituisce un DataFrame"""
+        connessione = self._connessione()
+        try:
+            return pd.read_sql_query(sql, connessione, params=parametri)
+        finally:
+            connessione.close()
+
+    def meta(self, chiave):
+        connessione = self._connessione()
+        try:
+            riga = connessione.execute("SELECT valore FROM meta WHERE chiave = ?", (chiave,)).fetchone()
+        finally:
+            connessione.close()
+        return riga[0] if riga else None
+
+    def ha_tabella(self, nome):
+        connessione = self._connessione()
+        try:
+            riga = connessione.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (nome,)
+            ).fetchone()
+        finally:
+            connessione.close()
+        return riga is not None
+
+    def __bool__(self):
+        return bool(self.mesi) or self.ha_tabella('consumi')
+
+    def __contains__(self, mese):
+        return mese in self.mesi
+
+    def indice_mese(self, mese):
+        return self.mesi.index(mese)
+
+    def vista_mese(self, mese, solo_positivi=False, categorie_escluse=None, categoria=None):
+        """DataFrame del mese con le sole righe richieste (vedi DatiCompatti.vista_mese)"""
+        condizioni, parametri = ["c.mese = ?"], [mese]
+        if solo_positivi:
+            condizioni.append("c.coefficiente > 0")
+        if categorie_escluse:
+            segnaposto = ', '.join('?' * len(categorie_escluse))
+            condizioni.append(f"(a.Categoria IS NULL OR a.Categoria NOT IN ({segnaposto}))")
+            parametri.extend(categorie_escluse)
+        if categoria is not None:
+            condizioni.append("a.Categoria = ?")
+            parametri.append(categoria)
+
+        vista = self.interroga(f"""
+            SELECT a.id, a.Categoria, a.Prodotto, a.Articolo, a.UDM,
+                   c.quantita AS "Quantità", c.coefficiente AS Coefficiente
+            FROM coefficienti c JOIN articoli a ON a.id = c.id_articolo
+            WHERE {' AND '.join(condizioni)}
+            ORDER BY a.id
+        """, parametri)
+        vista = vista.set_index('id').rename_axis(None)
+        vista[['Quantità', 'Coefficiente']] = vista[['Quantità', 'Coefficiente']].astype(float)
+        return _mancanti_come_nan(vista, COLONNE_ARTICOLO)
+
+    def categorie(self, mesi=None):
+        """Categorie presenti (non vuote) nei mesi indicati, nell'ordine degli articoli"""
+        mesi = self.mesi if mesi is None else [m for m in mesi if m in self.mesi]
+        if not mesi:
+            return []
+        segnaposto = ', '.join('?' * len(mesi))
+        risultato = self.interroga(f"""
+            SELECT a.Categoria
+            FROM articoli a JOIN coefficienti c ON a.id = c.id_articolo
+            WHERE c.mese IN ({segnaposto}) AND a.Categoria IS NOT NULL
+            GROUP BY a.Categoria
+            ORDER BY MIN(a.id)
+        """, list(mesi))
+        return risultato['Categoria'].tolist()
+
+    def consumi(self, colonne=None):
+        """Tutte le righe dei consumi, con le sole `colonne` indicate se presenti"""
+        if not self.ha_tabella('consumi'):
+            return None
+        selezione = ', '.join(f'"{c}"' for c in colonne) if colonne else '*'
+        return self.interroga(f"SELECT {selezione} FROM consumi ORDER BY rowid")
+
+    def colazioni(self):
+        """Tutte le colazioni giornaliere, come DatiCompatti.colazioni"""
+        if not self.ha_tabella('colazioni'):
+            return None
+        return self._colazioni(self.interroga("SELECT * FROM colazioni ORDER BY indice"))
+
+    def colazioni_mese(self, numero_mese):
+        """Righe delle colazioni giornaliere del mese indicato"""
+        if not self.ha_tabella('colazioni'):
+            return None
+        return self._colazioni(
+            self.interroga("SELECT * FROM colazioni WHERE mese = ? ORDER BY indice", (int(numero_mese),))
+        )
+
+    @staticmethod
+    def _colazioni(df):
+        """Indice e tipi delle colonne come nello schema (SQLite non distingue int64 e Int64)"""
+        df = df.set_index('indice').rename_axis(None)
+        df = df.astype({c.rinomina: c.tipo for c in SCHEMI['colazioni'].colonne if c.tipo != 'data'})
+        df['data'] = pd.to_datetime(df['data'], format='%Y-%m-%d %H:%M:%S')
+        return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa i dati di input nell'archivio SQLite delle analisi")
+    parser.add_argument('--dati', default='.', help="cartella con i file di input (default: cartella corrente)")
+    parser.add_argument('--archivio', help=f"file dell'archivio (default: {CARTELLA_CACHE}/{PREFISSO_ARCHIVIO}<versione>.sqlite)")
+    args = parser.parse_args(argv)
+
+    dati = DatiCondivisi(args.dati)
+    archivio = costruisci_archivio(dati.compatti, versione_dati(args.dati), args.archivio)
+    print(f"Archivio creato: {archivio.percorso} ({len(archivio.mesi)} mesi)")
+
+
+if __name__ == "__main__":
+    main()
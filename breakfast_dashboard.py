@@ -1,318 +1,349 @@
 import streamlit as st
 import pandas as pd
 import os
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
-import numpy as np
+from datetime import datetime, timedelta
 import math
 
-# Configurazione del tema
-st.set_page_config(
-    page_title="Dashboard Colazioni",
-    page_icon="🍳",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# Definizione del tema personalizzato
-st.markdown("""
-    <style>
-    /* Colori principali */
-    :root {
-        --primary-color: #8B6914;
-        --secondary-color: #FFF8DC;
-        --accent-color: #D2691E;
-        --background-color: #FFFFFF;
-        --text-color: #333333;
-        --card-bg: #F8F9FA;
-        --border-color: #E0E0E0;
-    }
-
-    /* Stile generale */
-    .stApp {
-        background-color: var(--background-color);
-        color: var(--text-color);
-    }
-
-    /* Stile titoli */
-    h1, h2, h3 {
-        color: var(--text-color) !important;
-    }
-
-    /* Stile metriche */
-    [data-testid="metric-container"] {
-        background-color: var(--card-bg);
-        border: 1px solid var(--border-color);
-        border-radius: 10px;
-        padding: 15px;
-        margin: 5px 0;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-
-    [data-testid="metric-container"] [data-testid="metric-label"] {
-        color: var(--text-color) !important;
-    }
-
-    [data-testid="metric-container"] [data-testid="metric-value"] {
-        color: var(--primary-color) !important;
-        font-weight: bold;
-    }
-
-    /* Stile tab */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 2px;
-        background-color: var(--card-bg);
-        border-radius: 10px;
-        padding: 5px;
-    }
-
-    .stTabs [data-baseweb="tab"] {
-        background-color: transparent;
-        border-radius: 5px;
-        padding: 10px 20px;
-        color: var(--text-color);
-        font-weight: 500;
-    }
-
-    .stTabs [aria-selected="true"] {
-        background-color: var(--primary-color);
-        color: white !important;
-    }
-
-    /* Stile bottoni */
-    .stButton button {
-        background-color: var(--primary-color);
-        color: white;
-        border-radius: 5px;
-        padding: 10px 20px;
-        border: none;
-        font-weight: 500;
-        transition: all 0.3s ease;
-    }
-
-    .stButton button:hover {
-        background-color: var(--accent-color);
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-    }
-
-    /* Stile dataframe */
-    .dataframe {
-        background-color: var(--card-bg);
-        border-radius: 10px;
-        border: 1px solid var(--border-color);
-        overflow: hidden;
-    }
-
-    .dataframe thead tr th {
-        background-color: var(--primary-color) !important;
-        color: white !important;
-        font-weight: bold;
-        padding: 12px !important;
-    }
-
-    .dataframe tbody tr:nth-child(even) {
-        background-color: #F5F5F5;
-    }
-
-    .dataframe tbody tr:hover {
-        background-color: #E8E8E8;
-    }
-
-    /* Stile selectbox e input */
-    .stSelectbox > div > div,
-    .stTextInput > div > div > input,
-    .stNumberInput > div > div > input {
-        background-color: white;
-        color: var(--text-color);
-        border: 1px solid var(--border-color);
-        border-radius: 5px;
-    }
-
-    .stSelectbox > label,
-    .stTextInput > label,
-    .stNumberInput > label {
-        color: var(--text-color) !important;
-        font-weight: 500;
-    }
-
-    /* Stile sidebar */
-    .css-1d391kg {
-        background-color: var(--card-bg);
-    }
-
-    /* Stile alerts */
-    .stAlert {
-        background-color: var(--card-bg);
-        border: 1px solid var(--border-color);
-        border-radius: 10px;
-        color: var(--text-color);
-    }
-
-    /* Miglioramento contrasto per i grafici */
-    .js-plotly-plot .plotly {
-        background-color: white !important;
-    }
+from anomalie import rileva_anomalie
+from archivio_dati import apri_archivio
+from cache_risultati import CacheRisultati, chiave_risultato, impronta_dataframe
+from calcolo_costi_reali import calcola_riepilogo_mensile
+from caricamenti import ATTESA_BREVE, ElaborazioneCaricamenti
+from classifiche import ClassificheMesi
+from coefficienti import (SCHEMI_PESI, SEGMENTI, coefficienti_normalizzati, coefficienti_ponderati,
+                          combina_coefficienti, consumo_per_segmento, copertura_mesi, pesi_ultimi_mesi,
+                          stima_coefficienti_segmento)
+from dati_comuni import (FILE_CONSUMI, FILE_DASHBOARD, NOMI_MESI, NUMERI_MESI, anno_file_colazioni,
+                         carica_colazioni, carica_consumi, carica_fogli_mensili, trova_file_colazioni,
+                         versione_dati)
+from esportazione_excel import EsportatoreExcel, fogli_ordine
+from grafo_calcolo import GrafoCalcolo
+from istantanea_dati import leggi_istantanea, mappa_istantanea
+from modello_dati import costruisci_dati_compatti
+from ordini import ordine_buffer, ordine_consumo_previsto, ordine_costi, ordine_giacenze, ordine_prezzi
+from pianificazione import descrivi_calendari, pianifica_consegne, tabella_consegne
+from prezzi import COLONNE_PREZZI, StoricoPrezzi
+from previsioni import calcola_consumo_giornaliero
+from tema_dashboard import (COLATIONI_MENSILI, CONFIGURAZIONE_PAGINA, COSTI_MENSILI, CSS_TEMA, FONTI_COEFFICIENTI,
+                            MAX_PAX_GIORNALIERI)
+from varianza_costi import scomponi_variazioni, totali_variazioni
 
-    /* Card personalizzate */
-    .custom-card {
-        background-color: var(--card-bg);
-        border: 1px solid var(--border-color);
-        border-radius: 10px;
-        padding: 20px;
-        margin: 10px 0;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-
-    /* Miglioramento leggibilità testo */
-    p, span, div {
-        color: var(--text-color) !important;
-    }
-
-    /* Stile per expander */
-    .streamlit-expanderHeader {
-        background-color: var(--card-bg);
-        border: 1px solid var(--border-color);
-        border-radius: 5px;
-        color: var(--text-color) !important;
-    }
+# Configurazione del tema
+st.set_page_config(**CONFIGURAZIONE_PAGINA)
+st.markdown(CSS_TEMA, unsafe_allow_html=True)
 
-    .streamlit-expanderContent {
-        background-color: white;
-        border: 1px solid var(--border-color);
-        border-top: none;
-        border-radius: 0 0 5px 5px;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# Costanti per i file
-DASHBOARD_FILE = "breakfast_dashboard.xlsx"
-CONSUMI_FILE = "unified_consumi_data.csv"
-COLATIONI_FILE = "colazionigiornalierecount2024.csv"
-MAX_PAX_GIORNALIERI = 194  # Numero massimo di colazioni giornaliere
-
-# Dizionario dei nomi dei mesi
-NOMI_MESI = {
-    4: 'Aprile',
-    5: 'Maggio',
-    6: 'Giugno',
-    7: 'Luglio',
-    8: 'Agosto',
-    9: 'Settembre',
-    10: 'Ottobre'
-}
-
-# Dizionario dei costi mensili
-COSTI_MENSILI = {
-    'Aprile': 8883.02,
-    'Maggio': 15004.04,
-    'Giugno': 18966.23,
-    'Luglio': 22540.99,
-    'Agosto': 21773.70,
-    'Settembre': 19710.02,
-    'Ottobre': 13749.44
-}
-
-# Colazioni mensili reali (basate sui dati effettivi)
-COLATIONI_MENSILI = {
-    'Aprile': 1279,
-    'Maggio': 3459,
-    'Giugno': 4896,
-    'Luglio': 5199,
-    'Agosto': 5159,
-    'Settembre': 4337,
-    'Ottobre': 3202
-}
+# Grafici plotly, importati alla prima vista che ne disegna uno (vedi grafici_dashboard.py)
+def grafici():
+    import grafici_dashboard
+    return grafici_dashboard
 
 # Caricamento dati
-@st.cache_data
-def carica_dati():
-    """Carica i dati dai file"""
-    dati = {}
+@st.cache_resource(max_entries=2)
+def carica_dati(versione=None):
+    """Carica i dati in un'istantanea di sola lettura condivisa da tutte le sessioni.
+
+    Con cache_resource ogni sessione riceve lo stesso oggetto invece di una
+    copia deserializzata: lo stato di sessione si limita alle selezioni e
+    alle piccole viste derivate (vedi modello_dati.DatiCompatti). La versione
+    dei file fa parte della chiave, così i dati si ricaricano quando cambiano.
+
+    I dati derivati sono mappati dall'istantanea binaria su disco (vedi
+    istantanea_dati.py), scritta alla prima lettura dei file di una versione
+    e condivisa dai processi tramite la page cache.
+    """
+    dati = leggi_istantanea(versione) if versione is not None else None
+    if dati is None:
+        dati, completi = leggi_file_dati()
+        # Un caricamento con errori non viene salvato: si riprova alla prossima esecuzione
+        if versione is not None and completi:
+            dati = mappa_istantanea(dati, versione)
+    return dati.congela()
+
+def leggi_file_dati():
+    """Legge i file di input; restituisce i dati compatti e se tutti i file sono stati letti senza errori"""
+    completi = True
+    fogli_mensili = {}
+    df_consumi = None
+    df_colazioni = None
 
     # Carica il file dashboard se esiste
-    if os.path.exists(DASHBOARD_FILE):
+    if os.path.exists(FILE_DASHBOARD):
         try:
-            # Carica coefficienti di ogni mese
-            for numero_mese, nome_mese in NOMI_MESI.items():
-                try:
-                    df = pd.read_excel(DASHBOARD_FILE, sheet_name=nome_mese, skiprows=3)
-                    # Converti i coefficienti in valori numerici
-                    if 'Coefficiente' in df.columns:
-                        df['Coefficiente'] = pd.to_numeric(df['Coefficiente'], errors='coerce')
-                    dati[nome_mese] = df
-                except Exception as e:
-                    st.warning(f"Impossibile caricare il foglio {nome_mese}: {e}")
-
-            # Carica coefficienti combinati
-            try:
-                df_coeff = pd.read_excel(DASHBOARD_FILE, sheet_name='Coefficienti Mensili')
-                dati['coefficienti'] = df_coeff
-            except Exception as e:
-                print(f"Impossibile caricare il foglio Coefficienti Mensili: {e}")
+            # Carica coefficienti di ogni mese aprendo il file una sola volta
+            fogli_mensili = carica_fogli_mensili(FILE_DASHBOARD)
+            for nome_mese in NOMI_MESI.values():
+                if nome_mese not in fogli_mensili:
+                    st.warning(f"Impossibile caricare il foglio {nome_mese}")
+                    completi = False
 
             # Carica dati dei costi dai consumi
-            if os.path.exists(CONSUMI_FILE):
+            if os.path.exists(FILE_CONSUMI):
                 try:
-                    df_consumi = pd.read_csv(CONSUMI_FILE)
-                    # Pulisci il nome delle colonne
-                    df_consumi.columns = df_consumi.columns.str.strip()
-                    dati['consumi'] = df_consumi
+                    df_consumi = carica_consumi(FILE_CONSUMI)
                 except Exception as e:
                     st.warning(f"Impossibile caricare il file consumi: {e}")
+                    completi = False
 
         except Exception as e:
             st.error(f"Errore nel caricamento del file dashboard: {e}")
+            completi = False
+
+    # Carica le colazioni giornaliere reali
+    file_colazioni = trova_file_colazioni()
+    if os.path.exists(file_colazioni):
+        try:
+            df_colazioni = carica_colazioni(file_colazioni)
+        except Exception as e:
+            st.warning(f"Impossibile caricare i dati delle colazioni reali: {e}")
+            completi = False
 
-    return dati
+    return costruisci_dati_compatti(fogli_mensili, df_consumi, df_colazioni), completi
+
+# Consumo previsto giornaliero, calcolato una volta per versione dei dati
+@st.cache_resource(max_entries=2)
+def carica_consumo_giornaliero(versione=None):
+    """Ripartisce i consumi mensili sui giorni in base alle colazioni giornaliere"""
+    dati = carica_dati(versione)
+    if dati.colazioni is None:
+        return None
+    return calcola_consumo_giornaliero(dati, COLATIONI_MENSILI)
+
+# Coefficienti per segmento, stimati una volta per versione dei dati
+@st.cache_resource(max_entries=4)
+def carica_coefficienti_segmento(versione=None, normalizza=False):
+    """Stima i coefficienti per segmento di tutti gli articoli (vedi coefficienti.py)"""
+    return stima_coefficienti_segmento(carica_dati(versione), normalizza=normalizza)
+
+# Coefficienti riferiti all'intero periodo di servizio, calcolati una volta per versione dei dati
+@st.cache_resource(max_entries=2)
+def carica_coefficienti_normalizzati(versione=None):
+    """Copertura dei mesi, matrice dei coefficienti normalizzati e coefficienti ponderati su tutti i mesi.
+
+    I mesi segnalati come anomali (vedi anomalie.py) non entrano nei coefficienti ponderati.
+    """
+    dati = carica_dati(versione)
+    if dati.colazioni is None:
+        return None
+    copertura = copertura_mesi(dati.colazioni, dati.mesi)
+    pesi = carica_anomalie(versione).escludi_mesi(dati.mesi, copertura['Copertura'].reindex(dati.mesi))
+    return (copertura, coefficienti_normalizzati(dati, copertura),
+            coefficienti_ponderati(dati, dict(zip(dati.mesi, pesi)), copertura=copertura))
 
 # Cerca costi e dettagli di un prodotto
-def trova_informazioni_prodotto(df_consumi, articolo):
-    """Cerca le informazioni di costo per un prodotto nel dataset dei consumi"""
-    if df_consumi is None or articolo is None:
+def trova_informazioni_prodotto(storico_prezzi, articolo, mese=None):
+    """Cerca le informazioni di costo per un prodotto nello storico dei prezzi (prezzo valido nel mese)"""
+    if storico_prezzi is None or articolo is None:
+        return None
+
+    info = storico_prezzi.prezzi(pd.Series([articolo]), mese).iloc[0]
+    if pd.isna(info['Codice']) and pd.isna(info['Descrizione']):
         return None
+    return {
+        'costo_medio': info['Costo Unitario'],
+        'uma': info['U.M.A.'],
+        'umc': info['U.M.C.'],
+        'coeff_conv': info['Coeff Conv'],
+        'classe': info['Classe']
+    }
+
+# Archivio SQLite per le interrogazioni delle tab, ricostruito solo quando cambiano i file
+@st.cache_resource(max_entries=2)
+def carica_archivio(versione=None):
+    """Apre l'archivio dei dati indicizzato per mese e categoria (vedi archivio_dati.py).
+
+    Il file è uno per versione dei dati; i dati compatti servono solo per
+    scriverlo quando manca.
+    """
+    return apri_archivio(lambda: carica_dati(versione), versione)
+
+# Riepilogo mensile dei costi reali, calcolato una volta per versione dei dati
+@st.cache_resource(max_entries=2)
+def carica_riepilogo_mensile(versione=None):
+    """Colazioni, giorni di servizio e costi di ogni mese dei consumi (vedi calcolo_costi_reali.py)"""
+    archivio = carica_archivio(versione)
+    df_consumi, df_colazioni = archivio.consumi(), archivio.colazioni()
+    if df_consumi is None or df_colazioni is None:
+        return None
+    return calcola_riepilogo_mensile(df_consumi, df_colazioni)
+
+# Controlli sui dati eseguiti al caricamento, una volta per versione dei dati
+@st.cache_resource(max_entries=2)
+def carica_anomalie(versione=None):
+    """Giorni, mesi e coefficienti sospetti (vedi anomalie.py)"""
+    return rileva_anomalie(carica_dati(versione), carica_riepilogo_mensile(versione))
+
+# Scomposizione delle variazioni di costo, calcolata una volta per versione dei dati
+@st.cache_resource(max_entries=2)
+def carica_variazioni_costi(versione=None):
+    """Effetti volume, mix e prezzo e scostamento dal costo teorico per prodotto (vedi varianza_costi.py)"""
+    archivio = carica_archivio(versione)
+    df_consumi, df_colazioni = archivio.consumi(), archivio.colazioni()
+    if df_consumi is None or df_colazioni is None:
+        return None
+    return scomponi_variazioni(df_consumi, df_colazioni, carica_dati(versione), carica_storico_prezzi(versione))
+
+# Storico dei prezzi per prodotto e mese, costruito una volta per versione dei dati
+@st.cache_resource(max_entries=2)
+def carica_storico_prezzi(versione=None):
+    """Euro Medio dei consumi ordinato per prodotto e mese (vedi prezzi.py).
+
+    Gli articoli dei fogli mensili vengono abbinati ai prodotti qui, una volta
+    per versione dei dati: gli ordini trovano l'abbinamento già calcolato.
+    """
+    df_consumi = carica_archivio(versione).consumi(colonne=COLONNE_PREZZI)
+    if df_consumi is None:
+        return None
+    storico_prezzi = StoricoPrezzi(df_consumi)
+    storico_prezzi.abbina(carica_dati(versione).articoli['Articolo'])
+    return storico_prezzi
+
+# Classifiche degli articoli per mese, calcolate una volta per versione dei dati
+@st.cache_resource(max_entries=2)
+def carica_classifiche(versione=None):
+    """Id degli articoli di ogni mese ordinati per coefficiente, quantità e costo (vedi classifiche.py)"""
+    return ClassificheMesi(carica_dati(versione), carica_storico_prezzi(versione))
+
+# Cache su disco dei risultati degli ordini, condivisa da sessioni e riavvii
+@st.cache_resource
+def carica_cache_risultati():
+    """Apre la cache persistente dei risultati (vedi cache_risultati.py)"""
+    return CacheRisultati()
+
+# Generazione dei file Excel in background, condivisa da tutte le sessioni
+@st.cache_resource
+def carica_esportatore_excel():
+    """Esportatore Excel che salva i file nella cache dei risultati (vedi esportazione_excel.py)"""
+    return EsportatoreExcel(carica_cache_risultati())
+
+# Elaborazione in background dei file caricati, condivisa da tutte le sessioni
+@st.cache_resource
+def carica_elaborazione_caricamenti():
+    """Worker che legge, valida e pubblica i file caricati (vedi caricamenti.py)"""
+    return ElaborazioneCaricamenti()
+
+# Stato di un file caricato
+def mostra_caricamento(caricamento, chiave_aggiorna):
+    """Mostra l'avanzamento finché il file è in elaborazione o l'errore; True quando il risultato è pronto"""
+    if not caricamento.completato.is_set():
+        st.progress(caricamento.avanzamento, text=f"{caricamento.nome_file}: {caricamento.messaggio}")
+        st.button("Aggiorna", key=chiave_aggiorna)
+        return False
+    if caricamento.errore is not None:
+        st.error(f"⚠️ Errore durante la lettura di {caricamento.nome_file}: {caricamento.errore}")
+        return False
+    return True
+
+# Consumo totale dei prodotti del mese e ripartizione per categoria (tab 1)
+def consumo_mese(df_mese_filtrato, colazioni):
+    """Vista del mese con il consumo totale per il numero di colazioni del mese"""
+    df_consumo = df_mese_filtrato.copy()
+    df_consumo['Consumo Totale'] = df_consumo['Coefficiente'] * colazioni
+    return df_consumo
+
+def consumo_per_categoria(df_consumo, ordine_categorie):
+    """Consumo totale per categoria, nell'ordine decrescente precalcolato per il mese"""
+    df_categorie = df_consumo.dropna(subset=['Categoria'])
+    df_categorie = df_categorie.groupby('Categoria', sort=False)['Consumo Totale'].sum()
+    return df_categorie.reindex(ordine_categorie).reset_index()
+
+# Grafo delle tabelle derivate, condiviso da tutte le sessioni
+@st.cache_resource
+def carica_grafo_tabelle():
+    """Nodi delle tabelle derivate di tab 1 e tab 3 (vedi grafo_calcolo.py).
+
+    Cambiando solo il buffer si ricalcolano i nodi 'buffer' e 'ordine',
+    mentre consumo previsto e prezzi restano in memoria.
+    """
+    grafo = GrafoCalcolo()
+    grafo.aggiungi('vista_mese', lambda archivio, mese: archivio.vista_mese(mese, solo_positivi=True),
+                   'archivio', 'mese')
+    grafo.aggiungi('consumo_mese', consumo_mese, 'vista_mese', 'colazioni')
+    grafo.aggiungi('ordine_categorie', lambda classifiche, mese: classifiche.categorie[mese], 'classifiche', 'mese')
+    grafo.aggiungi('categorie_mese', consumo_per_categoria, 'consumo_mese', 'ordine_categorie')
+
+    grafo.aggiungi('articoli', lambda vista: vista['Articolo'], 'vista_ordine')
+    grafo.aggiungi('consumo_previsto', ordine_consumo_previsto, 'vista_ordine', 'num_colazioni', 'consumo_segmenti')
+    grafo.aggiungi('prezzi', ordine_prezzi, 'articoli', 'storico_prezzi', 'mese_prezzi')
+    grafo.aggiungi('costi', ordine_costi, 'consumo_previsto', 'prezzi')
+    grafo.aggiungi('buffer', ordine_buffer, 'costi', 'buffer_percentuale')
+    grafo.aggiungi('ordine', ordine_giacenze, 'buffer', 'include_giacenze', 'giacenze')
+    return grafo
+
+def calcola_ordine_grafo(grafo, ingressi, firme):
+    """Ordine calcolato dal grafo (copia: il valore in memoria è condiviso tra sessioni)"""
+    return grafo.calcola('ordine', ingressi, firme).copy()
+
+# Report testuale e CSV dei prodotti da ordinare
+def prepara_report_ordine(df_ordine, num_colazioni, buffer_percentuale, colazioni_giornaliere,
+                          giorni_necessari, costo_totale_ordine, data_ordine, classifiche):
+    """Testo del report e CSV dell'ordine, oppure None se non c'è nulla da ordinare"""
+    # Filtra solo prodotti da ordinare
+    df_da_ordinare = df_ordine[df_ordine['Da Ordinare'] > 0].copy()
+
+    if df_da_ordinare.empty:
+        return None
+
+    # Ordina per categoria e articolo (ordine precalcolato degli id articolo)
+    df_da_ordinare = classifiche.ordina(df_da_ordinare, classifiche.alfabetico)
+
+    # Crea report per categoria
+    categorie_ordine = df_da_ordinare['Categoria'].unique()
+
+    report_text = f"ORDINE COLAZIONI - {data_ordine.strftime('%d/%m/%Y')}\n"
+    report_text += f"Numero colazioni: {num_colazioni} (Buffer: {buffer_percentuale}%)\n"
+    report_text += f"Distribuzione: {colazioni_giornaliere} colazioni/giorno per {giorni_necessari} giorni\n\n"
+
+    for categoria in categorie_ordine:
+        report_text += f"--- {str(categoria).upper()} ---\n"
+        prodotti_cat = df_da_ordinare[df_da_ordinare['Categoria'] == categoria]
 
-    # Pulizia del nome articolo per migliorare la corrispondenza
-    articolo_pulito = str(articolo).strip().upper()
+        for _, row in prodotti_cat.iterrows():
+            costo_info = ""
+            if 'Costo Unitario' in row and pd.notna(row['Costo Unitario']) and row['Costo Unitario'] > 0:
+                costo_info = f" - {row['Costo Unitario']:.2f}€/unità"
 
-    # Cerca corrispondenza esatta
-    match = df_consumi[df_consumi['Articolo'].str.strip().str.upper() == articolo_pulito]
+            report_text += f"{row['Articolo']}: {row['Da Ordinare']} {row['UDM']}{costo_info}\n"
 
-    if match.empty:
-        # Cerca corrispondenza parziale
-        match = df_consumi[df_consumi['Articolo'].str.contains(articolo_pulito, case=False, na=False)]
+        report_text += "\n"
 
-    if not match.empty:
-        # Prendi il primo match
-        info = match.iloc[0]
-        return {
-            'costo_medio': info.get('Euro Medio', 0),
-            'uma': info.get('U.M.A.', ''),
-            'umc': info.get('U.M.C.', ''),
-            'coeff_conv': info.get('Coeff Conv', 1),
-            'classe': info.get('Classe', '')
-        }
+    if costo_totale_ordine > 0:
+        report_text += f"\nCosto totale stimato: {costo_totale_ordine:.2f} €\n"
 
-    return None
+    # CSV dell'ordine
+    csv_ordine = df_da_ordinare.to_csv(index=False).encode('utf-8')
+    return report_text, csv_ordine
 
 # Applicazione principale
 def main():
     # Titolo dell'app
     st.title("🍳 Dashboard Colazioni")
 
+    # Nuovi export di consumi e colazioni, validati e pubblicati in background
+    with st.sidebar.expander("📤 Aggiorna dati"):
+        for tipo, etichetta in (('consumi', "Export consumi (CSV)"), ('colazioni', "Colazioni giornaliere (CSV)")):
+            file_export = st.file_uploader(etichetta, type=['csv'], key=f"carica_{tipo}")
+            if file_export is not None:
+                caricamento = carica_elaborazione_caricamenti().invia(tipo, file_export.getvalue(), file_export.name)
+                caricamento.attendi(ATTESA_BREVE)
+                if mostra_caricamento(caricamento, f"aggiorna_{tipo}"):
+                    st.success(f"{file_export.name}: {len(caricamento.risultato)} righe pubblicate.")
+
     # Carica i dati
-    dati = carica_dati()
-    if not dati:
+    versione = versione_dati()
+    archivio = carica_archivio(versione)
+    if not archivio:
         st.warning("Nessun dato disponibile. Verifica che i file Excel siano presenti.")
         st.stop()
+    anomalie = carica_anomalie(versione)
+    mesi_sospetti = anomalie.mesi_sospetti()
+    anno_stagione = anno_file_colazioni(trova_file_colazioni())
 
     # Filtra mesi disponibili
-    mesi_disponibili = [m for m in NOMI_MESI.values() if m in dati]
+    mesi_disponibili = [m for m in NOMI_MESI.values() if m in archivio]
 
     # Layout principale a tab
-    tab1, tab2, tab3 = st.tabs(["📈 Dettaglio Mensile", "🔄 Confronto Mesi", "📝 Pianificazione Ordini"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📈 Dettaglio Mensile", "🔄 Confronto Mesi", "📝 Pianificazione Ordini",
+                                      "📉 Scostamenti Costi"])
 
     # Tab 1: Dettaglio Mensile
     with tab1:
@@ -323,7 +354,7 @@ def main():
             mese_selezionato = st.selectbox("Seleziona Mese", mesi_disponibili, key="tab1_mese")
 
             # Mostra dati mensili
-            st.subheader(f"Dati {mese_selezionato} 2024")
+            st.subheader(f"Dati {mese_selezionato} {anno_stagione}")
             st.metric("Colazioni Servite", f"{COLATIONI_MENSILI.get(mese_selezionato, 0):,}")
             st.metric("Costo Totale", f"{COSTI_MENSILI.get(mese_selezionato, 0):,.2f} €")
 
@@ -331,75 +362,88 @@ def main():
                 costo_medio = COSTI_MENSILI.get(mese_selezionato, 0) / COLATIONI_MENSILI[mese_selezionato]
                 st.metric("Costo Medio per Colazione", f"{costo_medio:.2f} €")
 
+            # Segnalazioni dei controlli eseguiti al caricamento
+            if mese_selezionato in mesi_sospetti:
+                st.warning(f"⚠️ {mese_selezionato} segnalato come anomalo: {mesi_sospetti[mese_selezionato]}.")
+
+            salti_mese = anomalie.coefficienti_mese(mese_selezionato)
+            with st.expander(f"⚠️ Anomalie rilevate ({len(salti_mese)} coefficienti)"):
+                if anomalie.mesi is not None:
+                    st.caption("Controlli mensili su costo per colazione e giorni registrati")
+                    st.dataframe(
+                        anomalie.mesi.style.format({
+                            'Costo Medio per Colazione': '{:.2f} €',
+                            'Variazione su Mese Precedente (%)': '{:+.1f}',
+                            'Scarto Robusto': '{:.1f}',
+                            'Copertura Giorni': '{:.0%}'
+                        }, na_rep='-'),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                if not salti_mese.empty:
+                    st.caption(f"Coefficienti di {mese_selezionato} lontani dalla mediana dell'articolo")
+                    st.dataframe(
+                        salti_mese.drop(columns=['id', 'Mese']).style.format({
+                            'Coefficiente': '{:.5f}',
+                            'Mediana Articolo': '{:.5f}',
+                            'Rapporto': '{:.2f}'
+                        }),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
         with col2:
+            # Ingressi del grafo delle tabelle derivate per il mese selezionato
+            ingressi_mese = {
+                'archivio': archivio,
+                'mese': mese_selezionato,
+                'colazioni': COLATIONI_MENSILI.get(mese_selezionato, 0),
+                'classifiche': carica_classifiche(versione)
+            }
+            firme_mese = {'archivio': versione, 'classifiche': versione}
+
             # Mostra i top 10 coefficienti di consumo
-            if mese_selezionato in dati:
-                df_mese = dati[mese_selezionato].copy()
-                df_coefficienti = df_mese[df_mese['Coefficiente'] > 0].copy()
+            if mese_selezionato in archivio:
+                df_coefficienti = carica_grafo_tabelle().calcola('vista_mese', ingressi_mese, firme_mese)
 
                 if not df_coefficienti.empty:
                     st.subheader("📊 Top 10 Coefficienti di Consumo")
 
-                    # Ordina per coefficiente decrescente e prendi i top 10
-                    df_top_coefficienti = df_coefficienti.nlargest(10, 'Coefficiente')[['Articolo', 'Coefficiente', 'UDM']]
+                    # Top 10 dalla classifica precalcolata per coefficiente decrescente
+                    classifiche = carica_classifiche(versione)
+                    df_top_coefficienti = classifiche.ordina(
+                        df_coefficienti, classifiche.classifica(mese_selezionato, n=10)
+                    )[['Articolo', 'Coefficiente', 'UDM']]
 
                     # Crea un grafico a barre orizzontali
-                    fig_coeff = go.Figure()
-                    fig_coeff.add_trace(go.Bar(
-                        x=df_top_coefficienti['Coefficiente'],
-                        y=df_top_coefficienti['Articolo'],
-                        orientation='h',
-                        marker_color='#8B6914',
-                        text=df_top_coefficienti['Coefficiente'].apply(lambda x: f'{x:.5f}'),
-                        textposition='outside'
-                    ))
-
-                    fig_coeff.update_layout(
-                        title='Prodotti con Maggior Consumo per Colazione',
-                        xaxis_title='Coefficiente di Consumo',
-                        yaxis_title='Prodotto',
-                        height=400,
-                        plot_bgcolor='white',
-                        paper_bgcolor='white',
-                        font=dict(color='#333333'),
-                        xaxis=dict(
-                            showgrid=True,
-                            gridwidth=1,
-                            gridcolor='#E0E0E0'
-                        ),
-                        yaxis=dict(
-                            showgrid=False,
-                            autorange='reversed'
-                        ),
-                        margin=dict(l=200)
-                    )
+                    st.plotly_chart(grafici().grafico_top_coefficienti(df_top_coefficienti), use_container_width=True)
 
-                    st.plotly_chart(fig_coeff, use_container_width=True)
-
-                    # Mostra anche una tabella compatta
+                    # Mostra anche una tabella compatta, ordinata secondo il criterio scelto
                     with st.expander("📋 Vedi tutti i coefficienti"):
+                        criterio = st.selectbox(
+                            "Ordina per", classifiche.criteri(mese_selezionato), key="tab1_ordina_coefficienti"
+                        )
+                        ids_classifica = classifiche.classifica(mese_selezionato, criterio)
+                        df_classifica = classifiche.ordina(df_coefficienti, ids_classifica)[['Categoria', 'Articolo', 'Coefficiente', 'UDM']]
+                        if criterio != 'Coefficiente':
+                            df_classifica[criterio] = classifiche.valori[mese_selezionato][criterio][ids_classifica]
                         st.dataframe(
-                            df_coefficienti[['Categoria', 'Articolo', 'Coefficiente', 'UDM']].sort_values('Coefficiente', ascending=False).style.format({
-                                'Coefficiente': '{:.5f}'
-                            }),
+                            df_classifica.style.format({
+                                'Coefficiente': '{:.5f}',
+                                'Quantità': '{:,.2f}',
+                                'Costo': '{:,.2f} €'
+                            }, na_rep='-'),
                             use_container_width=True,
                             height=300
                         )
 
-            # Carica e mostra dati delle colazioni reali
+            # Mostra dati delle colazioni reali (già caricati nell'istantanea condivisa)
             try:
-                df_colazioni = pd.read_csv('colazionigiornalierecount2024.csv')
-                # Pulisci i nomi delle colonne rimuovendo spazi extra
-                df_colazioni.columns = df_colazioni.columns.str.strip()
-                # Converti la data nel formato corretto
-                df_colazioni['data'] = pd.to_datetime(df_colazioni['data'], format='%d/%m/%Y %H.%M.%S')
-                df_colazioni['mese'] = df_colazioni['data'].dt.month
-
                 # Filtra per il mese selezionato
                 mese_numero = [k for k, v in NOMI_MESI.items() if v == mese_selezionato][0]
-                df_mese_colazioni = df_colazioni[df_colazioni['mese'] == mese_numero]
+                df_mese_colazioni = archivio.colazioni_mese(mese_numero)
 
-                if not df_mese_colazioni.empty:
+                if df_mese_colazioni is not None and not df_mese_colazioni.empty:
                     colazioni_totali = df_mese_colazioni['CONSUMO REALE COLAZIONI'].sum()
 
                     # Mostra metriche di confronto
@@ -411,50 +455,12 @@ def main():
 
                     # Grafico di confronto giornaliero
                     st.subheader("Confronto Giornaliero")
-                    fig = go.Figure()
-
-                    # Aggiungi linea delle colazioni target
-                    fig.add_trace(go.Scatter(
-                        x=df_mese_colazioni['data'],
-                        y=[COLATIONI_MENSILI.get(mese_selezionato, 0)/len(df_mese_colazioni)] * len(df_mese_colazioni),
-                        name='Target Giornaliero',
-                        line=dict(color='#8B6914', dash='dash', width=2)
-                    ))
-
-                    # Aggiungi linea delle colazioni reali
-                    fig.add_trace(go.Scatter(
-                        x=df_mese_colazioni['data'],
-                        y=df_mese_colazioni['CONSUMO REALE COLAZIONI'],
-                        name='Colazioni Reali',
-                        line=dict(color='#D2691E', width=3)
-                    ))
-
-                    fig.update_layout(
-                        title=f'Confronto Target vs Colazioni Reali - {mese_selezionato}',
-                        xaxis_title='Data',
-                        yaxis_title='Numero Colazioni',
-                        hovermode='x unified',
-                        plot_bgcolor='white',
-                        paper_bgcolor='white',
-                        font=dict(color='#333333'),
-                        xaxis=dict(
-                            showgrid=True,
-                            gridwidth=1,
-                            gridcolor='#E0E0E0',
-                            showline=True,
-                            linewidth=1,
-                            linecolor='#E0E0E0'
-                        ),
-                        yaxis=dict(
-                            showgrid=True,
-                            gridwidth=1,
-                            gridcolor='#E0E0E0',
-                            showline=True,
-                            linewidth=1,
-                            linecolor='#E0E0E0'
-                        )
+                    # Target ripartito sulle colazioni previste di ogni giorno e giorni lontani dalla mediana mobile
+                    consumo_giornaliero = carica_consumo_giornaliero(versione)
+                    fig = grafici().grafico_confronto_giornaliero(
+                        consumo_giornaliero.target_mese(mese_selezionato), df_mese_colazioni,
+                        anomalie.giorni_mese(mese_numero), mese_selezionato
                     )
-
                     st.plotly_chart(fig, use_container_width=True)
 
                     # Tabella dettaglio giornaliero
@@ -470,16 +476,11 @@ def main():
             except Exception as e:
                 st.warning(f"Impossibile caricare i dati delle colazioni reali: {e}")
 
-            if mese_selezionato in dati:
-                df_mese = dati[mese_selezionato].copy()
-
-                # Filtra prodotti con coefficiente > 0
-                df_mese_filtrato = df_mese[df_mese['Coefficiente'] > 0].copy()
+            if mese_selezionato in archivio:
+                # Prodotti con coefficiente > 0 e consumo totale del mese, dal grafo delle tabelle derivate
+                df_mese_filtrato = carica_grafo_tabelle().calcola('consumo_mese', ingressi_mese, firme_mese)
 
                 if not df_mese_filtrato.empty:
-                    # Calcola consumo totale
-                    colazioni = COLATIONI_MENSILI.get(mese_selezionato, 0)
-                    df_mese_filtrato['Consumo Totale'] = df_mese_filtrato['Coefficiente'] * colazioni
 
                     # Aggiungi informazione sui coefficienti
                     st.subheader(f"📦 Consumi Prodotti - {mese_selezionato}")
@@ -503,12 +504,26 @@ def main():
                         height=400
                     )
 
+                    # Consumo previsto giorno per giorno, utile per pianificare consegne ravvicinate
+                    consumo_giornaliero = carica_consumo_giornaliero(versione)
+                    if consumo_giornaliero is not None and len(consumo_giornaliero.giorni_mese(mese_selezionato)):
+                        with st.expander("📅 Consumo previsto giornaliero"):
+                            df_giornaliero = consumo_giornaliero.tabella_mese(
+                                mese_selezionato, df_mese_filtrato.index.to_numpy()
+                            )
+                            df_giornaliero.index = df_mese_filtrato['Articolo'].to_numpy()
+                            st.dataframe(
+                                df_giornaliero.style.format('{:.2f}'),
+                                use_container_width=True,
+                                height=300
+                            )
+
                     # Download CSV
                     csv = df_mese_filtrato.to_csv(index=False).encode('utf-8')
                     st.download_button(
                         "Scarica dati come CSV",
                         csv,
-                        f"storico_colazioni_{mese_selezionato}_2024.csv",
+                        f"storico_colazioni_{mese_selezionato}_{anno_stagione}.csv",
                         "text/csv",
                         key='download-mensile'
                     )
@@ -516,26 +531,10 @@ def main():
                     # Grafico distribuzione categorie
                     st.subheader(f"Distribuzione Categorie - {mese_selezionato}")
 
-                    # Assicurati che Categoria non sia vuota
-                    df_categorie = df_mese_filtrato.dropna(subset=['Categoria'])
+                    # Solo le righe con Categoria non vuota
+                    df_categorie = carica_grafo_tabelle().calcola('categorie_mese', ingressi_mese, firme_mese)
                     if not df_categorie.empty:
-                        df_categorie = df_categorie.groupby('Categoria')['Consumo Totale'].sum().reset_index()
-                        df_categorie = df_categorie.sort_values('Consumo Totale', ascending=False)
-
-                        fig = px.pie(
-                            df_categorie,
-                            values='Consumo Totale',
-                            names='Categoria',
-                            title=f'Consumo per Categoria - {mese_selezionato}',
-                            color_discrete_sequence=['#8B6914', '#D2691E', '#CD853F', '#DEB887', '#F4A460', '#DAA520', '#B8860B', '#FFD700']
-                        )
-                        fig.update_traces(textposition='inside', textinfo='percent+label')
-                        fig.update_layout(
-                            plot_bgcolor='white',
-                            paper_bgcolor='white',
-                            font=dict(color='#333333')
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
+                        st.plotly_chart(grafici().grafico_categorie(df_categorie, mese_selezionato), use_container_width=True)
 
     # Tab 2: Confronto Mesi
     with tab2:
@@ -553,12 +552,7 @@ def main():
 
         with col2:
             # Selezione della categoria da confrontare
-            categorie_disponibili = set()
-            for mese in mesi_confronto:
-                if mese in dati:
-                    df_mese = dati[mese]
-                    categorie_mese = df_mese['Categoria'].dropna().unique()
-                    categorie_disponibili.update(categorie_mese)
+            categorie_disponibili = set(archivio.categorie(mesi_confronto))
 
             categoria_selezionata = st.selectbox(
                 "Seleziona categoria da confrontare",
@@ -570,9 +564,8 @@ def main():
             dati_confronto = []
 
             for mese in mesi_confronto:
-                if mese in dati:
-                    df_mese = dati[mese].copy()
-                    df_categoria = df_mese[df_mese['Categoria'] == categoria_selezionata].copy()
+                if mese in archivio:
+                    df_categoria = archivio.vista_mese(mese, categoria=categoria_selezionata)
 
                     if not df_categoria.empty:
                         presenze = COLATIONI_MENSILI.get(mese, 0)
@@ -599,38 +592,7 @@ def main():
                 )
 
                 # Grafico confronto consumi
-                fig = px.bar(
-                    df_confronto,
-                    x='Prodotto',
-                    y='Consumo Totale',
-                    color='Mese',
-                    title=f'Confronto Consumi per Mese - {categoria_selezionata}',
-                    barmode='group',
-                    color_discrete_sequence=['#8B6914', '#D2691E', '#CD853F', '#DEB887', '#F4A460', '#DAA520', '#B8860B']
-                )
-                fig.update_layout(
-                    plot_bgcolor='white',
-                    paper_bgcolor='white',
-                    font=dict(color='#333333'),
-                    xaxis=dict(
-                        showgrid=True,
-                        gridwidth=1,
-                        gridcolor='#E0E0E0',
-                        showline=True,
-                        linewidth=1,
-                        linecolor='#E0E0E0'
-                    ),
-                    yaxis=dict(
-                        showgrid=True,
-                        gridwidth=1,
-                        gridcolor='#E0E0E0',
-                        showline=True,
-                        linewidth=1,
-                        linecolor='#E0E0E0'
-                    ),
-                    xaxis_tickangle=-45
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(grafici().grafico_confronto_mesi(df_confronto, categoria_selezionata), use_container_width=True)
 
                 # Download confronto
                 csv_confronto = df_confronto.to_csv(index=False).encode('utf-8')
@@ -652,14 +614,60 @@ def main():
             # Selezione del mese di riferimento
             mese_riferimento = st.selectbox("Mese di riferimento", mesi_disponibili, key="tab3_mese")
 
-            # Input diretto del numero di colazioni
-            num_colazioni = st.number_input(
-                "Numero di colazioni da preparare",
-                min_value=1,
-                value=100,
-                step=10
+            # Origine dei coefficienti: foglio del mese, mese normalizzato o tutti i mesi
+            fonte_coefficienti = st.selectbox(
+                "Coefficienti",
+                FONTI_COEFFICIENTI,
+                key="tab3_fonte_coefficienti",
+                help="I coefficienti normalizzati riportano le colazioni dei mesi registrati solo in parte "
+                     "all'intero periodo di servizio; 'Tutti i mesi' li combina pesando ogni mese per la sua copertura"
+            )
+
+            # Media degli ultimi mesi fino al mese di riferimento, con pesi configurabili
+            parametri_media = None
+            if fonte_coefficienti == FONTI_COEFFICIENTI[3]:
+                col_media1, col_media2 = st.columns(2)
+                with col_media1:
+                    n_mesi_media = st.number_input(
+                        "Mesi da combinare",
+                        min_value=1,
+                        max_value=len(mesi_disponibili),
+                        value=min(3, len(mesi_disponibili)),
+                        key="tab3_n_mesi"
+                    )
+                with col_media2:
+                    schema_pesi = st.selectbox("Pesi", SCHEMI_PESI, key="tab3_schema_pesi")
+                parametri_media = (int(n_mesi_media), schema_pesi)
+
+            # Colazioni per segmento (HOTEL, RESIDENCE, ...) oppure numero complessivo
+            pianifica_segmenti = st.checkbox(
+                "Pianifica per segmento",
+                key="tab3_segmenti",
+                help="Usa coefficienti stimati per segmento su tutti i mesi disponibili"
             )
 
+            if pianifica_segmenti:
+                pax_segmento = {}
+                colonne_segmenti = st.columns(len(SEGMENTI))
+                for colonna_segmento, segmento in zip(colonne_segmenti, SEGMENTI):
+                    with colonna_segmento:
+                        pax_segmento[segmento] = st.number_input(
+                            segmento,
+                            min_value=0,
+                            value=100 if segmento == 'HOTEL' else 0,
+                            step=10,
+                            key=f"tab3_pax_{segmento}"
+                        )
+                num_colazioni = max(sum(pax_segmento.values()), 1)
+            else:
+                # Input diretto del numero di colazioni
+                num_colazioni = st.number_input(
+                    "Numero di colazioni da preparare",
+                    min_value=1,
+                    value=100,
+                    step=10
+                )
+
             # Buffer
             buffer_percentuale = st.slider(
                 "Buffer (%)",
@@ -672,9 +680,8 @@ def main():
         with col2:
             # Esclusione categorie
             categorie_disponibili = []
-            if mese_riferimento in dati:
-                df_mese = dati[mese_riferimento]
-                categorie_disponibili = df_mese['Categoria'].dropna().unique().tolist()
+            if mese_riferimento in archivio:
+                categorie_disponibili = archivio.categorie([mese_riferimento])
 
             escludere_prodotti = st.multiselect(
                 "Escludere categorie",
@@ -685,9 +692,7 @@ def main():
             include_giacenze = st.checkbox("Considera giacenze attuali")
 
         # Calcolo quantità
-        if mese_riferimento in dati:
-            df_mese = dati[mese_riferimento].copy()
-
+        if mese_riferimento in archivio:
             # Calcola numero giorni necessari in base al massimo giornaliero
             giorni_necessari = math.ceil(num_colazioni / MAX_PAX_GIORNALIERI)
             colazioni_giornaliere = round(num_colazioni / giorni_necessari, 2)
@@ -696,131 +701,86 @@ def main():
             st.info(f"Per {num_colazioni} colazioni servono almeno {giorni_necessari} giorni (massimo {MAX_PAX_GIORNALIERI} pax/giorno).\n"
                    f"Media giornaliera stimata: {colazioni_giornaliere} colazioni/giorno.")
 
-            # Filtra prodotti
-            mask = df_mese['Coefficiente'] > 0
-            if escludere_prodotti:
-                mask = mask & (~df_mese['Categoria'].isin(escludere_prodotti))
-
-            df_mese_filtrato = df_mese[mask].copy()
+            if mese_riferimento in mesi_sospetti:
+                st.warning(f"⚠️ {mese_riferimento} è segnalato come anomalo ({mesi_sospetti[mese_riferimento]}): "
+                           "valutare un altro mese di riferimento.")
 
-            # Ottieni dati sui costi dai dati di consumo
-            df_consumi = dati.get('consumi', None)
+            # Filtra prodotti
+            df_mese_filtrato = archivio.vista_mese(
+                mese_riferimento,
+                solo_positivi=True,
+                categorie_escluse=escludere_prodotti
+            )
 
-            if not df_mese_filtrato.empty:
-                # Calcola consumo previsto
-                df_mese_filtrato['Consumo Previsto'] = df_mese_filtrato['Coefficiente'] * num_colazioni
-
-                # Arricchisci con dati di costo
-                if df_consumi is not None:
-                    # Prepara un mapping di prodotti
-                    mapping_prodotti = {}
-                    for _, row in df_consumi.iterrows():
-                        desc = row['Descrizione']
-                        if pd.notna(desc):
-                            mapping_prodotti[desc] = {
-                                'costo_medio': row['Euro Medio'],
-                                'uma': row['U.M.A.'],
-                                'umc': row['U.M.C.'],
-                                'coeff_conv': row['Coeff Conv']
-                            }
-
-                    # Aggiungi colonne per il costo
-                    df_mese_filtrato['Costo Unitario'] = 0.0
-                    df_mese_filtrato['U.M.A.'] = ''
-                    df_mese_filtrato['U.M.C.'] = ''
-                    df_mese_filtrato['Costo Totale Previsto'] = 0.0
-
-                    # Cerca corrispondenza tra prodotti e dati di costo
-                    for idx, row in df_mese_filtrato.iterrows():
-                        prodotto = row['Articolo']
-                        for key, info in mapping_prodotti.items():
-                            if pd.notna(prodotto) and pd.notna(key) and (prodotto.upper() in key.upper() or key.upper() in prodotto.upper()):
-                                df_mese_filtrato.at[idx, 'Costo Unitario'] = info['costo_medio']
-                                df_mese_filtrato.at[idx, 'U.M.A.'] = info['uma']
-                                df_mese_filtrato.at[idx, 'U.M.C.'] = info['umc']
-                                df_mese_filtrato.at[idx, 'Costo Teorico Consumo'] = info['costo_medio'] * row['Consumo Previsto'] / info['coeff_conv']
-                                break
-
-                # Applica buffer
-                if buffer_percentuale > 0:
-                    fattore_buffer = 1 + (buffer_percentuale / 100)
-                    df_mese_filtrato['Quantità con Buffer'] = df_mese_filtrato['Consumo Previsto'] * fattore_buffer
-
-                    # Per quantità piccole, assicura che il buffer aggiunga almeno 1 unità
-                    df_mese_filtrato['Quantità con Buffer'] = df_mese_filtrato.apply(
-                        lambda row: max(row['Quantità con Buffer'], row['Consumo Previsto'] + 1)
-                        if row['Consumo Previsto'] < 10 and pd.notna(row.get('UDM')) and row['UDM'] in ['pz', 'kg', 'conf']
-                        else row['Quantità con Buffer'],
-                        axis=1
-                    )
+            # Coefficienti normalizzati per la copertura dei giorni registrati
+            normalizzati = carica_coefficienti_normalizzati(versione) if fonte_coefficienti != FONTI_COEFFICIENTI[0] else None
+            if normalizzati is not None:
+                copertura, matrice_normalizzata, coefficienti_tutti_mesi = normalizzati
+                riga_copertura = copertura.loc[mese_riferimento]
+                st.caption(f"{mese_riferimento}: {riga_copertura['Giorni Registrati']} giorni registrati su "
+                           f"{riga_copertura['Giorni di Servizio']} di servizio ({riga_copertura['Copertura']:.0%}).")
+                ids = df_mese_filtrato.index.to_numpy()
+                if fonte_coefficienti == FONTI_COEFFICIENTI[1]:
+                    df_mese_filtrato['Coefficiente'] = matrice_normalizzata[ids, archivio.indice_mese(mese_riferimento)]
                 else:
-                    df_mese_filtrato['Quantità con Buffer'] = df_mese_filtrato['Consumo Previsto']
-
-                # Calcola il costo dell'ordine con buffer
-                if 'Costo Unitario' in df_mese_filtrato.columns:
-                    df_mese_filtrato['Costo Ordine con Buffer'] = df_mese_filtrato['Quantità con Buffer'] * df_mese_filtrato['Costo Unitario']
-
-                # Arrotonda quantità preservando l'effetto del buffer
-                df_mese_filtrato['Quantità con Buffer'] = df_mese_filtrato.apply(
-                    lambda row: math.ceil(row['Quantità con Buffer'])  # Arrotonda sempre per eccesso
-                    if pd.notna(row.get('UDM')) and row['UDM'] in ['pz', 'kg', 'conf']
-                    else round(row['Quantità con Buffer'], 2),
-                    axis=1
-                )
-
-                # Inizializza le colonne 'Giacenza' e 'Da Ordinare'
-                df_mese_filtrato['Giacenza'] = 0.0
-                df_mese_filtrato['Da Ordinare'] = 0.0
+                    if fonte_coefficienti == FONTI_COEFFICIENTI[2]:
+                        pesi_mesi = copertura['Copertura'].reindex(archivio.mesi).to_numpy()
+                        pesi_validi = anomalie.escludi_mesi(archivio.mesi, pesi_mesi)
+                        df_mese_filtrato['Coefficiente'] = coefficienti_tutti_mesi[ids]
+                    else:
+                        pesi_mesi = pesi_ultimi_mesi(archivio.mesi, mese_riferimento, *parametri_media)
+                        pesi_validi = anomalie.escludi_mesi(archivio.mesi, pesi_mesi)
+                        df_mese_filtrato['Coefficiente'] = combina_coefficienti(matrice_normalizzata[ids], pesi_validi)
+                        st.caption("Pesi: " + ", ".join(
+                            f"{mese} {peso / pesi_validi.sum():.0%}"
+                            for mese, peso in zip(archivio.mesi, pesi_validi) if peso > 0
+                        ))
+                    esclusi = [mese for mese, peso, valido in zip(archivio.mesi, pesi_mesi, pesi_validi)
+                               if peso > 0 and valido == 0]
+                    if esclusi:
+                        st.caption("Mesi anomali esclusi dai coefficienti: " + ", ".join(esclusi))
 
+            if not df_mese_filtrato.empty:
+                df_giacenze = None
                 if include_giacenze:
                     st.subheader("Carica il file Excel con le Giacenze")
                     uploaded_file = st.file_uploader("Scegli il file giacenze_magazzino.xlsx", type=['xlsx', 'xls'])
 
+                    # Lettura in background: la pagina resta utilizzabile anche con file grandi
                     if uploaded_file is not None:
-                        try:
-                            # Legge il file excel usando la colonna 'Magazz.' e gestendo i decimali con la virgola
-                            df_giacenze = pd.read_excel(
-                                uploaded_file,
-                                usecols=['Descrizione', 'Magazz.'], # Leggi solo le colonne necessarie
-                                decimal=','                      # Imposta la virgola come separatore decimale
-                            )
-
-                            # Rinomina le colonne per la logica successiva dello script
-                            df_giacenze.columns = ['Articolo', 'Giacenza']
-
-                            # Converte la colonna Giacenza in numerico, gestendo errori
-                            df_giacenze['Giacenza'] = pd.to_numeric(df_giacenze['Giacenza'], errors='coerce')
-
-                            # Sostituisce i valori non numerici con 0
-                            df_giacenze['Giacenza'] = df_giacenze['Giacenza'].fillna(0)
-
-                            # Unisce i dati delle giacenze con il dataframe principale
-                            df_mese_filtrato = pd.merge(
-                                df_mese_filtrato.drop(columns=['Giacenza']),
-                                df_giacenze,
-                                on='Articolo',
-                                how='left'
-                            )
-
-                            # Sostituisce le giacenze non trovate (NaN) con 0
-                            df_mese_filtrato['Giacenza'] = df_mese_filtrato['Giacenza'].fillna(0)
-
+                        caricamento = carica_elaborazione_caricamenti().invia(
+                            'giacenze', uploaded_file.getvalue(), uploaded_file.name
+                        )
+                        caricamento.attendi(ATTESA_BREVE)
+                        if mostra_caricamento(caricamento, "tab3_aggiorna_giacenze"):
+                            df_giacenze = caricamento.risultato
                             st.success("File giacenze caricato usando la colonna 'Magazz.'!")
 
-                        except Exception as e:
-                            st.error(f"⚠️ Errore durante la lettura del file Excel: {e}")
-
-                # Calcola la quantità da ordinare usando le giacenze appena caricate
-                df_mese_filtrato['Da Ordinare'] = df_mese_filtrato['Quantità con Buffer'] - df_mese_filtrato['Giacenza']
-                # Assicura che la quantità da ordinare non sia mai negativa
-                df_mese_filtrato['Da Ordinare'] = df_mese_filtrato['Da Ordinare'].apply(lambda x: max(0, x))
-
-                # Arrotonda la quantità da ordinare
-                df_mese_filtrato['Da Ordinare'] = df_mese_filtrato.apply(
-                    lambda row: round(row['Da Ordinare'])
-                    if pd.notna(row.get('UDM')) and row['UDM'] in ['pz', 'kg', 'g', 'conf']
-                    else round(row['Da Ordinare'], 2),
-                    axis=1
+                # Consumo previsto dai coefficienti per segmento
+                consumo_segmenti = None
+                if pianifica_segmenti:
+                    coefficienti_segmento = carica_coefficienti_segmento(versione, normalizzati is not None)
+                    consumo_segmenti = consumo_per_segmento(coefficienti_segmento, pax_segmento)[df_mese_filtrato.index.to_numpy()]
+
+                # Ordine calcolato una sola volta per combinazione di input e versione dei dati
+                chiave_ordine = chiave_risultato(
+                    'ordine', versione, mese_riferimento, fonte_coefficienti, parametri_media, num_colazioni,
+                    pax_segmento if pianifica_segmenti else None, buffer_percentuale,
+                    sorted(escludere_prodotti), include_giacenze, impronta_dataframe(df_giacenze)
+                )
+                ingressi_ordine = {
+                    'vista_ordine': df_mese_filtrato,
+                    'num_colazioni': num_colazioni,
+                    'consumo_segmenti': consumo_segmenti,
+                    'storico_prezzi': carica_storico_prezzi(versione),
+                    'mese_prezzi': NUMERI_MESI[mese_riferimento],
+                    'buffer_percentuale': buffer_percentuale,
+                    'include_giacenze': include_giacenze,
+                    'giacenze': df_giacenze
+                }
+                df_mese_filtrato = carica_cache_risultati().ottieni(
+                    chiave_ordine, calcola_ordine_grafo,
+                    carica_grafo_tabelle(), ingressi_ordine, {'storico_prezzi': versione}
                 )
 
                 # Mostra la tabella finale con i risultati
@@ -829,7 +789,7 @@ def main():
                 # Mostra info sul buffer applicato
                 if buffer_percentuale > 0:
                     st.info(f"📊 Buffer del {buffer_percentuale}% applicato. Per quantità < 10 unità, il buffer garantisce almeno +1 unità.")
-                cols_display = ['Categoria', 'Articolo', 'UDM', 'Coefficiente', 'Consumo Previsto', 'Quantità con Buffer']
+                cols_display = ['Categoria', 'Articolo', 'UDM', 'Coefficiente', 'Consumo Previsto', 'Quantità con Buffer', 'Buffer Applicato']
 
                 if include_giacenze:
                     cols_display.extend(['Giacenza', 'Da Ordinare'])
@@ -838,27 +798,21 @@ def main():
                 costo_totale_ordine = 0
                 if 'Costo Unitario' in df_mese_filtrato.columns:
                     cols_display.extend(['Costo Unitario'])
+                    st.caption(f"Costi unitari: ultimo Euro Medio registrato entro {mese_riferimento} "
+                               "(il primo successivo per i prodotti acquistati solo dopo).")
                     # Se NON ci sono giacenze, mostra il costo dell'ordine con buffer
                     if not include_giacenze:
                         cols_display.append('Costo Ordine con Buffer')
                         costo_totale_ordine = df_mese_filtrato['Costo Ordine con Buffer'].sum()
                         if costo_totale_ordine > 0:
                             st.metric("Costo Totale Ordine (con buffer)", f"{costo_totale_ordine:,.2f} €")
-                    # Se CI SONO giacenze, calcola il costo effettivo da ordinare
-                    elif 'Da Ordinare' in df_mese_filtrato.columns:
-                        df_mese_filtrato['Costo Ordine Effettivo'] = df_mese_filtrato['Da Ordinare'] * df_mese_filtrato['Costo Unitario']
+                    # Se CI SONO giacenze, mostra il costo effettivo da ordinare
+                    else:
                         costo_totale_ordine = df_mese_filtrato['Costo Ordine Effettivo'].sum()
                         if costo_totale_ordine > 0:
                             st.metric("Costo Totale Ordine Effettivo", f"{costo_totale_ordine:,.2f} €")
                         cols_display.append('Costo Ordine Effettivo')
 
-                # Aggiungi colonna per mostrare la differenza del buffer
-                df_mese_filtrato['Buffer Applicato'] = df_mese_filtrato['Quantità con Buffer'] - df_mese_filtrato['Consumo Previsto']
-
-                # Inserisci la colonna Buffer Applicato dopo Quantità con Buffer
-                idx_buffer = cols_display.index('Quantità con Buffer') + 1
-                cols_display.insert(idx_buffer, 'Buffer Applicato')
-
                 st.dataframe(
                     df_mese_filtrato[cols_display].style.format({
                         'Coefficiente': '{:.4f}',
@@ -875,39 +829,112 @@ def main():
                     height=400
                 )
 
-                # Lista ordinata per il report (solo se giacenze sono incluse)
-                if include_giacenze and 'Da Ordinare' in df_mese_filtrato.columns:
-                    st.subheader("Report Ordine")
+                # Piano consegne: suddivide l'ordine secondo i calendari dei fornitori e la conservazione
+                with st.expander("🚚 Piano Consegne"):
+                    oggi = datetime.now().date()
+                    periodo = st.date_input(
+                        "Periodo da coprire",
+                        value=(oggi, oggi + timedelta(days=max(giorni_necessari, 7) - 1)),
+                        key="tab3_periodo_consegne"
+                    )
 
-                    # Filtra solo prodotti da ordinare
-                    df_da_ordinare = df_mese_filtrato[df_mese_filtrato['Da Ordinare'] > 0].copy()
+                    if isinstance(periodo, (tuple, list)) and len(periodo) == 2:
+                        giorni_periodo = pd.date_range(periodo[0], periodo[1], freq='D')
+                        pax_giornalieri = num_colazioni / len(giorni_periodo)
+                        if pax_giornalieri > MAX_PAX_GIORNALIERI:
+                            st.warning(f"{pax_giornalieri:.0f} colazioni/giorno superano il massimo di {MAX_PAX_GIORNALIERI} pax/giorno.")
+
+                        # Colazioni e consumi ripartiti tra le consegne secondo la previsione giornaliera
+                        consumo_giornaliero = carica_consumo_giornaliero(versione)
+                        piano_consegne = pianifica_consegne(
+                            df_mese_filtrato, giorni_periodo, pax_giornalieri, buffer_percentuale,
+                            consumo_giornaliero=consumo_giornaliero
+                        )
+                        st.caption(f"{num_colazioni} colazioni su {len(giorni_periodo)} giorni "
+                                   f"({pax_giornalieri:.1f} colazioni/giorno in media), ripartite tra le consegne "
+                                   "secondo il consumo previsto nei giorni corrispondenti della stagione.")
+                        st.dataframe(
+                            descrivi_calendari(df_mese_filtrato['Categoria'].dropna().unique()).style.format(na_rep='-'),
+                            use_container_width=True,
+                            hide_index=True
+                        )
 
-                    if not df_da_ordinare.empty:
-                        # Ordina per categoria
-                        df_da_ordinare = df_da_ordinare.sort_values(['Categoria', 'Articolo'])
+                        if (piano_consegne['Giorni Scoperti'] > 0).any():
+                            st.warning("Alcune consegne non coprono il periodo fino alla successiva per la conservazione limitata: "
+                                       "verificare i giorni scoperti nel CSV.")
 
-                        # Crea report per categoria
-                        categorie_ordine = df_da_ordinare['Categoria'].unique()
+                        st.dataframe(
+                            tabella_consegne(piano_consegne).style.format('{:,.2f}'),
+                            use_container_width=True,
+                            height=400
+                        )
 
-                        report_text = f"ORDINE COLAZIONI - {datetime.now().strftime('%d/%m/%Y')}\n"
-                        report_text += f"Numero colazioni: {num_colazioni} (Buffer: {buffer_percentuale}%)\n"
-                        report_text += f"Distribuzione: {colazioni_giornaliere} colazioni/giorno per {giorni_necessari} giorni\n\n"
+                        csv_consegne = piano_consegne.to_csv(index=False, date_format='%d/%m/%Y').encode('utf-8')
+                        st.download_button(
+                            "Scarica Piano Consegne come CSV",
+                            csv_consegne,
+                            f"piano_consegne_{periodo[0].strftime('%Y%m%d')}_{periodo[1].strftime('%Y%m%d')}.csv",
+                            "text/csv",
+                            key='download-piano-consegne'
+                        )
+                    else:
+                        st.info("Seleziona data di inizio e di fine del periodo.")
 
-                        for categoria in categorie_ordine:
-                            report_text += f"--- {str(categoria).upper()} ---\n"
-                            prodotti_cat = df_da_ordinare[df_da_ordinare['Categoria'] == categoria]
+                # Cartella di lavoro Excel dell'ordine, scritta in background e servita dalla cache
+                with st.expander("📥 Esporta Excel"):
+                    esportatore = carica_esportatore_excel()
+                    chiave_excel = chiave_risultato('excel-ordine', chiave_ordine, cols_display)
+                    contenuto_excel = esportatore.pronto(chiave_excel)
+                    errore_excel = esportatore.errore(chiave_excel)
 
-                            for _, row in prodotti_cat.iterrows():
-                                costo_info = ""
-                                if 'Costo Unitario' in row and pd.notna(row['Costo Unitario']) and row['Costo Unitario'] > 0:
-                                    costo_info = f" - {row['Costo Unitario']:.2f}€/unità"
+                    if contenuto_excel is not None:
+                        st.download_button(
+                            "Scarica Ordine in Excel",
+                            contenuto_excel,
+                            f"ordine_colazioni_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            key='download-ordine-excel'
+                        )
+                    elif esportatore.in_preparazione(chiave_excel):
+                        st.info("File Excel in preparazione: aggiorna tra qualche istante.")
+                        st.button("Aggiorna", key="tab3_aggiorna_excel")
+                    else:
+                        if errore_excel is not None:
+                            st.error(f"⚠️ Errore durante la preparazione del file Excel: {errore_excel}")
+                        st.caption("Fogli: ordine, totali per categoria, riepilogo mensile e matrice dei coefficienti.")
+                        if st.button("Prepara file Excel", key="tab3_prepara_excel"):
+                            contenuto_excel = esportatore.avvia(
+                                chiave_excel, fogli_ordine,
+                                df_mese_filtrato, cols_display, carica_riepilogo_mensile(versione), carica_dati(versione)
+                            )
+                            # Cache non leggibile: il file è stato generato subito e si scarica da qui
+                            if contenuto_excel is not None:
+                                st.download_button(
+                                    "Scarica Ordine in Excel",
+                                    contenuto_excel,
+                                    f"ordine_colazioni_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                    key='download-ordine-excel'
+                                )
+                            else:
+                                st.info("File Excel in preparazione: aggiorna tra qualche istante.")
+                                st.button("Aggiorna", key="tab3_aggiorna_excel")
 
-                                report_text += f"{row['Articolo']}: {row['Da Ordinare']} {row['UDM']}{costo_info}\n"
+                # Lista ordinata per il report (solo se giacenze sono incluse)
+                if include_giacenze and 'Da Ordinare' in df_mese_filtrato.columns:
+                    st.subheader("Report Ordine")
 
-                            report_text += "\n"
+                    # Report e CSV serviti dalla cache finché non cambiano ordine o giorno
+                    data_ordine = datetime.now()
+                    report_ordine = carica_cache_risultati().ottieni(
+                        chiave_risultato('report-ordine', chiave_ordine, data_ordine.strftime('%Y%m%d')),
+                        prepara_report_ordine,
+                        df_mese_filtrato, num_colazioni, buffer_percentuale, colazioni_giornaliere,
+                        giorni_necessari, costo_totale_ordine, data_ordine, carica_classifiche(versione)
+                    )
 
-                        if costo_totale_ordine > 0:
-                            report_text += f"\nCosto totale stimato: {costo_totale_ordine:.2f} €\n"
+                    if report_ordine is not None:
+                        report_text, csv_ordine = report_ordine
 
                         # Mostra e permetti download
                         st.text_area("Report Ordine", report_text, height=300)
@@ -915,20 +942,93 @@ def main():
                         st.download_button(
                             "Scarica Report Ordine",
                             report_text,
-                            f"ordine_colazioni_{datetime.now().strftime('%Y%m%d')}.txt",
+                            f"ordine_colazioni_{data_ordine.strftime('%Y%m%d')}.txt",
                             key="download-report"
                         )
 
                         # Download CSV dell'ordine
-                        csv_ordine = df_da_ordinare.to_csv(index=False).encode('utf-8')
                         st.download_button(
                             "Scarica Ordine come CSV",
                             csv_ordine,
-                            f"ordine_colazioni_{datetime.now().strftime('%Y%m%d')}.csv",
+                            f"ordine_colazioni_{data_ordine.strftime('%Y%m%d')}.csv",
                             "text/csv",
                             key='download-ordine-csv'
                         )
 
+    # Tab 4: Scostamenti dei costi reali tra mesi consecutivi
+    with tab4:
+        st.subheader("Scomposizione della Variazione dei Costi")
+
+        df_variazioni = carica_variazioni_costi(versione)
+        if df_variazioni is None or df_variazioni.empty:
+            st.info("Servono i consumi e le colazioni di almeno due mesi per confrontare i costi.")
+        else:
+            st.caption(
+                "Variazione del costo reale rispetto al mese precedente, divisa in effetto volume (colazioni servite), "
+                "mix (consumo per colazione) e prezzo (Euro Medio). Il residuo deriva dagli arrotondamenti dei consumi."
+            )
+            mesi_variazione = list(pd.unique(df_variazioni['Mese']))
+
+            col1, col2 = st.columns(2)
+            with col1:
+                mese_variazione = st.selectbox("Mese", mesi_variazione, index=len(mesi_variazione) - 1,
+                                               key="tab4_mese")
+            with col2:
+                livello_variazione = st.selectbox("Dettaglio per", ['Categoria', 'Classe', 'Prodotto'],
+                                                  key="tab4_livello")
+
+            df_variazioni_mese = df_variazioni[df_variazioni['Mese'] == mese_variazione]
+            totale = totali_variazioni(df_variazioni_mese).iloc[0]
+            mese_precedente = totale['Mese Precedente']
+
+            col_var1, col_var2, col_var3 = st.columns(3)
+            with col_var1:
+                st.metric(f"Costo {mese_precedente}", f"{totale['Costo Precedente']:,.2f} €")
+            with col_var2:
+                st.metric(f"Costo {mese_variazione}", f"{totale['Costo']:,.2f} €")
+            with col_var3:
+                st.metric("Variazione", f"{totale['Variazione']:+,.2f} €")
+
+            # Costo reale rispetto a quello previsto da coefficienti × colazioni × prezzo
+            con_teorico = df_variazioni_mese['Costo Teorico'].notna()
+            col_teo1, col_teo2, col_teo3 = st.columns(3)
+            with col_teo1:
+                st.metric(f"Costo Teorico {mese_variazione}", f"{totale['Costo Teorico']:,.2f} €")
+            with col_teo2:
+                st.metric("Costo Reale degli Stessi Prodotti", f"{df_variazioni_mese.loc[con_teorico, 'Costo'].sum():,.2f} €")
+            with col_teo3:
+                st.metric("Scostamento da Teorico", f"{totale['Scostamento da Teorico']:+,.2f} €")
+            st.caption(
+                "Il costo teorico è coefficiente dei fogli mensili × colazioni servite × prezzo del mese; "
+                f"è calcolato per {con_teorico.sum()} prodotti su {len(con_teorico)}, quelli abbinati a un articolo dei fogli."
+            )
+
+            # Cascata dal costo del mese precedente a quello del mese selezionato
+            st.plotly_chart(grafici().grafico_variazioni(totale, mese_precedente, mese_variazione), use_container_width=True)
+
+            # Effetti per categoria, classe o prodotto, dal più grande in valore assoluto
+            chiave_variazione = 'Descrizione' if livello_variazione == 'Prodotto' else livello_variazione
+            df_dettaglio_variazioni = (
+                totali_variazioni(df_variazioni_mese, chiave_variazione)
+                .drop(columns=['Mese', 'Mese Precedente'])
+                .sort_values('Variazione', key=lambda valori: valori.abs(), ascending=False)
+            )
+            st.dataframe(
+                df_dettaglio_variazioni.style.format(
+                    {colonna: '{:,.2f} €' for colonna in df_dettaglio_variazioni.columns[1:]}
+                ),
+                use_container_width=True,
+                height=400
+            )
+
+            csv_variazioni = df_variazioni.to_csv(index=False).encode('utf-8')
+            st.download_button(
+                "Scarica scomposizione come CSV",
+                csv_variazioni,
+                "analisi_varianza_costi.csv",
+                "text/csv",
+                key='download-varianza'
+            )
 
 if __name__ == "__main__":
     main()
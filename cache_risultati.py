@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+# Posizione e dimensione massima della cache su disco dei risultati
+CARTELLA_CACHE = '.cache'
+FILE_CACHE = 'risultati.sqlite'
+DIMENSIONE_MASSIMA_CACHE = 64 * 1024 * 1024
+
+# Da incrementare quando cambia il calcolo: invalida i risultati salvati in precedenza
+VERSIONE_CALCOLO = 5
+
+# Segnaposto per una chiave assente, distinto da un risultato None salvato
+ASSENTE = object()
+
+
+def impronta_dataframe(df):
+    """Impronta del contenuto di un DataFrame (None se assente), stabile tra esecuzioni"""
+    if df is None:
+        return None
+    hash_righe = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    firma = hashlib.sha256(hash_righe.tobytes())
+    firma.update(json.dumps([str(c) for c in df.columns]).encode('utf-8'))
+    return firma.hexdigest()
+
+
+def _ripristina_mancanti(valore):
+    """Riporta i mancanti delle colonne testuali di un DataFrame al singolo np.nan.
+
+    Dopo pickle ogni NaN è un float distinto e lo Styler di st.dataframe lo
+    mostrerebbe come testo 'nan' invece di una cella vuota.
+    """
+    if isinstance(valore, pd.DataFrame):
+        for nome in valore.select_dtypes(include='object').columns:
+            colonna = valore[nome].to_numpy().copy()
+            colonna[pd.isna(colonna)] = np.nan
+            valore[nome] = colonna
+    return valore
+
+
+def chiave_risultato(*parti):
+    """Chiave di cache: hash SHA-256 degli input serializzati in JSON"""
+    testo = json.dumps([VERSIONE_CALCOLO, *parti], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(testo.encode('utf-8')).hexdigest()
+
+
+class CacheRisultati:
+    """Cache persistente dei risultati indirizzata per contenuto, su un file SQLite.
+
+    Ogni risultato è salvato con pickle sotto la chiave calcolata dagli input
+    (vedi chiave_risultato), quindi sopravvive ai riavvii del server ed è
+    condiviso da tutte le sessioni. Superata la dimensione massima vengono
+    eliminati i risultati usati meno di recente. Ogni operazione apre una
+    propria connessione, così la cache si può usare da più thread.
+
+    Un errore del database non blocca mai il calcolo: il risultato viene
+    ricalcolato e semplicemente non salvato.
+    """
+
+    def __init__(self, percorso=os.path.join(CARTELLA_CACHE, FILE_CACHE),
+                 dimensione_massima=DIMENSIONE_MASSIMA_CACHE):
+        self.percorso = percorso
+        self.dimensione_massima = dimensione_massima
+        cartella = os.path.dirname(percorso)
+        if cartella:
+            os.makedirs(cartella, exist_ok=True)
+        connessione = self._connessione()
+        try:
+            with connessione:
+                connessione.execute("""
+                    CREATE TABLE IF NOT EXISTS risultati (
+                        chiave TEXT PRIMARY KEY,
+                        valore BLOB NOT NULL,
+                        dimensione INTEGER NOT NULL,
+                        ultimo_accesso REAL NOT NULL
+                    )
+                """)
+                connessione.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_accesso ON risultati (ultimo_accesso)")
+        finally:
+            connessione.close()
+
+    def _connessione(self):
+        connessione = sqlite3.connect(self.percorso, timeout=10)
+        connessione.execute("PRAGMA journal_mode=WAL")
+        return connessione
+
+    def leggi(self, chiave, predefinito=None):
+        """Risultato salvato per la chiave, oppure `predefinito` se non è salvato"""
+        connessione = self._connessione()
+        try:
+            with connessione:
+                riga = connessione.execute("SELECT valore FROM risultati WHERE chiave = ?", (chiave,)).fetchone()
+                if riga is None:
+                    return predefinito
+                connessione.execute("UPDATE risultati SET ultimo_accesso = ? WHERE chiave = ?", (time.time(), chiave))
+        finally:
+            connessione.close()
+        return _ripristina_mancanti(pickle.loads(riga[0]))
+
+    def scrivi(self, chiave, valore):
+        """Salva un risultato ed elimina i meno recenti oltre la dimensione massima"""
+        dati = pickle.dumps(valore, protocol=pickle.HIGHEST_PROTOCOL)
+        connessione = self._connessione()
+        try:
+            with connessione:
+                connessione.execute(
+                    "INSERT OR REPLACE INTO risultati (chiave, valore, dimensione, ultimo_accesso) VALUES (?, ?, ?, ?)",
+                    (chiave, sqlite3.Binary(dati), len(dati), time.time())
+                )
+                # Somma cumulativa dal più recente: oltre il limite si elimina
+                connessione.execute("""
+                    DELETE FROM risultati WHERE chiave IN (
+                        SELECT chiave FROM (
+                            SELECT chiave, SUM(dimensione) OVER (ORDER BY ultimo_accesso DESC, chiave) AS cumulata
+                            FROM risultati
+                        ) WHERE cumulata > ?
+                    )
+                """, (self.dimensione_massima,))
+        finally:
+            connessione.close()
+
+    def ottieni(self, chiave, calcola, *parametri, **opzioni):
+        """Restituisce il risultato salvato o lo calcola con calcola(*parametri, **opzioni) e lo salva.
+
+        Anche un risultato None viene salvato e restituito senza ricalcolarlo.
+        """
+        try:
+            risultato = self.leggi(chiave, ASSENTE)
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            risultato = ASSENTE
+        if risultato is not ASSENTE:
+            return risultato
+
+        risultato = calcola(*parametri, **opzioni)
+        try:
+            self.scrivi(chiave, risultato)
+        except (sqlite3.Error, pickle.PicklingError):
+            pass
+        return risultato
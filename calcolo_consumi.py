@@ -1,30 +1,56 @@
+import os
+
 import pandas as pd
 
+FILE_OUTPUT = 'consumi_giornalieri.csv'
+
 # Dati mensili
-data = {
+DATI_MENSILI = {
     'Mese': ['Aprile', 'Maggio', 'Giugno', 'Luglio', 'Agosto', 'Settembre', 'Ottobre'],
     'Colazioni_Servite': [1279, 3459, 4896, 5199, 5159, 4337, 3202],
     'Costo_Totale': [8883.02, 15004.04, 18966.23, 22540.99, 21773.70, 19710.02, 13749.44],
     'Giorni_Mese': [30, 31, 30, 31, 31, 30, 31]  # Numero di giorni in ogni mese
 }
 
-# Crea DataFrame
-df = pd.DataFrame(data)
 
-# Calcola costo medio per colazione
-df['Costo_Medio_per_Colazione'] = df['Costo_Totale'] / df['Colazioni_Servite']
+def calcola_consumi_giornalieri(dati=None):
+    """Calcola costi e colazioni medie giornaliere a partire dai totali mensili"""
+    # Crea DataFrame
+    df = pd.DataFrame(dati if dati is not None else DATI_MENSILI)
+
+    # Calcola costo medio per colazione
+    df['Costo_Medio_per_Colazione'] = df['Costo_Totale'] / df['Colazioni_Servite']
+
+    # Calcola consumo giornaliero medio
+    df['Consumo_Giornaliero'] = df['Costo_Totale'] / df['Giorni_Mese']
+
+    # Calcola colazioni giornaliere medie
+    df['Colazioni_Giornaliere'] = df['Colazioni_Servite'] / df['Giorni_Mese']
+
+    return df
+
+
+def salva_risultati(df, file_output=FILE_OUTPUT):
+    """Salva i risultati in CSV e li stampa con tutti i decimali"""
+    df.to_csv(file_output, index=False)
+    print("File CSV creato con successo!")
+
+    with pd.option_context('display.float_format', lambda x: '%.4f' % x):
+        print("\nRisultati:")
+        print(df.to_string())
+
+
+def genera_report(dati, cartella_output='.'):
+    """Report 'consumi': costi e colazioni medie giornaliere dai totali mensili fissi"""
+    df = calcola_consumi_giornalieri()
+    salva_risultati(df, os.path.join(cartella_output, FILE_OUTPUT))
+    return df
 
-# Calcola consumo giornaliero medio
-df['Consumo_Giornaliero'] = df['Costo_Totale'] / df['Giorni_Mese']
 
-# Calcola colazioni giornaliere medie
-df['Colazioni_Giornaliere'] = df['Colazioni_Servite'] / df['Giorni_Mese']
+def main(argv=None):
+    from colazioni_cli import esegui_report_singolo
+    esegui_report_singolo('consumi', argv)
 
-# Salva in CSV
-df.to_csv('consumi_giornalieri.csv', index=False)
-print("File CSV creato con successo!")
 
-# Stampa i risultati con tutti i decimali
-pd.set_option('display.float_format', lambda x: '%.4f' % x)
-print("\nRisultati:")
-print(df.to_string()) 
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -1,89 +1,96 @@
+import os
+
 import pandas as pd
-import numpy as np
-from datetime import datetime
-
-# Carica i dati delle colazioni giornaliere
-df_colazioni = pd.read_csv('colazionigiornalierecount2024.csv')
-df_colazioni.columns = df_colazioni.columns.str.strip()
-df_colazioni['data'] = pd.to_datetime(df_colazioni['data'], format='%d/%m/%Y %H.%M.%S')
-df_colazioni['mese'] = df_colazioni['data'].dt.month
-
-# Carica i dati dei prodotti dal file Excel
-def carica_dati_mensili(file_excel, mese):
-    try:
-        # Salta le prime 3 righe che contengono l'intestazione
-        df = pd.read_excel(file_excel, sheet_name=mese, skiprows=3)
-        # Rimuovi righe con tutti NA
-        df = df.dropna(how='all')
-        return df
-    except Exception as e:
-        print(f"Errore nel caricamento del foglio {mese}: {e}")
-        return None
-
-# Mappa numeri mesi a nomi
-nomi_mesi = {
-    4: 'Aprile',
-    5: 'Maggio',
-    6: 'Giugno',
-    7: 'Luglio',
-    8: 'Agosto',
-    9: 'Settembre',
-    10: 'Ottobre'
-}
-
-# Calcola statistiche per ogni mese
-risultati_mensili = []
-risultati_prodotti = []
-
-for num_mese, nome_mese in nomi_mesi.items():
-    # Filtra i dati delle colazioni per il mese corrente
-    dati_mese = df_colazioni[df_colazioni['mese'] == num_mese]
-    colazioni_totali = dati_mese['CONSUMO REALE COLAZIONI'].sum()
-    giorni_con_dati = len(dati_mese)
-    
-    # Carica i dati dei prodotti per il mese
-    df_prodotti = carica_dati_mensili('breakfast_dashboard.xlsx', nome_mese)
-    
-    if df_prodotti is not None:
-        # Calcola i costi per ogni prodotto
-        for _, prodotto in df_prodotti.iterrows():
-            if pd.notna(prodotto['Articolo']) and pd.notna(prodotto['Coefficiente']):
-                consumo_totale = prodotto['Coefficiente'] * colazioni_totali
-                costo_unitario = prodotto.get('Costo Unitario', 0)  # Aggiungi il nome corretto della colonna
-                costo_totale_prodotto = consumo_totale * costo_unitario
-                
-                risultati_prodotti.append({
-                    'Mese': nome_mese,
-                    'Categoria': prodotto.get('Categoria', ''),
-                    'Articolo': prodotto['Articolo'],
-                    'UDM': prodotto.get('UDM', ''),
-                    'Coefficiente': prodotto['Coefficiente'],
-                    'Consumo_Totale': consumo_totale,
-                    'Costo_Unitario': costo_unitario,
-                    'Costo_Totale_Prodotto': costo_totale_prodotto
-                })
-
-# Crea DataFrame con i risultati
-df_risultati_prodotti = pd.DataFrame(risultati_prodotti)
-
-# Raggruppa per mese e categoria
-df_summary = df_risultati_prodotti.groupby(['Mese', 'Categoria']).agg({
-    'Costo_Totale_Prodotto': 'sum',
-    'Consumo_Totale': 'sum'
-}).reset_index()
-
-# Formatta i numeri per una migliore leggibilità
-pd.set_option('display.float_format', lambda x: '{:.2f}'.format(x))
-
-# Stampa i risultati
-print("\nAnalisi costi per categoria e mese:")
-print(df_summary.to_string(index=False))
-
-# Stampa dettaglio prodotti
-print("\nDettaglio prodotti:")
-print(df_risultati_prodotti.sort_values(['Mese', 'Categoria', 'Articolo']).to_string(index=False))
-
-# Salva i risultati in CSV
-df_risultati_prodotti.to_csv('analisi_costi_prodotti.csv', index=False)
-df_summary.to_csv('analisi_costi_categorie.csv', index=False)
-print("\nFile di analisi creati con successo!") 
\ No newline at end of file
+
+from dati_comuni import NOMI_MESI, NUMERI_MESI, presenze_mensili
+from prezzi import StoricoPrezzi
+
+FILE_OUTPUT_PRODOTTI = 'analisi_costi_prodotti.csv'
+FILE_OUTPUT_CATEGORIE = 'analisi_costi_categorie.csv'
+
+
+def calcola_costi_prodotti(df_colazioni, fogli_mensili, df_consumi):
+    """Calcola consumo e costo di ogni prodotto per tutti i mesi in un unico passaggio.
+
+    Il costo unitario è il prezzo valido nel mese secondo lo storico dei
+    prezzi (vedi prezzi.StoricoPrezzi), lo stesso usato da ordini e
+    classifiche: l'Euro Medio dell'articolo nel mese o, se non è stato
+    movimentato, l'ultimo precedente (il primo successivo se non ce ne sono).
+    Le quantità dei fogli mensili sono già nell'unità di acquisto (U.M.A.),
+    quindi il prezzo si applica direttamente.
+    """
+    mesi = [nome for nome in NOMI_MESI.values() if nome in fogli_mensili]
+    colonne = ['Mese', 'Categoria', 'Articolo', 'UDM', 'Coefficiente', 'Consumo_Totale',
+               'Costo_Unitario', 'Costo_Totale_Prodotto']
+    if not mesi:
+        return pd.DataFrame(columns=colonne)
+
+    # Tutti i fogli in un unico frame, con nome e numero del mese
+    prodotti = pd.concat([fogli_mensili[nome] for nome in mesi], keys=mesi, names=['Mese', None])
+    prodotti = prodotti.reset_index(level='Mese')
+    prodotti = prodotti[prodotti['Articolo'].notna() & prodotti['Coefficiente'].notna()]
+    prodotti['mese'] = prodotti['Mese'].map(NUMERI_MESI)
+    prodotti = prodotti.reset_index(drop=True)
+
+    # Colazioni del mese e prezzo valido nel mese di ogni riga
+    colazioni_totali = presenze_mensili(df_colazioni)['sum']
+    prezzi = StoricoPrezzi(df_consumi).prezzi(prodotti['Articolo'], prodotti['mese'].to_numpy())
+    costo_unitario = prezzi['Costo Unitario'].fillna(0)
+
+    risultati = pd.DataFrame({
+        'Mese': prodotti['Mese'],
+        'Categoria': prodotti['Categoria'] if 'Categoria' in prodotti else '',
+        'Articolo': prodotti['Articolo'],
+        'UDM': prodotti['UDM'] if 'UDM' in prodotti else '',
+        'Coefficiente': prodotti['Coefficiente'],
+        'Consumo_Totale': prodotti['Coefficiente'] * prodotti['mese'].map(colazioni_totali).fillna(0),
+        'Costo_Unitario': costo_unitario
+    })
+    risultati['Costo_Totale_Prodotto'] = risultati['Consumo_Totale'] * risultati['Costo_Unitario']
+    return risultati[colonne]
+
+
+def riepiloga_per_categoria(df_risultati_prodotti):
+    """Raggruppa per mese e categoria"""
+    return df_risultati_prodotti.groupby(['Mese', 'Categoria']).agg({
+        'Costo_Totale_Prodotto': 'sum',
+        'Consumo_Totale': 'sum'
+    }).reset_index()
+
+
+def stampa_analisi(df_risultati_prodotti, df_summary):
+    # Formatta i numeri per una migliore leggibilità
+    with pd.option_context('display.float_format', lambda x: '{:.2f}'.format(x)):
+        # Stampa i risultati
+        print("\nAnalisi costi per categoria e mese:")
+        print(df_summary.to_string(index=False))
+
+        # Copertura dei prezzi
+        con_prezzo = (df_risultati_prodotti['Costo_Unitario'] > 0).sum()
+        print(f"\nProdotti con costo unitario: {con_prezzo} su {len(df_risultati_prodotti)}")
+
+        # Stampa dettaglio prodotti
+        print("\nDettaglio prodotti:")
+        print(df_risultati_prodotti.sort_values(['Mese', 'Categoria', 'Articolo']).to_string(index=False))
+
+
+def genera_report(dati, cartella_output='.'):
+    """Report 'costi-prodotti': consumo e costo per prodotto e per categoria"""
+    df_risultati_prodotti = calcola_costi_prodotti(dati.colazioni, dati.fogli_mensili, dati.consumi)
+    df_summary = riepiloga_per_categoria(df_risultati_prodotti)
+    stampa_analisi(df_risultati_prodotti, df_summary)
+
+    # Salva i risultati in CSV
+    df_risultati_prodotti.to_csv(os.path.join(cartella_output, FILE_OUTPUT_PRODOTTI), index=False)
+    df_summary.to_csv(os.path.join(cartella_output, FILE_OUTPUT_CATEGORIE), index=False)
+    print("\nFile di analisi creati con successo!")
+    return df_risultati_prodotti, df_summary
+
+
+def main(argv=None):
+    from colazioni_cli import esegui_report_singolo
+    esegui_report_singolo('costi-prodotti', argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,81 +1,126 @@
-import pandas as pd
+import os
+
 import numpy as np
-from datetime import datetime
-
-# Carica i dati dei consumi
-df_consumi = pd.read_csv('unified_consumi_data.csv')
-
-# Carica i dati delle colazioni giornaliere
-df_colazioni = pd.read_csv('colazionigiornalierecount2024.csv')
-df_colazioni.columns = df_colazioni.columns.str.strip()
-df_colazioni['data'] = pd.to_datetime(df_colazioni['data'], format='%d/%m/%Y %H.%M.%S')
-df_colazioni['mese'] = df_colazioni['data'].dt.month
-
-# Calcola statistiche per ogni mese
-risultati = []
-for mese in df_consumi['Mese'].unique():
-    # Filtra i dati per mese
-    dati_mese = df_consumi[df_consumi['Mese'] == mese]
-    
-    # Calcola il numero di colazioni per il mese
-    num_mese = int(mese.split('_')[0])  # Estrae il numero del mese (es. 05 da "05_Maggio")
-    colazioni_mese = df_colazioni[df_colazioni['mese'] == num_mese]
-    num_colazioni = colazioni_mese['CONSUMO REALE COLAZIONI'].sum()
-    giorni_servizio = len(colazioni_mese)
-    
-    # Calcola i costi totali per categoria
-    costi_categoria = dati_mese.groupby('Categoria').agg({
-        'Costo Totale': 'sum',
-        'Quantita': 'sum'
-    }).reset_index()
-    
-    # Calcola il costo totale del mese
-    costo_totale = dati_mese['Costo Totale'].sum()
-    
-    # Calcola medie e statistiche
-    if num_colazioni > 0 and giorni_servizio > 0:
-        costo_medio_colazione = costo_totale / num_colazioni
-        colazioni_giorno = num_colazioni / giorni_servizio
-        costo_giornaliero = costo_totale / giorni_servizio
-    else:
-        costo_medio_colazione = 0
-        colazioni_giorno = 0
-        costo_giornaliero = 0
-    
-    # Aggiungi i risultati
-    risultati.append({
-        'Mese': mese,
+import pandas as pd
+
+from dati_comuni import numero_mese, presenze_mensili
+
+FILE_OUTPUT = 'analisi_costi_reali.csv'
+
+
+def calcola_riepilogo_mensile(df_consumi, df_colazioni):
+    """Calcola colazioni, giorni di servizio e costi medi di ogni mese dei consumi"""
+    # Un solo groupby per i costi e uno per le presenze, uniti per numero di mese
+    costo_totale = df_consumi.groupby('Mese', sort=False)['Costo Totale'].sum()
+    presenze = presenze_mensili(df_colazioni).reindex(numero_mese(costo_totale.index), fill_value=0)
+
+    num_colazioni = presenze['sum'].to_numpy()
+    giorni_servizio = presenze['size'].to_numpy()
+    costi = costo_totale.to_numpy()
+
+    # Medie solo per i mesi con colazioni e giorni di servizio registrati
+    validi = (num_colazioni > 0) & (giorni_servizio > 0)
+    colazioni_sicure = np.where(validi, num_colazioni, 1)
+    giorni_sicuri = np.where(validi, giorni_servizio, 1)
+
+    return pd.DataFrame({
+        'Mese': costo_totale.index,
         'Numero Colazioni': num_colazioni,
         'Giorni di Servizio': giorni_servizio,
-        'Costo Totale': costo_totale,
-        'Costo Medio per Colazione': costo_medio_colazione,
-        'Colazioni per Giorno': colazioni_giorno,
-        'Costo Giornaliero': costo_giornaliero
+        'Costo Totale': costi,
+        'Costo Medio per Colazione': np.where(validi, costi / colazioni_sicure, 0),
+        'Colazioni per Giorno': np.where(validi, num_colazioni / giorni_sicuri, 0),
+        'Costo Giornaliero': np.where(validi, costi / giorni_sicuri, 0)
     })
-    
-    # Stampa dettagli per categoria
-    print(f"\nDettaglio costi per categoria - {mese}:")
-    for _, cat in costi_categoria.iterrows():
-        print(f"{cat['Categoria']}: {cat['Costo Totale']:.2f}€ (Quantità: {cat['Quantita']:.2f})")
-
-# Crea DataFrame con i risultati
-df_risultati = pd.DataFrame(risultati)
-
-# Formatta i numeri per una migliore leggibilità
-pd.set_option('display.float_format', lambda x: '{:.4f}'.format(x))
-
-# Stampa i risultati
-print("\nRiepilogo mensile:")
-print(df_risultati.to_string(index=False))
-
-# Salva i risultati in CSV
-df_risultati.to_csv('analisi_costi_reali.csv', index=False)
-print("\nFile analisi_costi_reali.csv creato con successo!")
-
-# Calcola e stampa statistiche per categoria
-print("\nStatistiche per categoria:")
-stats_categoria = df_consumi.groupby('Categoria').agg({
-    'Costo Totale': ['sum', 'mean'],
-    'Quantita': ['sum', 'mean']
-}).round(4)
-print(stats_categoria.to_string()) 
\ No newline at end of file
+
+
+def calcola_ripartizione_costi(df_consumi, df_riepilogo, chiave):
+    """Ripartisce costi e quantità per mese × chiave (es. Classe o Categoria) in un unico groupby.
+
+    Restituisce, per ogni coppia, costo totale, quantità totale, percentuale
+    sul costo del mese e costo per colazione servita nel mese. I mesi
+    mantengono l'ordine di comparsa nei consumi, le chiavi sono ordinate.
+    """
+    ordine_mesi = pd.unique(df_consumi['Mese'])
+    mese = pd.Categorical(df_consumi['Mese'], categories=ordine_mesi)
+    ripartizione = (
+        df_consumi.groupby([mese, df_consumi[chiave]], observed=True)[['Costo Totale', 'Quantita']]
+        .sum()
+        .reset_index()
+    )
+    ripartizione.columns = ['Mese', chiave, 'Costo Totale', 'Quantità Totale']
+    ripartizione['Mese'] = ripartizione['Mese'].astype(object)
+
+    # Totali mensili allineati a ogni riga tramite l'indice del mese
+    totali = df_riepilogo.set_index('Mese').reindex(ordine_mesi)
+    posizione_mese = pd.Categorical(ripartizione['Mese'], categories=ordine_mesi).codes
+    costo_mese = totali['Costo Totale'].to_numpy()[posizione_mese]
+    colazioni_mese = totali['Numero Colazioni'].to_numpy()[posizione_mese]
+
+    costi = ripartizione['Costo Totale'].to_numpy()
+    ripartizione['Percentuale sul Totale'] = np.where(
+        costo_mese > 0, costi / np.where(costo_mese > 0, costo_mese, 1) * 100, 0
+    )
+    ripartizione['Costo per Colazione'] = np.where(
+        colazioni_mese > 0, costi / np.where(colazioni_mese > 0, colazioni_mese, 1), 0
+    )
+    return ripartizione
+
+
+def calcola_dettaglio_categorie(df_consumi, df_riepilogo):
+    """Calcola i costi totali per categoria di ogni mese"""
+    return calcola_ripartizione_costi(df_consumi, df_riepilogo, 'Categoria')
+
+
+def formatta_dettaglio(df_ripartizione, chiave, titolo):
+    """Testo del dettaglio costi per mese, costruito per colonne anziché riga per riga"""
+    righe = (
+        df_ripartizione[chiave].astype(str)
+        + ': ' + df_ripartizione['Costo Totale'].map('{:.2f}'.format)
+        + '€ (Quantità: ' + df_ripartizione['Quantità Totale'].map('{:.2f}'.format) + ')'
+    )
+    blocchi = righe.groupby(df_ripartizione['Mese'], sort=False).agg('\n'.join)
+    return ''.join(f"\n{titolo} - {mese}:\n{testo}\n" for mese, testo in blocchi.items())
+
+
+def stampa_dettaglio_categorie(df_categorie):
+    """Stampa dettagli per categoria di ogni mese"""
+    print(formatta_dettaglio(df_categorie, 'Categoria', 'Dettaglio costi per categoria'), end='')
+
+
+def stampa_statistiche_categoria(df_consumi):
+    """Calcola e stampa statistiche per categoria"""
+    print("\nStatistiche per categoria:")
+    stats_categoria = df_consumi.groupby('Categoria').agg({
+        'Costo Totale': ['sum', 'mean'],
+        'Quantita': ['sum', 'mean']
+    }).round(4)
+    print(stats_categoria.to_string())
+
+
+def genera_report(dati, cartella_output='.'):
+    """Report 'costi-reali': riepilogo mensile e dettaglio dei costi per categoria"""
+    df_risultati = dati.riepilogo_mensile
+    stampa_dettaglio_categorie(calcola_dettaglio_categorie(dati.consumi, df_risultati))
+
+    # Formatta i numeri per una migliore leggibilità
+    with pd.option_context('display.float_format', lambda x: '{:.4f}'.format(x)):
+        # Stampa i risultati
+        print("\nRiepilogo mensile:")
+        print(df_risultati.to_string(index=False))
+
+        # Salva i risultati in CSV
+        df_risultati.to_csv(os.path.join(cartella_output, FILE_OUTPUT), index=False)
+        print(f"\nFile {FILE_OUTPUT} creato con successo!")
+
+        stampa_statistiche_categoria(dati.consumi)
+    return df_risultati
+
+
+def main(argv=None):
+    from colazioni_cli import esegui_report_singolo
+    esegui_report_singolo('costi-reali', argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import hashlib
+import io
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dati_comuni import FILE_CONSUMI, DatiCondivisi, file_colazioni_stagione
+from schemi_input import SCHEMI, leggi_csv, leggi_excel
+
+# Secondi di attesa del risultato nell'esecuzione che invia il file: i file
+# piccoli sono pronti subito, quelli grandi proseguono in background
+ATTESA_BREVE = 0.5
+
+# Caricamenti completati conservati in memoria (i più vecchi vengono scartati)
+MAX_CARICAMENTI = 16
+
+# Tipi di file accettati: schema, lettore e file dei dati da sostituire
+# (None se il risultato resta in memoria, come le giacenze; una funzione del
+# DataFrame letto se il nome dipende dai dati, come l'anno delle colazioni)
+TIPI_CARICAMENTO = {
+    'giacenze': (SCHEMI['giacenze'], leggi_excel, None),
+    'consumi': (SCHEMI['consumi'], leggi_csv, FILE_CONSUMI),
+    'colazioni': (SCHEMI['colazioni'], leggi_csv, file_colazioni_stagione),
+}
+
+
+def scrivi_temporaneo(contenuto, percorso):
+    """Scrive il contenuto in un file temporaneo accanto a `percorso` e ne restituisce il nome"""
+    temporaneo = f"{percorso}.{os.getpid()}.tmp"
+    with open(temporaneo, 'wb') as f:
+        f.write(contenuto)
+        f.flush()
+        os.fsync(f.fileno())
+    return temporaneo
+
+
+def pubblica_file(temporaneo, percorso):
+    """Sostituisce in modo atomico un file di dati con un file temporaneo, conservando la versione precedente.
+
+    Il file temporaneo (vedi scrivi_temporaneo) sta nella stessa cartella e
+    viene rinominato: chi legge vede il file vecchio o quello nuovo, mai uno
+    scritto a metà. La versione sostituita resta in `<file>.precedente`.
+    """
+    if os.path.exists(percorso):
+        shutil.copy2(percorso, f"{percorso}.precedente")
+    os.replace(temporaneo, percorso)
+
+
+class Caricamento:
+    """Stato di un file caricato: avanzamento, messaggio e, al termine, risultato o errore"""
+
+    def __init__(self, tipo, nome_file):
+        self.tipo = tipo
+        self.nome_file = nome_file
+        self.avanzamento = 0.0
+        self.messaggio = "In coda"
+        self.risultato = None
+        self.errore = None
+        self.completato = threading.Event()
+
+    def aggiorna(self, avanzamento, messaggio):
+        self.avanzamento = avanzamento
+        self.messaggio = messaggio
+
+    def attendi(self, secondi=ATTESA_BREVE):
+        """Attende al massimo `secondi` la fine dell'elaborazione; True se è terminata"""
+        return self.completato.wait(secondi)
+
+    @property
+    def pronto(self):
+        return self.completato.is_set() and self.errore is None
+
+
+class ElaborazioneCaricamenti:
+    """Legge e valida i file caricati in un thread in background.
+
+    Le giacenze restano in memoria come DataFrame pronto per l'ordine; i
+    nuovi export di consumi e colazioni sono scritti in un file temporaneo,
+    da cui si costruisce e valida l'istantanea della nuova versione (vedi
+    istantanea_dati.py); solo se riesce il file sostituisce in modo atomico
+    quello dei dati, così la dashboard non vede mai un input che non si
+    riesce a elaborare e lo usa alla prima esecuzione senza rileggere i file.
+
+    Lo stesso contenuto inviato più volte (ogni rerun di Streamlit ripete il
+    caricamento) viene elaborato una sola volta.
+    """
+
+    def __init__(self, cartella_dati='.', thread=1):
+        self.cartella_dati = cartella_dati
+        self.esecutore = ThreadPoolExecutor(max_workers=thread, thread_name_prefix='caricamenti')
+        self.caricamenti = {}
+        self.ultimi = {}
+        self.lucchetto = threading.Lock()
+
+    def invia(self, tipo, contenuto, nome_file):
+        """Avvia l'elaborazione di un file (contenuto in byte) e ne restituisce lo stato"""
+        chiave = hashlib.sha256(tipo.encode('utf-8') + contenuto).hexdigest()
+        pubblicato = TIPI_CARICAMENTO[tipo][2] is not None
+        with self.lucchetto:
+            caricamento = self.caricamenti.get(chiave)
+            # Un file già pubblicato va ripubblicato se nel frattempo è stato sostituito da un altro
+            if caricamento is not None and (not pubblicato or self.ultimi.get(tipo) == chiave):
+                return caricamento
+
+            caricamento = Caricamento(tipo, nome_file)
+            self.caricamenti[chiave] = caricamento
+            self.ultimi[tipo] = chiave
+            self._scarta_vecchi()
+        self.esecutore.submit(self._elabora, caricamento, contenuto)
+        return caricamento
+
+    def _scarta_vecchi(self):
+        completati = [chiave for chiave, caricamento in self.caricamenti.items()
+                      if caricamento.completato.is_set() and chiave not in self.ultimi.values()]
+        for chiave in completati[:max(0, len(self.caricamenti) - MAX_CARICAMENTI)]:
+            del self.caricamenti[chiave]
+
+    def _elabora(self, caricamento, contenuto):
+        schema, lettore, nome_destinazione = TIPI_CARICAMENTO[caricamento.tipo]
+        try:
+            caricamento.aggiorna(0.1, f"Lettura e validazione di {caricamento.nome_file}")
+            df = lettore(io.BytesIO(contenuto), schema)
+
+            if callable(nome_destinazione):
+                nome_destinazione = nome_destinazione(df)
+            if nome_destinazione is not None:
+                percorso = os.path.join(self.cartella_dati, nome_destinazione)
+                temporaneo = scrivi_temporaneo(contenuto, percorso)
+                try:
+                    caricamento.aggiorna(0.4, f"{len(df)} righe valide: preparazione dei dati derivati")
+                    DatiCondivisi(self.cartella_dati, {nome_destinazione: temporaneo}).prepara()
+                    caricamento.aggiorna(0.8, f"Pubblicazione di {nome_destinazione}")
+                    pubblica_file(temporaneo, percorso)
+                finally:
+                    if os.path.exists(temporaneo):
+                        os.remove(temporaneo)
+
+            caricamento.risultato = df
+            caricamento.aggiorna(1.0, f"{len(df)} righe caricate")
+        except Exception as e:
+            caricamento.errore = e
+            caricamento.aggiorna(caricamento.avanzamento, f"Errore: {e}")
+        finally:
+            caricamento.completato.set()
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from dati_comuni import NUMERI_MESI
+from modello_dati import espandi_valori
+
+
+def decrescente(valori):
+    """Posizioni in ordine decrescente, stabile a parità di valore e con i NaN in fondo"""
+    return np.argsort(-np.asarray(valori, dtype=float), kind='stable')
+
+
+class ClassificheMesi:
+    """Classifiche degli articoli di ogni mese, calcolate una volta per versione dei dati.
+
+    Ogni classifica è un array di id articolo (righe di DatiCompatti.articoli,
+    indice delle viste) con i soli articoli a coefficiente positivo nel mese,
+    in ordine decrescente del criterio; a parità di valore resta l'ordine
+    degli id, come con nlargest. Il consumo totale del mese (coefficiente ×
+    colazioni) ha lo stesso ordine del coefficiente. Il costo è la quantità
+    del mese per il prezzo valido nel mese (vedi prezzi.StoricoPrezzi), come
+    in calcolo_costi_prodotti.
+
+    Top N, tabelle ordinate e classifiche di una categoria si ottengono
+    selezionando o filtrando questi array, senza ordinare a ogni esecuzione.
+    """
+
+    def __init__(self, dati, storico_prezzi=None):
+        articoli = dati.articoli
+        self.n_articoli = len(articoli)
+        # Codice della categoria di ogni articolo (-1 senza categoria)
+        self.codici_categoria, nomi_categorie = pd.factorize(articoli['Categoria'].astype(object))
+        self.nomi_categorie = np.asarray(nomi_categorie, dtype=object)
+        self.indice_categorie = {nome: codice for codice, nome in enumerate(self.nomi_categorie)}
+        # Tutti gli articoli per Categoria e Articolo, con i valori mancanti in fondo
+        self.alfabetico = (
+            articoli[['Categoria', 'Articolo']].astype(object)
+            .sort_values(['Categoria', 'Articolo'], kind='mergesort', na_position='last')
+            .index.to_numpy()
+        )
+
+        self.valori = {}
+        self.classifiche = {}
+        self.categorie = {}
+        for colonna, mese in enumerate(dati.mesi):
+            coefficienti = dati.coefficienti_mese(mese)
+            quantita = espandi_valori(dati.quantita[:, colonna], dati.decimali_quantita)
+            valori = {'Coefficiente': coefficienti, 'Quantità': quantita}
+            if storico_prezzi is not None:
+                # Le quantità dei fogli sono già nell'unità di acquisto: il prezzo si applica direttamente
+                prezzi = storico_prezzi.prezzi(articoli['Articolo'], NUMERI_MESI.get(mese))
+                valori['Costo'] = quantita * prezzi['Costo Unitario'].to_numpy(dtype=float)
+            ids = np.flatnonzero(dati.presenza[:, colonna] & (coefficienti > 0))
+
+            self.valori[mese] = valori
+            self.classifiche[mese] = {criterio: ids[decrescente(v[ids])] for criterio, v in valori.items()}
+            # Categorie per consumo totale del mese, cioè per somma dei coefficienti
+            codici = self.codici_categoria[ids]
+            con_categoria = codici >= 0
+            totali = np.bincount(codici[con_categoria], weights=coefficienti[ids][con_categoria],
+                                 minlength=len(self.nomi_categorie))
+            presenti = np.flatnonzero(np.bincount(codici[con_categoria], minlength=len(self.nomi_categorie)))
+            self.categorie[mese] = self.nomi_categorie[presenti[decrescente(totali[presenti])]].tolist()
+
+    def criteri(self, mese):
+        """Criteri disponibili per il mese: Coefficiente, Quantità e, con lo storico dei prezzi, Costo"""
+        return list(self.classifiche[mese])
+
+    def classifica(self, mese, criterio='Coefficiente', categoria=None, n=None):
+        """Id degli articoli del mese dal valore più alto, anche di una sola categoria e solo i primi n"""
+        ids = self.classifiche[mese][criterio]
+        if categoria is not None:
+            ids = ids[self.codici_categoria[ids] == self.indice_categorie.get(categoria, -2)]
+        return ids if n is None else ids[:n]
+
+    def ordina(self, vista, ids):
+        """Righe di una vista (indice = id articolo) nell'ordine di `ids`, saltando quelle assenti"""
+        presenti = np.zeros(self.n_articoli, dtype=bool)
+        presenti[vista.index.to_numpy()] = True
+        return vista.loc[ids[presenti[ids]]]
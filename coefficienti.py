@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+from dati_comuni import NUMERI_MESI
+
+# Colonne delle colazioni servite per segmento (la loro somma è CONSUMO REALE COLAZIONI)
+SEGMENTI = {
+    'HOTEL': 'BREAKFAST SERVITI (HOTEL)',
+    'RESIDENCE': 'BREAKFAST SERVITI (RESIDENCE)',
+    'CVM': 'BREAKFAST SERVITI (CVM)',
+    'ESTERNI': 'BREAKFAST PRENOTATI (ESTERNI)',
+    'COMPLEMENTARY': 'BREAKFAST COMPLEMENTARY'
+}
+
+# Peso del coefficiente medio nella stima per segmento (vedi stima_coefficienti_segmento)
+REGOLARIZZAZIONE_SEGMENTI = 0.1
+
+# Schemi di peso per combinare gli ultimi mesi e fattore di decadimento di quello esponenziale
+SCHEMI_PESI = ('Uguali', 'Lineari decrescenti', 'Esponenziali')
+DECADIMENTO_ESPONENZIALE = 0.5
+
+
+def presenze_per_segmento(df_colazioni, mesi):
+    """Colazioni servite per mese (righe, nell'ordine di `mesi`) e segmento (colonne)"""
+    colonne = df_colazioni.reindex(columns=list(SEGMENTI.values())).fillna(0)
+    colonne.columns = list(SEGMENTI)
+    per_mese = colonne.groupby(df_colazioni['mese']).sum()
+    return per_mese.reindex([NUMERI_MESI.get(m) for m in mesi], fill_value=0).set_axis(list(mesi))
+
+
+def copertura_mesi(df_colazioni, mesi):
+    """Giorni registrati rispetto ai giorni di servizio di ogni mese (righe nell'ordine di `mesi`).
+
+    Il periodo di servizio va dal primo all'ultimo giorno registrato della
+    stagione: nei mesi di apertura e chiusura contano solo i giorni al suo
+    interno, negli altri tutti i giorni del calendario. Le colazioni stimate
+    riportano le colazioni registrate all'intero periodo di servizio del
+    mese, ipotizzando nei giorni mancanti la media dei giorni registrati.
+    """
+    date = df_colazioni['data'].dt.normalize()
+    registrati = pd.DataFrame({
+        'mese': df_colazioni['mese'],
+        'giorno': date,
+        'colazioni': df_colazioni['CONSUMO REALE COLAZIONI']
+    }).groupby('mese').agg(giorni=('giorno', 'nunique'), colazioni=('colazioni', 'sum'))
+
+    # Giorni di servizio per mese: calendario della stagione tra prima e ultima registrazione
+    if len(date):
+        stagione = pd.date_range(date.min(), date.max(), freq='D')
+        servizio = pd.Series(1, index=stagione).groupby(stagione.month).sum()
+    else:
+        servizio = pd.Series(dtype=int)
+
+    numeri = [NUMERI_MESI.get(m) for m in mesi]
+    giorni_registrati = registrati['giorni'].reindex(numeri, fill_value=0).to_numpy()
+    giorni_servizio = servizio.reindex(numeri, fill_value=0).to_numpy()
+    colazioni = registrati['colazioni'].reindex(numeri, fill_value=0).to_numpy(dtype=float)
+    copertura = np.where(giorni_servizio > 0, giorni_registrati / np.maximum(giorni_servizio, 1), 0.0)
+
+    return pd.DataFrame({
+        'Giorni Registrati': giorni_registrati,
+        'Giorni di Servizio': giorni_servizio,
+        'Copertura': copertura,
+        'Colazioni Registrate': colazioni,
+        'Colazioni Stimate': np.where(copertura > 0, colazioni / np.where(copertura > 0, copertura, 1), 0.0)
+    }, index=list(mesi))
+
+
+def coefficienti_normalizzati(dati, copertura=None):
+    """Matrice articoli × mesi dei coefficienti riferiti all'intero periodo di servizio.
+
+    Le quantità dei consumi coprono tutto il mese mentre i coefficienti dei
+    fogli le dividono per le sole colazioni registrate: moltiplicare per la
+    copertura equivale a dividere per le colazioni stimate del mese. I mesi
+    registrati per intero restano invariati.
+    """
+    mesi = list(dati.mesi)
+    copertura = copertura_mesi(dati.colazioni, mesi) if copertura is None else copertura
+    coefficienti = dati.matrice_coefficienti()
+    fattore = copertura['Copertura'].reindex(mesi).to_numpy(dtype=float)
+    # Mesi senza registrazioni: nessuna correzione possibile
+    return coefficienti * np.where(fattore > 0, fattore, 1.0)
+
+
+def coefficienti_ponderati(dati, pesi=None, copertura=None, normalizza=True):
+    """Coefficiente di ogni articolo su più mesi come rapporto tra somme ponderate.
+
+    Per ogni articolo: somma sui mesi di peso × quantità diviso somma di
+    peso × colazioni (stimate se `normalizza`, altrimenti registrate),
+    considerando solo i mesi in cui l'articolo compare. I pesi sono un
+    dizionario mese -> peso; per default ogni mese pesa quanto la sua
+    copertura, così i mesi registrati in parte contano meno. Tutta la
+    matrice articoli × mesi è elaborata in un solo passaggio.
+    """
+    mesi = list(dati.mesi)
+    copertura = copertura_mesi(dati.colazioni, mesi) if copertura is None else copertura
+    if pesi is None:
+        pesi = copertura['Copertura']
+    pesi = pd.Series(pesi, dtype=float).reindex(mesi, fill_value=0).to_numpy()
+
+    colazioni = copertura['Colazioni Stimate' if normalizza else 'Colazioni Registrate'].reindex(mesi).to_numpy(dtype=float)
+    registrate = copertura['Colazioni Registrate'].reindex(mesi).to_numpy(dtype=float)
+    coefficienti = dati.matrice_coefficienti()
+
+    # Quantità ricostruite dai coefficienti, così i mesi a copertura piena coincidono con i fogli
+    presenti = ~np.isnan(coefficienti) & (registrate > 0)
+    quantita = np.where(presenti, coefficienti * registrate, 0.0)
+    denominatore = np.where(presenti, colazioni, 0.0) @ pesi
+    numeratore = quantita @ pesi
+    return np.where(denominatore > 0, numeratore / np.where(denominatore > 0, denominatore, 1), np.nan)
+
+
+def pesi_ultimi_mesi(mesi, mese_riferimento, n_mesi, schema=SCHEMI_PESI[0], decadimento=DECADIMENTO_ESPONENZIALE):
+    """Pesi (nell'ordine di `mesi`) degli ultimi `n_mesi` fino al mese di riferimento incluso.
+
+    Con lo schema lineare il mese di riferimento pesa n_mesi, il precedente
+    n_mesi - 1 e così via; con quello esponenziale ogni mese pesa
+    `decadimento` volte il successivo. I mesi fuori dal periodo pesano zero.
+    """
+    mesi = list(mesi)
+    posizioni = np.arange(len(mesi))
+    fine = mesi.index(mese_riferimento)
+    distanza = fine - posizioni
+    nel_periodo = (distanza >= 0) & (distanza < n_mesi)
+
+    if schema == 'Lineari decrescenti':
+        pesi = (n_mesi - distanza).astype(float)
+    elif schema == 'Esponenziali':
+        pesi = decadimento ** distanza.astype(float)
+    else:
+        pesi = np.ones(len(mesi))
+    return np.where(nel_periodo, pesi, 0.0)
+
+
+def combina_coefficienti(matrice, pesi):
+    """Media ponderata dei coefficienti lungo l'asse dei mesi con un'unica riduzione.
+
+    I mesi in cui l'articolo non compare (NaN) sono esclusi e i pesi dei
+    restanti rinormalizzati; NaN se l'articolo manca in tutti i mesi pesati.
+    """
+    presenti = ~np.isnan(matrice)
+    pesi = np.asarray(pesi, dtype=float)
+    numeratore = np.where(presenti, matrice, 0.0) @ pesi
+    denominatore = presenti.astype(float) @ pesi
+    return np.where(denominatore > 0, numeratore / np.where(denominatore > 0, denominatore, 1), np.nan)
+
+
+def stima_coefficienti_segmento(dati, regolarizzazione=REGOLARIZZAZIONE_SEGMENTI, normalizza=False):
+    """Stima i coefficienti di consumo per segmento di tutti gli articoli con un unico sistema lineare.
+
+    Per ogni articolo la quantità consumata nel mese è modellata come somma
+    sui segmenti di coefficiente × colazioni servite nel segmento. Tutti gli
+    articoli condividono la matrice delle presenze mesi × segmenti, quindi il
+    problema ai minimi quadrati si risolve in una sola chiamata a lstsq con
+    una colonna di termini noti per articolo.
+
+    Con pochi mesi e segmenti piccoli (CVM, ESTERNI) il sistema è mal
+    condizionato: una penalità ridge tira ogni coefficiente verso il
+    coefficiente medio dell'articolo, con un peso pari a `regolarizzazione`
+    volte la norma media delle colonne delle presenze. I segmenti con molti
+    dati si discostano liberamente dalla media, quelli con pochi dati
+    restano vicini. I coefficienti negativi sono riportati a zero. Con
+    `normalizza` le presenze dei mesi registrati in parte sono riportate
+    all'intero periodo di servizio.
+
+    Restituisce un DataFrame articoli × segmenti indicizzato per id articolo.
+    """
+    mesi = list(dati.mesi)
+    presenze = presenze_per_segmento(dati.colazioni, mesi).to_numpy(dtype=float)
+    if normalizza:
+        # Presenze riportate all'intero periodo di servizio (vedi copertura_mesi)
+        copertura = copertura_mesi(dati.colazioni, mesi)['Copertura'].to_numpy()
+        presenze = presenze / np.where(copertura > 0, copertura, 1.0)[:, None]
+    quantita = np.column_stack([
+        np.nan_to_num(dati.quantita[:, dati.indice_mese(m)].astype(float), nan=0.0) for m in mesi
+    ])
+
+    # Solo i mesi con colazioni registrate
+    mesi_validi = presenze.sum(axis=1) > 0
+    presenze, quantita = presenze[mesi_validi], quantita[:, mesi_validi]
+    n_segmenti = presenze.shape[1]
+
+    # Coefficiente medio di ogni articolo su tutti i mesi, usato come riferimento della penalità
+    totale_colazioni = presenze.sum()
+    coefficiente_medio = quantita.sum(axis=1) / totale_colazioni if totale_colazioni > 0 else np.zeros(len(quantita))
+
+    peso = np.sqrt(regolarizzazione * np.trace(presenze.T @ presenze) / max(n_segmenti, 1))
+    sistema = np.vstack([presenze, peso * np.eye(n_segmenti)])
+    termini_noti = np.vstack([quantita.T, peso * np.outer(np.ones(n_segmenti), coefficiente_medio)])
+
+    soluzione, *_ = np.linalg.lstsq(sistema, termini_noti, rcond=None)
+    return pd.DataFrame(np.clip(soluzione.T, 0, None), index=dati.articoli.index, columns=list(SEGMENTI))
+
+
+def consumo_per_segmento(coefficienti_segmento, pax_segmento):
+    """Consumo previsto per articolo dato il numero di colazioni di ciascun segmento"""
+    pax = pd.Series(pax_segmento, dtype=float).reindex(coefficienti_segmento.columns, fill_value=0)
+    return coefficienti_segmento.to_numpy() @ pax.to_numpy()
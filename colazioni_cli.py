@@ -0,0 +1,96 @@
+"""Interfaccia a riga di comando unica per i report delle colazioni.
+
+Esempi:
+    python colazioni_cli.py report tutti
+    python colazioni_cli.py report costi-pms costi-reali --output risultati/
+    python colazioni_cli.py costi-prodotti --profile
+
+Gli input condivisi (consumi, colazioni giornaliere, fogli Excel) vengono
+caricati una sola volta per esecuzione, qualunque sia il numero di report.
+"""
+import argparse
+import os
+import sys
+
+import calcolo_consumi
+import calcolo_costi_pms
+import calcolo_costi_prodotti
+import calcolo_costi_reali
+import calcolo_medie_reali
+import esportazione_excel
+import varianza_costi
+from dati_comuni import DatiCondivisi
+from profilazione import aggiungi_opzioni_profilo, esegui_con_profilo
+
+# Report disponibili, nell'ordine in cui vengono generati da 'report tutti'
+REPORT = {
+    'consumi': calcolo_consumi.genera_report,
+    'costi-pms': calcolo_costi_pms.genera_report,
+    'costi-prodotti': calcolo_costi_prodotti.genera_report,
+    'costi-reali': calcolo_costi_reali.genera_report,
+    'medie-reali': calcolo_medie_reali.genera_report,
+    'excel': esportazione_excel.genera_report,
+    'varianza': varianza_costi.genera_report,
+}
+
+TUTTI = 'tutti'
+
+
+def genera_report(nomi, cartella_dati='.', cartella_output='.'):
+    """Genera i report richiesti condividendo un unico caricamento dei dati"""
+    if TUTTI in nomi:
+        nomi = list(REPORT)
+    # Rimuove i duplicati mantenendo l'ordine
+    nomi = list(dict.fromkeys(nomi))
+
+    os.makedirs(cartella_output, exist_ok=True)
+    dati = DatiCondivisi(cartella_dati)
+    risultati = {}
+    for nome in nomi:
+        risultati[nome] = REPORT[nome](dati, cartella_output)
+    return risultati
+
+
+def crea_parser():
+    opzioni_comuni = argparse.ArgumentParser(add_help=False)
+    opzioni_comuni.add_argument('--dati', default='.', metavar='CARTELLA',
+                                help="Cartella dei file di input (default: cartella corrente)")
+    opzioni_comuni.add_argument('--output', default='.', metavar='CARTELLA',
+                                help="Cartella dei file generati (default: cartella corrente)")
+    aggiungi_opzioni_profilo(opzioni_comuni)
+
+    parser = argparse.ArgumentParser(
+        description="Report di analisi delle colazioni",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('\n\n', 1)[1]
+    )
+    comandi = parser.add_subparsers(dest='comando', required=True)
+
+    parser_report = comandi.add_parser(
+        'report',
+        parents=[opzioni_comuni],
+        help="Genera uno o più report con un solo caricamento dei dati"
+    )
+    parser_report.add_argument('nomi', nargs='+', choices=list(REPORT) + [TUTTI], metavar='NOME',
+                               help=f"Report da generare: {', '.join(REPORT)} oppure {TUTTI}")
+
+    for nome, funzione in REPORT.items():
+        comandi.add_parser(nome, parents=[opzioni_comuni], help=funzione.__doc__.split(': ', 1)[-1])
+
+    return parser
+
+
+def main(argv=None):
+    args = crea_parser().parse_args(argv)
+    nomi = args.nomi if args.comando == 'report' else [args.comando]
+    esegui_con_profilo(genera_report, args, __file__, nomi, args.dati, args.output)
+
+
+def esegui_report_singolo(nome, argv=None):
+    """Punto di ingresso degli script calcolo_*.py, mantenuti per compatibilità"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    main([nome] + argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import os
+import re
+from functools import cached_property
+
+import pandas as pd
+
+from modello_dati import costruisci_dati_compatti
+from schemi_input import SCHEMI, leggi_csv, leggi_excel
+
+# Costanti per i file
+FILE_DASHBOARD = 'breakfast_dashboard.xlsx'
+FILE_CONSUMI = 'unified_consumi_data.csv'
+# L'export delle colazioni giornaliere porta nel nome l'anno della stagione
+MODELLO_FILE_COLAZIONI = 'colazionigiornalierecount{anno}.csv'
+FILE_COLAZIONI = MODELLO_FILE_COLAZIONI.format(anno=2024)
+ESPRESSIONE_FILE_COLAZIONI = re.compile(r'colazionigiornalierecount(\d{4})\.csv')
+
+# Mappa numeri mesi a nomi
+NOMI_MESI = {
+    4: 'Aprile',
+    5: 'Maggio',
+    6: 'Giugno',
+    7: 'Luglio',
+    8: 'Agosto',
+    9: 'Settembre',
+    10: 'Ottobre'
+}
+NUMERI_MESI = {nome: numero for numero, nome in NOMI_MESI.items()}
+
+
+def nome_file_colazioni(anno):
+    """Nome dell'export delle colazioni giornaliere della stagione `anno`"""
+    return MODELLO_FILE_COLAZIONI.format(anno=int(anno))
+
+
+def anno_file_colazioni(nome_file):
+    """Anno della stagione nel nome di un export delle colazioni giornaliere"""
+    return int(ESPRESSIONE_FILE_COLAZIONI.fullmatch(os.path.basename(nome_file)).group(1))
+
+
+def file_colazioni_stagione(df_colazioni):
+    """Nome dell'export per le colazioni indicate, dall'anno dell'ultima data"""
+    return nome_file_colazioni(df_colazioni['data'].max().year)
+
+
+def trova_file_colazioni(cartella_dati='.', altri_nomi=()):
+    """Export delle colazioni della stagione più recente nella cartella.
+
+    `altri_nomi` aggiunge file non ancora presenti (per esempio quelli di
+    `sostituzioni`); senza export nella cartella restituisce FILE_COLAZIONI.
+    """
+    nomi = set(altri_nomi)
+    if os.path.isdir(cartella_dati):
+        nomi.update(os.listdir(cartella_dati))
+    anni = [int(trovato.group(1)) for trovato in map(ESPRESSIONE_FILE_COLAZIONI.fullmatch, nomi) if trovato]
+    return nome_file_colazioni(max(anni)) if anni else FILE_COLAZIONI
+
+
+def versione_dati(cartella_dati='.', nomi_file=None, sostituzioni=None):
+    """Identificativo della versione dei dati di input, basato su dimensione e data di modifica.
+
+    Cambia appena uno dei file viene sostituito e serve come chiave per le
+    cache dei dati derivati. `sostituzioni` indica, per nome file, un file
+    temporaneo che prenderà il suo posto con os.replace (che conserva
+    dimensione e data di modifica): la versione è quella che la cartella
+    avrà dopo la sostituzione.
+    """
+    sostituzioni = sostituzioni or {}
+    if nomi_file is None:
+        nomi_file = (FILE_DASHBOARD, FILE_CONSUMI, trova_file_colazioni(cartella_dati, sostituzioni))
+    firma = []
+    for nome_file in nomi_file:
+        percorso = sostituzioni.get(nome_file, os.path.join(cartella_dati, nome_file))
+        if os.path.exists(percorso):
+            stato = os.stat(percorso)
+            firma.append(f"{nome_file}:{stato.st_size}:{stato.st_mtime_ns}")
+        else:
+            firma.append(f"{nome_file}:assente")
+    return '|'.join(firma)
+
+
+def numero_mese(codici_mese):
+    """Estrae il numero del mese (es. 5 da "05_Maggio") da una serie di codici"""
+    return codici_mese.str.split('_').str[0].astype(int)
+
+
+def chiave_articolo(descrizioni):
+    """Chiave di confronto tra articoli dei fogli mensili e descrizioni dei consumi.
+
+    Maiuscolo e spazi normalizzati: i fogli mensili non riportano il Codice,
+    quindi la descrizione è l'unico collegamento con i prezzi.
+    """
+    return descrizioni.astype(str).str.split().str.join(' ').str.upper()
+
+
+def presenze_mensili(df_colazioni):
+    """Colazioni servite e giorni di servizio rilevati per numero di mese"""
+    return df_colazioni.groupby('mese')['CONSUMO REALE COLAZIONI'].agg(['sum', 'size'])
+
+
+def carica_consumi(file_consumi=FILE_CONSUMI):
+    """Carica i dati dei consumi (vedi SCHEMI['consumi'] in schemi_input.py)"""
+    return leggi_csv(file_consumi, SCHEMI['consumi'])
+
+
+def carica_colazioni(file_colazioni=FILE_COLAZIONI):
+    """Carica i dati delle colazioni giornaliere con data e numero del mese"""
+    df_colazioni = leggi_csv(file_colazioni, SCHEMI['colazioni'])
+    df_colazioni['mese'] = df_colazioni['data'].dt.month
+    return df_colazioni
+
+
+def carica_fogli_mensili(file_excel=FILE_DASHBOARD, mesi=None):
+    """Carica i fogli mensili dei coefficienti aprendo il file Excel una sola volta"""
+    mesi = mesi if mesi is not None else list(NOMI_MESI.values())
+    fogli = {}
+    with pd.ExcelFile(file_excel) as excel:
+        for nome_mese in mesi:
+            if nome_mese not in excel.sheet_names:
+                print(f"Errore nel caricamento del foglio {nome_mese}: foglio non presente")
+                continue
+            fogli[nome_mese] = leggi_excel(excel, SCHEMI['foglio_mensile'], nome_mese)
+    return fogli
+
+
+class DatiCondivisi:
+    """Input condivisi tra i report, caricati al più una volta per esecuzione.
+
+    Ogni sorgente viene letta solo quando il primo report la richiede e poi
+    riutilizzata, così generare più analisi in un'unica esecuzione costa un
+    solo caricamento.
+    """
+
+    def __init__(self, cartella_dati='.', sostituzioni=None):
+        self.cartella_dati = cartella_dati
+        # File temporanei da leggere al posto di quelli della cartella, per nome file
+        self.sostituzioni = sostituzioni or {}
+
+    def percorso(self, nome_file):
+        return self.sostituzioni.get(nome_file, os.path.join(self.cartella_dati, nome_file))
+
+    @cached_property
+    def consumi(self):
+        return carica_consumi(self.percorso(FILE_CONSUMI))
+
+    @cached_property
+    def file_colazioni(self):
+        return trova_file_colazioni(self.cartella_dati, self.sostituzioni)
+
+    @cached_property
+    def colazioni(self):
+        return carica_colazioni(self.percorso(self.file_colazioni))
+
+    @cached_property
+    def fogli_mensili(self):
+        return carica_fogli_mensili(self.percorso(FILE_DASHBOARD))
+
+    @cached_property
+    def compatti(self):
+        """Dati derivati in forma compatta, mappati dall'istantanea binaria se aggiornata"""
+        # Import locale: istantanea_dati importa a sua volta questo modulo
+        from istantanea_dati import apri_istantanea
+        return apri_istantanea(
+            lambda: costruisci_dati_compatti(self.fogli_mensili, self.consumi, self.colazioni),
+            versione_dati(self.cartella_dati, sostituzioni=self.sostituzioni)
+        )
+
+    def prepara(self):
+        """Legge e valida tutti gli input e scrive l'istantanea della loro versione.
+
+        Solleva l'errore di lettura o di validazione del primo input non
+        valido; con `sostituzioni` permette di provare un nuovo file prima di
+        pubblicarlo.
+        """
+        return self.compatti
+
+    @cached_property
+    def riepilogo_mensile(self):
+        # Import locale: calcolo_costi_reali importa a sua volta questo modulo
+        from calcolo_costi_reali import calcola_riepilogo_mensile
+        return calcola_riepilogo_mensile(self.consumi, self.colazioni)
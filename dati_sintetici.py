@@ -0,0 +1,534 @@
+"""Generatore deterministico di dati sintetici nel formato degli export reali.
+
+Esempi:
+    python dati_sintetici.py genera --output dati_grandi --prodotti 2000 --strutture 3 --anni 2
+    python dati_sintetici.py misura --dati dati_grandi/struttura_01/2024
+    python dati_sintetici.py verifica
+    python dati_sintetici.py verifica --aggiorna
+
+Per ogni struttura e anno vengono scritti export dei consumi, colazioni
+giornaliere, cartella dei coefficienti mensili e file delle giacenze, con
+gli stessi nomi, colonne e formati dei file reali: ogni cartella generata
+si usa con --dati nella CLI o come cartella di lavoro della dashboard.
+Lo stesso seme produce sempre gli stessi dati.
+
+`verifica` confronta i dati di esempio in example_data/ e i risultati
+attesi in example_data/attesi/ (caricamento, abbinamento dei prezzi,
+ordini e report della CLI) con quelli calcolati dal codice corrente.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dati_comuni import (FILE_CONSUMI, FILE_DASHBOARD, NOMI_MESI, NUMERI_MESI, nome_file_colazioni,
+                         trova_file_colazioni)
+from schemi_input import FORMATO_DATA_COLAZIONI
+
+FILE_GIACENZE = 'giacenze_magazzino.xlsx'
+
+# Dati di esempio versionati e risultati attesi
+CARTELLA_ESEMPIO = 'example_data'
+CARTELLA_ATTESI = os.path.join(CARTELLA_ESEMPIO, 'attesi')
+ESEMPIO = dict(prodotti=80, struttura=1, anno=2024, seme=2024)
+
+# Parametri degli ordini nei risultati attesi
+MESI_ORDINE_ATTESI = ['Maggio', 'Agosto']
+COLAZIONI_ORDINE_ATTESO = 400
+BUFFER_ORDINE_ATTESO = 10
+
+# Report della CLI inclusi nei risultati attesi (l'Excel è escluso: non è un CSV)
+REPORT_ATTESI = ['consumi', 'costi-pms', 'costi-prodotti', 'costi-reali', 'medie-reali', 'varianza']
+
+# Tolleranza nel confronto dei valori numerici con i risultati attesi
+TOLLERANZA = 1e-9
+
+# Stagione: apertura, colazioni massime giornaliere di riferimento e occupazione media per mese
+INIZIO_STAGIONE = (4, 15)
+FINE_STAGIONE = (10, 31)
+PAX_MASSIMI = 194
+OCCUPAZIONE_MESI = {4: 0.35, 5: 0.6, 6: 0.8, 7: 0.92, 8: 0.95, 9: 0.78, 10: 0.55}
+# Mese dopo la chiusura: solo qualche consumo residuo, nessuna colazione
+MESE_CHIUSURA = (11, 'Novembre')
+
+# Colonne dell'export delle colazioni, con gli spazi finali delle intestazioni originali
+INTESTAZIONE_COLAZIONI = [
+    'data', 'BREAKFAST PREVISTI (HOTEL)', 'BREAKFAST SERVITI (HOTEL) ', 'BREAKFAST PREVISTI (RESIDENCE) ',
+    'BREAKFAST SERVITI (RESIDENCE) ', 'BREAKFAST PREVISTI (CVM) ', 'BREAKFAST SERVITI (CVM) ',
+    'BREAKFAST PRENOTATI (ESTERNI) ', 'BREAKFAST COMPLEMENTARY ', 'CONSUMO REALE COLAZIONI ',
+]
+# Quota delle colazioni servite per hotel, residence, CVM, esterni e complementary
+QUOTE_SEGMENTI = [0.82, 0.08, 0.03, 0.03, 0.04]
+
+COLONNE_CONSUMI = ['Classe', 'Categoria', 'Codice', 'Descrizione', 'U.M.A.', 'U.M.C.', 'Coeff Conv',
+                   'Euro Medio', 'Quantita', 'Primo Per.', 'Mese', 'Costo Totale']
+COLONNE_FOGLIO = ['Categoria', 'Prodotto', 'Articolo', 'UDM', 'Quantità', 'Coefficiente']
+
+# Categorie del catalogo: classe e categoria dei consumi, categoria e unità dei fogli
+# mensili (None se non compare nei fogli), unità di acquisto e consumo, fattore di
+# conversione, prezzo e consumo per colazione tipici, peso nel catalogo, nomi dei prodotti
+CATALOGO = [
+    ('FOOD', 'SEMILDOL', 'Prodotti da Forno', 'pz', 'PZ', 'PZ', 1, 0.35, 0.08, 20,
+     ['CORNETTO VUOTO', 'CORNETTO CIOCCOLATO', 'CORNETTO CREMA', 'SACCOTTINO CIOCCOLATO', 'GIRELLA UVETTA',
+      'MUFFIN CACAO', 'TRECCIA NOCI PECAN', 'KRAPFEN CREMA']),
+    ('FOOD', 'PANE', 'Pane', 'cf', 'CF', 'CF', 1, 1.8, 0.015, 6,
+     ['PANE CASERECCIO', 'PANE INTEGRALE', 'FETTE BISCOTTATE', 'PANINI AL LATTE']),
+    ('FOOD', 'SALUMI', 'Salumi', 'kg', 'KG', 'KG', 1, 10.9, 0.005, 4,
+     ['PROSCIUTTO COTTO', 'SALAME MILANO', 'MORTADELLA', 'BRESAOLA']),
+    ('FOOD', 'FORMAGG', 'Prodotti Caseari', 'kg', 'KG', 'GR', 1000, 9.3, 0.007, 4,
+     ['MOZZARELLA', 'EMMENTAL', 'RICOTTA', 'PROVOLA']),
+    ('FOOD', 'CEREALI', 'Cereali', 'kg', 'KG', 'KG', 1, 3.9, 0.0012, 4,
+     ['CORN FLAKES', 'MUESLI', 'FIOCCHI AVENA']),
+    ('FOOD', 'YOGURT', 'Latte e Derivati', 'pz', 'PZ', 'PZ', 1, 0.45, 0.02, 3,
+     ['YOGURT BIANCO', 'YOGURT FRAGOLA', 'YOGURT GRECO']),
+    ('FOOD', 'MONODOLC', 'Spalmabili', 'pz', 'PZ', 'PZ', 1, 0.14, 0.03, 5,
+     ['MARMELLATA ALBICOCCA MONO', 'MIELE MONO', 'CREMA NOCCIOLA MONO']),
+    ('FOOD', 'PASTICCE', 'Torte', 'kg', 'KG', 'KG', 1, 6.0, 0.004, 6,
+     ['TORTA MARGHERITA', 'CROSTATA FRUTTI', 'PLUMCAKE']),
+    ('FOOD', 'FRUTTFRE', 'Frutta', 'kg', 'KG', 'GR', 1000, 1.8, 0.03, 5,
+     ['MELE', 'ARANCE', 'BANANE', 'ANANAS']),
+    ('FOOD', 'UOVA', 'Prodotti Salati', 'pz', 'PZ', 'PZ', 1, 0.185, 0.5, 1,
+     ['UOVA FRESCHE']),
+    ('BEVERAGE', 'CAFFETT', 'Bevande Calde', 'pz', 'CF', 'PZ', 1000, 2.45, 0.0005, 7,
+     ['CAFFE CIALDE', 'TE NERO', 'CAMOMILLA', 'ORZO SOLUBILE']),
+    ('BEVERAGE', 'SOFDRINK', 'Bevande Fredde', 'pz', 'PZ', 'PZ', 100, 41.7, 0.0024, 6,
+     ['SUCCO ARANCIA', 'SUCCO PESCA', 'SUCCO ACE']),
+    ('BEVERAGE', 'LATTE', 'Latte e Derivati', 'lt', 'LT', 'LT', 1000, 1.23, 0.0026, 4,
+     ['LATTE INTERO', 'LATTE PARZ SCREMATO', 'LATTE SENZA LATTOSIO']),
+    ('BEVERAGE', 'ACQUA', None, None, 'BT', 'BT', 1, 0.15, 0.01, 2,
+     ['ACQUA NATURALE', 'ACQUA FRIZZANTE']),
+    ('VARIE', 'MONOUSO', None, None, 'CF', 'CF', 30, 4.0, 0.003, 10,
+     ['TOVAGLIOLI', 'BICCHIERI CARTA', 'POSATE MONOUSO']),
+    ('VARIE', 'CARTBUSA', None, None, 'CF', 'PZ', 250, 5.5, 0.0005, 4,
+     ['SACCHETTI', 'BUSTE CARTA']),
+    ('PULIZIA', 'STRPULIZ', None, None, 'CF', 'CF', 1, 2.0, 0.0008, 3,
+     ['PANNO MICROFIBRA', 'SPUGNE']),
+]
+
+# Unità con quantità decimali negli export
+UNITA_DECIMALI = ('KG', 'LT')
+
+
+def genera_catalogo(prodotti, seme):
+    """Prodotti del catalogo, comuni a tutte le strutture e gli anni generati con lo stesso seme.
+
+    Ogni descrizione termina con un lotto di larghezza fissa, quindi nessuna
+    è contenuta in un'altra e l'abbinamento dei prezzi resta univoco. Una
+    parte degli articoli dei fogli mensili è scritta in minuscolo (come nei
+    fogli reali) e alcuni non hanno corrispondenza nei consumi.
+    """
+    rng = np.random.default_rng([seme, 0])
+    pesi = np.array([categoria[9] for categoria in CATALOGO], dtype=float)
+    categorie = rng.choice(len(CATALOGO), size=prodotti, p=pesi / pesi.sum())
+
+    righe = []
+    for indice, numero_categoria in enumerate(np.sort(categorie, kind='stable')):
+        (classe, categoria, categoria_foglio, udm, uma, umc, coeff_conv,
+         prezzo, coefficiente, _, nomi) = CATALOGO[numero_categoria]
+        nome = nomi[rng.integers(len(nomi))]
+        formato = f"{rng.integers(2, 20) * 5}GRX{rng.integers(2, 30) * 5}PZ" if uma == 'PZ' else f"{uma} {rng.integers(1, 6)}"
+        descrizione = f"{nome} {formato} L{indice + 1:05d}"
+
+        articolo = None
+        if categoria_foglio is not None:
+            estrazione = rng.random()
+            if estrazione < 0.05:
+                articolo = f"{nome} NON CODIFICATO {indice + 1}"
+            elif estrazione < 0.15:
+                articolo = descrizione.lower()
+            else:
+                articolo = descrizione
+
+        righe.append({
+            'Classe': classe,
+            'Categoria': categoria,
+            'Codice': f"{classe[:3]}.{categoria[:3]}.{indice + 1:05d}",
+            'Descrizione': descrizione,
+            'U.M.A.': uma,
+            'U.M.C.': umc,
+            'Coeff Conv': coeff_conv,
+            'Categoria Foglio': categoria_foglio,
+            'Prodotto': nome.title(),
+            'Articolo': articolo,
+            'UDM': udm,
+            'Prezzo': round(prezzo * rng.lognormal(0, 0.3), 4),
+            'Coefficiente': coefficiente * rng.lognormal(0, 0.5),
+        })
+    return pd.DataFrame(righe)
+
+
+def genera_colazioni(anno, pax_massimi, rng):
+    """Export giornaliero delle colazioni e colazioni servite per mese (anche nei giorni non registrati)"""
+    giorni = pd.date_range(datetime(anno, *INIZIO_STAGIONE), datetime(anno, *FINE_STAGIONE), freq='D')
+    occupazione = giorni.month.map(OCCUPAZIONE_MESI).to_numpy(dtype=float)
+    fine_settimana = np.where(giorni.dayofweek >= 5, 1.1, 1.0)
+    servite = np.clip(pax_massimi * occupazione * fine_settimana * rng.lognormal(0, 0.12, len(giorni)), 0, pax_massimi)
+    segmenti = rng.multinomial(np.rint(servite).astype(np.int64), QUOTE_SEGMENTI)
+    previsti = segmenti[:, :3] + rng.binomial(segmenti[:, :3], 0.05)
+    orari = rng.integers(10 * 3600 + 30 * 60, 12 * 3600, len(giorni))
+
+    df = pd.DataFrame({
+        'data': (giorni + pd.to_timedelta(orari, unit='s')).strftime(FORMATO_DATA_COLAZIONI),
+        INTESTAZIONE_COLAZIONI[1]: previsti[:, 0],
+        INTESTAZIONE_COLAZIONI[2]: segmenti[:, 0],
+        INTESTAZIONE_COLAZIONI[3]: previsti[:, 1],
+        INTESTAZIONE_COLAZIONI[4]: segmenti[:, 1],
+        INTESTAZIONE_COLAZIONI[5]: previsti[:, 2],
+        INTESTAZIONE_COLAZIONI[6]: segmenti[:, 2],
+        INTESTAZIONE_COLAZIONI[7]: segmenti[:, 3],
+        INTESTAZIONE_COLAZIONI[8]: segmenti[:, 4],
+        INTESTAZIONE_COLAZIONI[9]: segmenti.sum(axis=1),
+    })
+    colazioni_mesi = df[INTESTAZIONE_COLAZIONI[9]].groupby(giorni.month).sum()
+    # Alcuni giorni non vengono registrati nell'export
+    registrati = rng.random(len(df)) >= 0.02
+    return df[registrati].reset_index(drop=True), colazioni_mesi
+
+
+def genera_consumi(catalogo, colazioni_mesi, anni_trascorsi, rng):
+    """Export mensile dei consumi: una riga per prodotto consumato nel mese"""
+    mesi = list(colazioni_mesi.index) + [MESE_CHIUSURA[0]]
+    nomi_mesi = {**NOMI_MESI, MESE_CHIUSURA[0]: MESE_CHIUSURA[1]}
+    prodotti = len(catalogo)
+
+    # Consumo per colazione proprio della struttura e variazione mese per mese
+    coefficienti = catalogo['Coefficiente'].to_numpy()[:, None] * rng.lognormal(0, 0.15, (prodotti, 1))
+    colazioni = colazioni_mesi.reindex(mesi[:-1]).to_numpy(dtype=float)
+    # Dopo la chiusura: piccoli riordini pari a una frazione dell'ultimo mese
+    colazioni = np.append(colazioni, colazioni[-1] * 0.05)
+    quantita = coefficienti * colazioni[None, :] * rng.lognormal(0, 0.12, (prodotti, len(mesi)))
+    presenti = rng.random((prodotti, len(mesi))) < np.append(np.full(len(mesi) - 1, 0.92), 0.4)
+
+    decimali = catalogo['U.M.A.'].isin(UNITA_DECIMALI).to_numpy()[:, None]
+    quantita = np.where(decimali, np.round(quantita, 2), np.maximum(np.rint(quantita), 1))
+
+    # Prezzi: inflazione annua e, per alcuni prodotti, un cambio di prezzo durante la stagione
+    prezzi = np.repeat(catalogo['Prezzo'].to_numpy()[:, None] * 1.03 ** anni_trascorsi, len(mesi), axis=1)
+    cambia = rng.random(prodotti) < 0.15
+    dal_mese = rng.integers(1, len(mesi), prodotti)
+    variazione = rng.uniform(0.9, 1.1, prodotti)
+    prezzi = np.where(cambia[:, None] & (np.arange(len(mesi))[None, :] >= dal_mese[:, None]),
+                      prezzi * variazione[:, None], prezzi)
+    prezzi = np.round(prezzi, 4)
+
+    # Righe ordinate per mese e, nel mese, per prodotto, come negli export
+    colonne, righe = np.nonzero(presenti.T)
+    costi = np.round(prezzi[righe, colonne] * quantita[righe, colonne], 2)
+    df = catalogo.iloc[righe][['Classe', 'Categoria', 'Codice', 'Descrizione', 'U.M.A.', 'U.M.C.', 'Coeff Conv']]
+    df = df.assign(
+        **{
+            'Euro Medio': prezzi[righe, colonne],
+            'Quantita': quantita[righe, colonne],
+            'Primo Per.': np.round(costi * rng.uniform(0.2, 1.1, len(righe)), 4),
+            'Mese': [f"{mesi[c]:02d}_{nomi_mesi[mesi[c]]}" for c in colonne],
+            'Costo Totale': costi,
+        }
+    )
+    return df[COLONNE_CONSUMI].reset_index(drop=True), quantita * presenti, mesi
+
+
+def fogli_mensili(catalogo, quantita, mesi, presenze_mesi):
+    """Fogli dei coefficienti per i mesi con colazioni: quantità del mese e consumo per colazione"""
+    nel_foglio = catalogo['Articolo'].notna().to_numpy()
+    fogli = {}
+    for colonna, mese in enumerate(mesi):
+        presenze = presenze_mesi.get(mese, 0)
+        if mese not in NOMI_MESI or presenze == 0:
+            continue
+        quantita_mese = quantita[nel_foglio, colonna]
+        fogli[NOMI_MESI[mese]] = (presenze, pd.DataFrame({
+            'Categoria': catalogo.loc[nel_foglio, 'Categoria Foglio'].to_numpy(),
+            'Prodotto': catalogo.loc[nel_foglio, 'Prodotto'].to_numpy(),
+            'Articolo': catalogo.loc[nel_foglio, 'Articolo'].to_numpy(),
+            'UDM': catalogo.loc[nel_foglio, 'UDM'].to_numpy(),
+            'Quantità': quantita_mese,
+            'Coefficiente': np.round(quantita_mese / presenze, 5),
+        }))
+    return fogli
+
+
+def scrivi_cartella_coefficienti(percorso, fogli):
+    """Cartella dei coefficienti con riepilogo, un foglio per mese e matrice dei coefficienti.
+
+    Stessa disposizione dei fogli reali: titolo, presenze totali e una riga
+    vuota prima dell'intestazione. Scritta in modalità write_only per le
+    cartelle di grandi dimensioni.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    riepilogo = workbook.create_sheet('Summary')
+    riepilogo.append(['DASHBOARD COLAZIONI - COEFFICIENTI DI CONSUMO'])
+    riepilogo.append([])
+    riepilogo.append(['RIEPILOGO PRESENZE MENSILI'])
+    riepilogo.append(['Mese', 'Codice', 'Presenze Totali'])
+    for nome, (presenze, _) in fogli.items():
+        riepilogo.append([nome, f"{NUMERI_MESI[nome]:02d}_{nome}", int(presenze)])
+
+    for nome, (presenze, df) in fogli.items():
+        foglio = workbook.create_sheet(nome)
+        foglio.append([f"COEFFICIENTI DI CONSUMO - {nome.upper()}"])
+        foglio.append([f"Presenze totali: {int(presenze)}"])
+        foglio.append([])
+        foglio.append(COLONNE_FOGLIO)
+        for riga in df.itertuples(index=False, name=None):
+            foglio.append(list(riga))
+
+    matrice = workbook.create_sheet('Coefficienti Mensili')
+    matrice.append(['Categoria', 'Prodotto', 'Articolo', 'UDM'] + list(fogli))
+    if fogli:
+        primo = next(iter(fogli.values()))[1]
+        coefficienti = np.column_stack([df['Coefficiente'].to_numpy() for _, df in fogli.values()])
+        for riga, valori in zip(primo[['Categoria', 'Prodotto', 'Articolo', 'UDM']].itertuples(index=False, name=None),
+                                coefficienti.tolist()):
+            matrice.append(list(riga) + valori)
+    workbook.save(percorso)
+
+
+def scrivi_giacenze(percorso, catalogo, quantita, rng):
+    """File delle giacenze di magazzino con le quantità in formato italiano (virgola decimale)"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    foglio = workbook.create_sheet('Giacenze')
+    foglio.append(['Codice', 'Descrizione', 'U.M.', 'Magazz.'])
+    # Scorte di pochi giorni dell'ultimo mese di servizio; circa un prodotto su tre esaurito
+    scorte = quantita[:, -2] * rng.uniform(0, 0.1, len(catalogo)) * (rng.random(len(catalogo)) >= 0.35)
+    scorte = np.round(scorte, 1)
+    articoli = catalogo['Articolo'].fillna(catalogo['Descrizione'])
+    for codice, articolo, unita, scorta in zip(catalogo['Codice'], articoli, catalogo['U.M.A.'], scorte):
+        foglio.append([codice, articolo, unita, f"{scorta:.1f}".replace('.', ',')])
+    workbook.save(percorso)
+
+
+def genera_cartella(cartella, prodotti, struttura=1, anno=2024, seme=0, anno_iniziale=None, catalogo=None):
+    """Scrive i file di input di una struttura per una stagione e restituisce il numero di righe per file"""
+    os.makedirs(cartella, exist_ok=True)
+    catalogo = genera_catalogo(prodotti, seme) if catalogo is None else catalogo
+    rng = np.random.default_rng([seme, struttura, anno])
+    pax_massimi = int(PAX_MASSIMI * rng.uniform(0.6, 1.6))
+
+    df_colazioni, colazioni_mesi = genera_colazioni(anno, pax_massimi, rng)
+    df_consumi, quantita, mesi = genera_consumi(catalogo, colazioni_mesi, anno - (anno_iniziale or anno), rng)
+    presenze_mesi = df_colazioni[INTESTAZIONE_COLAZIONI[9]].groupby(
+        pd.to_datetime(df_colazioni['data'], format=FORMATO_DATA_COLAZIONI).dt.month
+    ).sum()
+
+    df_consumi.to_csv(os.path.join(cartella, FILE_CONSUMI), index=False)
+    df_colazioni.to_csv(os.path.join(cartella, nome_file_colazioni(anno)), index=False)
+    fogli = fogli_mensili(catalogo, quantita, mesi, presenze_mesi)
+    scrivi_cartella_coefficienti(os.path.join(cartella, FILE_DASHBOARD), fogli)
+    scrivi_giacenze(os.path.join(cartella, FILE_GIACENZE), catalogo, quantita, rng)
+    return {
+        FILE_CONSUMI: len(df_consumi),
+        nome_file_colazioni(anno): len(df_colazioni),
+        FILE_DASHBOARD: sum(len(df) for _, df in fogli.values()),
+        FILE_GIACENZE: len(catalogo),
+    }
+
+
+def genera_dati(cartella_output, prodotti, strutture=1, anni=1, anno_iniziale=2024, seme=0):
+    """Una cartella di input per ogni struttura e anno: <output>/struttura_NN/<anno>"""
+    catalogo = genera_catalogo(prodotti, seme)
+    righe = {}
+    for struttura in range(1, strutture + 1):
+        for anno in range(anno_iniziale, anno_iniziale + anni):
+            cartella = os.path.join(cartella_output, f"struttura_{struttura:02d}", str(anno))
+            righe[cartella] = genera_cartella(cartella, prodotti, struttura, anno, seme, anno_iniziale, catalogo)
+    return pd.DataFrame.from_dict(righe, orient='index')
+
+
+def calcola_risultati(cartella_dati):
+    """Risultati confrontati con quelli attesi: nome del file -> DataFrame.
+
+    Coprono il caricamento (matrice dei coefficienti), l'abbinamento dei
+    prezzi per ogni mese, l'ordine di alcuni mesi con buffer e giacenze e
+    i CSV dei report della CLI.
+    """
+    from colazioni_cli import genera_report
+    from dati_comuni import DatiCondivisi
+    from esportazione_excel import tabella_coefficienti
+    from ordini import calcola_ordine
+    from prezzi import StoricoPrezzi
+    from schemi_input import SCHEMI, leggi_excel
+
+    dati = DatiCondivisi(cartella_dati)
+    compatti = dati.compatti
+    storico = StoricoPrezzi(dati.consumi)
+    risultati = {'coefficienti.csv': tabella_coefficienti(compatti)}
+
+    articoli = compatti.articoli['Articolo']
+    risultati['prezzi_articoli.csv'] = pd.concat(
+        [storico.prezzi(articoli, NUMERI_MESI[mese]).assign(Articolo=articoli.to_numpy(), Mese=mese)
+         for mese in compatti.mesi],
+        ignore_index=True
+    )
+
+    giacenze = leggi_excel(os.path.join(cartella_dati, FILE_GIACENZE), SCHEMI['giacenze'])
+    for mese in MESI_ORDINE_ATTESI:
+        vista = compatti.vista_mese(mese, solo_positivi=True)
+        risultati[f"ordine_{mese}.csv"] = calcola_ordine(
+            vista, storico, COLAZIONI_ORDINE_ATTESO, BUFFER_ORDINE_ATTESO, True, giacenze, mese_prezzi=NUMERI_MESI[mese]
+        )
+
+    with tempfile.TemporaryDirectory() as cartella_report:
+        with contextlib.redirect_stdout(io.StringIO()):
+            genera_report(REPORT_ATTESI, cartella_dati, cartella_report)
+        for nome_file in sorted(os.listdir(cartella_report)):
+            if nome_file.endswith('.csv'):
+                risultati[nome_file] = pd.read_csv(os.path.join(cartella_report, nome_file))
+    return risultati
+
+
+def confronta_tabelle(attesa, ottenuta):
+    """Differenze tra due tabelle (lista vuota se coincidono): colonne, righe, valori"""
+    if list(attesa.columns) != list(ottenuta.columns):
+        return [f"colonne diverse: {list(attesa.columns)} invece di {list(ottenuta.columns)}"]
+    if len(attesa) != len(ottenuta):
+        return [f"{len(ottenuta)} righe invece di {len(attesa)}"]
+    differenze = []
+    for colonna in attesa.columns:
+        valori_attesi, valori = attesa[colonna], ottenuta[colonna]
+        if pd.api.types.is_numeric_dtype(valori_attesi) and pd.api.types.is_numeric_dtype(valori):
+            uguali = np.isclose(valori.to_numpy(dtype=float), valori_attesi.to_numpy(dtype=float),
+                                rtol=TOLLERANZA, atol=TOLLERANZA, equal_nan=True)
+        else:
+            uguali = (valori.astype(str) == valori_attesi.astype(str)).to_numpy()
+        if not uguali.all():
+            riga = int(np.flatnonzero(~uguali)[0])
+            differenze.append(f"colonna '{colonna}': {int((~uguali).sum())} valori diversi "
+                              f"(riga {riga}: {valori.iloc[riga]!r} invece di {valori_attesi.iloc[riga]!r})")
+    return differenze
+
+
+def verifica(cartella_esempio=CARTELLA_ESEMPIO, cartella_attesi=CARTELLA_ATTESI, aggiorna=False):
+    """Confronta dati di esempio e risultati con quelli versionati; con `aggiorna` li riscrive.
+
+    I dati di esempio vengono rigenerati dal seme e devono coincidere con
+    quelli versionati (il generatore è deterministico). Restituisce il
+    numero di file con differenze.
+    """
+    if aggiorna:
+        genera_cartella(cartella_esempio, **ESEMPIO)
+        os.makedirs(cartella_attesi, exist_ok=True)
+        for nome_file, df in calcola_risultati(cartella_esempio).items():
+            df.to_csv(os.path.join(cartella_attesi, nome_file), index=False)
+        print(f"Dati di esempio e risultati attesi aggiornati in {cartella_esempio}")
+        return 0
+
+    errori = 0
+    with tempfile.TemporaryDirectory() as cartella_generata:
+        genera_cartella(cartella_generata, **ESEMPIO)
+        for nome_file in (FILE_CONSUMI, nome_file_colazioni(ESEMPIO['anno'])):
+            differenze = confronta_tabelle(pd.read_csv(os.path.join(cartella_esempio, nome_file)),
+                                           pd.read_csv(os.path.join(cartella_generata, nome_file)))
+            errori += stampa_esito(f"generatore: {nome_file}", differenze)
+
+    risultati = calcola_risultati(cartella_esempio)
+    attesi = sorted(nome for nome in os.listdir(cartella_attesi) if nome.endswith('.csv'))
+    for nome_file in sorted(set(attesi) | set(risultati)):
+        if nome_file not in risultati:
+            differenze = ["risultato non più prodotto"]
+        elif nome_file not in attesi:
+            differenze = ["risultato senza valori attesi (usa --aggiorna)"]
+        else:
+            # Passa dal CSV anche il risultato, così tipi e arrotondamenti sono gli stessi
+            ottenuto = pd.read_csv(io.StringIO(risultati[nome_file].to_csv(index=False)))
+            differenze = confronta_tabelle(pd.read_csv(os.path.join(cartella_attesi, nome_file)), ottenuto)
+        errori += stampa_esito(nome_file, differenze)
+    return errori
+
+
+def stampa_esito(nome, differenze):
+    print(f"{'OK  ' if not differenze else 'DIFF'} {nome}")
+    for differenza in differenze:
+        print(f"     {differenza}")
+    return int(bool(differenze))
+
+
+def misura(cartella_dati, ripetizioni=3):
+    """Tempi in millisecondi di caricamento, abbinamento dei prezzi e ordini di tutti i mesi (il migliore)"""
+    from dati_comuni import carica_colazioni, carica_consumi, carica_fogli_mensili
+    from modello_dati import costruisci_dati_compatti
+    from ordini import calcola_ordine
+    from prezzi import StoricoPrezzi
+    from schemi_input import SCHEMI, leggi_excel
+    percorso = lambda nome_file: os.path.join(cartella_dati, nome_file)
+    tempi = {}
+
+    def cronometra(fase, funzione):
+        migliore = None
+        for _ in range(ripetizioni):
+            inizio = time.perf_counter()
+            risultato = funzione()
+            durata = (time.perf_counter() - inizio) * 1000
+            migliore = durata if migliore is None else min(migliore, durata)
+        tempi[fase] = migliore
+        return risultato
+
+    fogli = cronometra('lettura fogli mensili', lambda: carica_fogli_mensili(percorso(FILE_DASHBOARD)))
+    consumi = cronometra('lettura consumi', lambda: carica_consumi(percorso(FILE_CONSUMI)))
+    colazioni = cronometra('lettura colazioni', lambda: carica_colazioni(percorso(trova_file_colazioni(cartella_dati))))
+    compatti = cronometra('dati compatti', lambda: costruisci_dati_compatti(fogli, consumi, colazioni))
+    storico = cronometra('storico prezzi', lambda: StoricoPrezzi(consumi))
+    articoli = compatti.articoli['Articolo']
+    cronometra('abbinamento prezzi', lambda: storico.prezzi(articoli))
+    giacenze = leggi_excel(percorso(FILE_GIACENZE), SCHEMI['giacenze'])
+    cronometra('ordini di tutti i mesi', lambda: [
+        calcola_ordine(compatti.vista_mese(mese, solo_positivi=True), storico, COLAZIONI_ORDINE_ATTESO,
+                       BUFFER_ORDINE_ATTESO, True, giacenze, mese_prezzi=NUMERI_MESI[mese])
+        for mese in compatti.mesi
+    ])
+    dimensioni = {'consumi': len(consumi), 'colazioni': len(colazioni), 'articoli': len(articoli)}
+    return pd.Series(tempi, name='ms'), dimensioni
+
+
+def crea_parser():
+    parser = argparse.ArgumentParser(description="Dati sintetici per le analisi delle colazioni")
+    sottocomandi = parser.add_subparsers(dest='comando', required=True)
+
+    genera = sottocomandi.add_parser('genera', help="Genera i file di input per strutture e anni")
+    genera.add_argument('--output', required=True, metavar='CARTELLA', help="Cartella in cui scrivere i dati")
+    genera.add_argument('--prodotti', type=int, default=200, metavar='N',
+                        help="Prodotti nel catalogo dei consumi (default: 200)")
+    genera.add_argument('--strutture', type=int, default=1, metavar='N', help="Numero di strutture (default: 1)")
+    genera.add_argument('--anni', type=int, default=1, metavar='N', help="Stagioni per struttura (default: 1)")
+    genera.add_argument('--anno-iniziale', type=int, default=2024, metavar='ANNO',
+                        help="Anno della prima stagione (default: 2024)")
+    genera.add_argument('--seme', type=int, default=0, help="Seme del generatore (default: 0)")
+
+    controlla = sottocomandi.add_parser('verifica', help="Confronta i risultati con quelli attesi in example_data")
+    controlla.add_argument('--aggiorna', action='store_true',
+                           help="Rigenera i dati di esempio e riscrive i risultati attesi")
+
+    cronometro = sottocomandi.add_parser('misura', help="Misura caricamento, abbinamento dei prezzi e ordini")
+    cronometro.add_argument('--dati', required=True, metavar='CARTELLA', help="Cartella dei dati da misurare")
+    cronometro.add_argument('--ripetizioni', type=int, default=3, metavar='N',
+                            help="Ripetizioni di ogni fase, vale la più veloce (default: 3)")
+    return parser
+
+
+def main(argv=None):
+    args = crea_parser().parse_args(argv)
+    if args.comando == 'genera':
+        righe = genera_dati(args.output, args.prodotti, args.strutture, args.anni, args.anno_iniziale, args.seme)
+        print(righe.to_string())
+        print(f"\n{len(righe)} cartelle di dati create in {args.output}")
+        return 0
+    if args.comando == 'misura':
+        tempi, dimensioni = misura(args.dati, args.ripetizioni)
+        print(", ".join(f"{valore} {nome}" for nome, valore in dimensioni.items()))
+        print(tempi.round(1).to_string())
+        return 0
+    return 1 if verifica(aggiorna=args.aggiorna) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import io
+import os
+import pickle
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calcolo_costi_reali import calcola_dettaglio_categorie
+
+FILE_OUTPUT = 'report_stagione.xlsx'
+
+# Excel non accetta nomi di foglio più lunghi di 31 caratteri
+LUNGHEZZA_MASSIMA_FOGLIO = 31
+
+# Errori di una cache dei risultati non leggibile (file bloccato, corrotto o su disco pieno)
+ERRORI_CACHE = (sqlite3.Error, pickle.UnpicklingError, EOFError)
+
+
+def _valore_cella(valore):
+    """Valore Python scrivibile da openpyxl (celle vuote per i mancanti)"""
+    if valore is None or (not isinstance(valore, str) and pd.isna(valore)):
+        return None
+    if isinstance(valore, pd.Timestamp):
+        return valore.to_pydatetime()
+    if isinstance(valore, np.generic):
+        return valore.item()
+    return valore
+
+
+def scrivi_excel(destinazione, fogli):
+    """Scrive un dizionario nome foglio -> DataFrame in un file xlsx.
+
+    Usa openpyxl in modalità write_only: le righe sono scritte una alla
+    volta senza tenere in memoria la struttura delle celle, quindi la
+    memoria resta costante anche per cartelle di lavoro di un'intera
+    stagione. `destinazione` è un percorso o un file binario.
+    """
+    # Import locale: openpyxl serve solo quando si esporta, non all'avvio della dashboard
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    grassetto = Font(bold=True)
+    for nome, df in fogli.items():
+        foglio = workbook.create_sheet(title=str(nome)[:LUNGHEZZA_MASSIMA_FOGLIO])
+        intestazione = []
+        for colonna in df.columns:
+            cella = WriteOnlyCell(foglio, value=str(colonna))
+            cella.font = grassetto
+            intestazione.append(cella)
+        foglio.append(intestazione)
+        for riga in df.itertuples(index=False, name=None):
+            foglio.append([_valore_cella(valore) for valore in riga])
+    workbook.save(destinazione)
+
+
+def excel_in_memoria(fogli):
+    """Contenuto xlsx dei fogli indicati, pronto per un download"""
+    buffer = io.BytesIO()
+    scrivi_excel(buffer, fogli)
+    return buffer.getvalue()
+
+
+def tabella_coefficienti(dati):
+    """Matrice dei coefficienti articoli × mesi di un DatiCompatti come DataFrame"""
+    tabella = dati.articoli.astype(object).copy()
+    matrice = dati.matrice_coefficienti()
+    for colonna, mese in enumerate(dati.mesi):
+        tabella[mese] = matrice[:, colonna]
+    return tabella
+
+
+def fogli_ordine(df_ordine, colonne, df_riepilogo=None, dati=None):
+    """Fogli del report ordine: dettaglio per categoria, totali per categoria e dati di contesto"""
+    ordine = df_ordine[colonne].sort_values(['Categoria', 'Articolo'], na_position='last')
+    fogli = {'Ordine': ordine}
+
+    colonna_costo = next((c for c in ('Costo Ordine Effettivo', 'Costo Ordine con Buffer') if c in colonne), None)
+    if colonna_costo is not None:
+        per_categoria = (
+            ordine.fillna({'Categoria': 'Senza categoria'})
+            .groupby('Categoria', sort=True)
+            .agg(Prodotti=('Articolo', 'size'), Costo=(colonna_costo, 'sum'))
+            .reset_index()
+        )
+        fogli['Totali per Categoria'] = per_categoria
+    if df_riepilogo is not None:
+        fogli['Riepilogo Mensile'] = df_riepilogo
+    if dati is not None:
+        fogli['Coefficienti'] = tabella_coefficienti(dati)
+    return fogli
+
+
+def fogli_stagione(df_riepilogo, df_categorie, dati):
+    """Fogli della cartella di lavoro di stagione"""
+    return {
+        'Riepilogo Mensile': df_riepilogo,
+        'Costi per Categoria': df_categorie,
+        'Coefficienti': tabella_coefficienti(dati),
+    }
+
+
+class EsportatoreExcel:
+    """Genera i file Excel in un thread in background e li salva nella cache dei risultati.
+
+    Avviare una generazione non blocca chi la richiede: il file viene
+    scritto in background e salvato nella cache (vedi
+    cache_risultati.CacheRisultati) sotto la chiave degli input, dove le
+    esecuzioni successive lo trovano pronto. Richieste identiche mentre il
+    file è in preparazione non avviano un secondo lavoro. Se la cache non è
+    leggibile il file non potrebbe esservi ritrovato, quindi viene generato
+    subito da chi lo richiede.
+    """
+
+    def __init__(self, cache, thread=1):
+        self.cache = cache
+        self.esecutore = ThreadPoolExecutor(max_workers=thread, thread_name_prefix='esportazione-excel')
+        self.in_corso = {}
+        self.errori = {}
+        self.lucchetto = threading.Lock()
+
+    def _genera(self, chiave, crea_fogli, parametri):
+        try:
+            contenuto = excel_in_memoria(crea_fogli(*parametri))
+            self.cache.scrivi(chiave, contenuto)
+        except Exception as e:
+            with self.lucchetto:
+                self.errori[chiave] = e
+        finally:
+            with self.lucchetto:
+                self.in_corso.pop(chiave, None)
+
+    def _leggi(self, chiave):
+        """Contenuto salvato per la chiave (None se assente) e se la cache è leggibile"""
+        try:
+            return self.cache.leggi(chiave), True
+        except ERRORI_CACHE:
+            return None, False
+
+    def pronto(self, chiave):
+        """Contenuto xlsx già generato per la chiave, oppure None (anche con la cache non leggibile)"""
+        return self._leggi(chiave)[0]
+
+    def avvia(self, chiave, crea_fogli, *parametri):
+        """Avvia in background la generazione di crea_fogli(*parametri), se non è già in corso.
+
+        Con la cache non leggibile genera il file subito e ne restituisce il
+        contenuto; altrimenti restituisce None.
+        """
+        if not self._leggi(chiave)[1]:
+            return excel_in_memoria(crea_fogli(*parametri))
+        with self.lucchetto:
+            if chiave not in self.in_corso:
+                self.errori.pop(chiave, None)
+                self.in_corso[chiave] = self.esecutore.submit(self._genera, chiave, crea_fogli, parametri)
+        return None
+
+    def in_preparazione(self, chiave):
+        with self.lucchetto:
+            return chiave in self.in_corso
+
+    def errore(self, chiave):
+        """Eccezione dell'ultima generazione fallita per la chiave, oppure None"""
+        with self.lucchetto:
+            return self.errori.get(chiave)
+
+
+def genera_report(dati, cartella_output='.'):
+    """Report 'excel': cartella di lavoro di stagione con riepilogo, costi per categoria e coefficienti"""
+    compatti = dati.compatti
+    df_categorie = calcola_dettaglio_categorie(dati.consumi, dati.riepilogo_mensile)
+    percorso = os.path.join(cartella_output, FILE_OUTPUT)
+    scrivi_excel(percorso, fogli_stagione(dati.riepilogo_mensile, df_categorie, compatti))
+    print(f"Cartella di lavoro creata: {percorso} ({len(compatti.articoli)} articoli, {len(compatti.mesi)} mesi)")
+    return percorso
+
+
+def main(argv=None):
+    from colazioni_cli import esegui_report_singolo
+    esegui_report_singolo('excel', argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Grafici plotly della dashboard.
+
+plotly è il modulo più lento da importare tra quelli della dashboard:
+breakfast_dashboard.py carica questo modulo solo quando una vista disegna
+il primo grafico, così titolo, filtri e metriche arrivano prima al browser.
+"""
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Colori dei grafici, in tinta con il tema della dashboard
+COLORI = ['#8B6914', '#D2691E', '#CD853F', '#DEB887', '#F4A460', '#DAA520', '#B8860B', '#FFD700']
+
+# Assi con griglia chiara e bordo
+ASSE_GRIGLIA = dict(
+    showgrid=True,
+    gridwidth=1,
+    gridcolor='#E0E0E0',
+    showline=True,
+    linewidth=1,
+    linecolor='#E0E0E0'
+)
+
+
+def grafico_top_coefficienti(df_top_coefficienti):
+    """Barre orizzontali dei prodotti con il coefficiente di consumo più alto"""
+    fig_coeff = go.Figure()
+    fig_coeff.add_trace(go.Bar(
+        x=df_top_coefficienti['Coefficiente'],
+        y=df_top_coefficienti['Articolo'],
+        orientation='h',
+        marker_color='#8B6914',
+        text=df_top_coefficienti['Coefficiente'].apply(lambda x: f'{x:.5f}'),
+        textposition='outside'
+    ))
+
+    fig_coeff.update_layout(
+        title='Prodotti con Maggior Consumo per Colazione',
+        xaxis_title='Coefficiente di Consumo',
+        yaxis_title='Prodotto',
+        height=400,
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color='#333333'),
+        xaxis=dict(
+            showgrid=True,
+            gridwidth=1,
+            gridcolor='#E0E0E0'
+        ),
+        yaxis=dict(
+            showgrid=False,
+            autorange='reversed'
+        ),
+        margin=dict(l=200)
+    )
+    return fig_coeff
+
+
+def grafico_confronto_giornaliero(target_giornaliero, df_mese_colazioni, giorni_anomali, mese):
+    """Colazioni reali del mese contro il target giornaliero, con i giorni anomali evidenziati"""
+    fig = go.Figure()
+
+    # Linea delle colazioni target, ripartita sulle colazioni previste di ogni giorno
+    fig.add_trace(go.Scatter(
+        x=target_giornaliero.index,
+        y=target_giornaliero.values,
+        name='Target Giornaliero',
+        line=dict(color='#8B6914', dash='dash', width=2)
+    ))
+
+    # Linea delle colazioni reali
+    fig.add_trace(go.Scatter(
+        x=df_mese_colazioni['data'],
+        y=df_mese_colazioni['CONSUMO REALE COLAZIONI'],
+        name='Colazioni Reali',
+        line=dict(color='#D2691E', width=3)
+    ))
+
+    # Giorni lontani dalla mediana mobile
+    if giorni_anomali is not None and not giorni_anomali.empty:
+        fig.add_trace(go.Scatter(
+            x=giorni_anomali['data'],
+            y=giorni_anomali['Colazioni'],
+            name='Giorni Anomali',
+            mode='markers',
+            marker=dict(color='#B22222', size=12, symbol='x')
+        ))
+
+    fig.update_layout(
+        title=f'Confronto Target vs Colazioni Reali - {mese}',
+        xaxis_title='Data',
+        yaxis_title='Numero Colazioni',
+        hovermode='x unified',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color='#333333'),
+        xaxis=ASSE_GRIGLIA,
+        yaxis=ASSE_GRIGLIA
+    )
+    return fig
+
+
+def grafico_categorie(df_categorie, mese):
+    """Torta del consumo del mese per categoria"""
+    fig = px.pie(
+        df_categorie,
+        values='Consumo Totale',
+        names='Categoria',
+        title=f'Consumo per Categoria - {mese}',
+        color_discrete_sequence=COLORI
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color='#333333')
+    )
+    return fig
+
+
+def grafico_confronto_mesi(df_confronto, categoria):
+    """Barre raggruppate del consumo di ogni prodotto della categoria nei mesi scelti"""
+    fig = px.bar(
+        df_confronto,
+        x='Prodotto',
+        y='Consumo Totale',
+        color='Mese',
+        title=f'Confronto Consumi per Mese - {categoria}',
+        barmode='group',
+        color_discrete_sequence=COLORI[:7]
+    )
+    fig.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color='#333333'),
+        xaxis=ASSE_GRIGLIA,
+        yaxis=ASSE_GRIGLIA,
+        xaxis_tickangle=-45
+    )
+    return fig
+
+
+def grafico_variazioni(totale, mese_precedente, mese):
+    """Cascata dal costo del mese precedente a quello del mese, per effetto (vedi varianza_costi.py)"""
+    fig = go.Figure(go.Waterfall(
+        x=[mese_precedente, "Volume", "Mix", "Prezzo", "Residuo", mese],
+        measure=['absolute', 'relative', 'relative', 'relative', 'relative', 'total'],
+        y=[totale['Costo Precedente'], totale['Effetto Volume'], totale['Effetto Mix'],
+           totale['Effetto Prezzo'], totale['Residuo'], 0],
+        increasing=dict(marker=dict(color='#D2691E')),
+        decreasing=dict(marker=dict(color='#8B6914')),
+        totals=dict(marker=dict(color='#DEB887')),
+        connector=dict(line=dict(color='#E0E0E0'))
+    ))
+    fig.update_layout(
+        title=f'Variazione dei Costi - {mese_precedente} → {mese}',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color='#333333'),
+        yaxis=dict(showgrid=True, gridwidth=1, gridcolor='#E0E0E0')
+    )
+    return fig
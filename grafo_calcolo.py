@@ -0,0 +1,87 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cache_risultati import chiave_risultato, impronta_dataframe
+
+# Risultati conservati per ogni nodo (i meno recenti vengono scartati)
+MAX_VOCI_NODO = 8
+
+
+def firma_valore(valore):
+    """Impronta di un ingresso del grafo: contenuto per DataFrame e array, JSON per il resto"""
+    if isinstance(valore, (pd.DataFrame, pd.Series)):
+        return impronta_dataframe(valore.to_frame() if isinstance(valore, pd.Series) else valore)
+    if isinstance(valore, np.ndarray):
+        return hashlib.sha256(np.ascontiguousarray(valore).tobytes() + str(valore.dtype).encode()).hexdigest()
+    return chiave_risultato(valore)
+
+
+class GrafoCalcolo:
+    """Grafo delle tabelle derivate, con ogni nodo memorizzato sui propri ingressi.
+
+    Un nodo è una funzione pura delle sue dipendenze (altri nodi o ingressi
+    passati a calcola()). La firma di un nodo combina il suo nome con le
+    firme delle dipendenze, quindi cambiando un solo ingresso si ricalcolano
+    solo i nodi che ne dipendono, direttamente o a valle; gli altri vengono
+    serviti dalla memoria. I nodi non devono modificare gli argomenti: lo
+    stesso valore è condiviso tra esecuzioni e sessioni.
+    """
+
+    def __init__(self, voci_per_nodo=MAX_VOCI_NODO):
+        self.voci_per_nodo = voci_per_nodo
+        self.nodi = {}
+        self.memoria = {}
+        self.lucchetto = threading.Lock()
+
+    def aggiungi(self, nome, funzione, *dipendenze):
+        """Registra un nodo calcolato come funzione(*valori delle dipendenze)"""
+        self.nodi[nome] = (funzione, dipendenze)
+        self.memoria[nome] = OrderedDict()
+
+    def calcola(self, nome, ingressi, firme=None):
+        """Valore del nodo per gli ingressi indicati.
+
+        `firme` sostituisce l'impronta calcolata di alcuni ingressi, per
+        oggetti che non si possono confrontare per contenuto (per esempio
+        uno storico caricato per versione dei dati, la cui firma è la versione).
+        """
+        firme_ingressi = {
+            chiave: firme[chiave] if firme and chiave in firme else firma_valore(valore)
+            for chiave, valore in ingressi.items()
+        }
+        return self._valuta(nome, ingressi, firme_ingressi, {})[0]
+
+    def _valuta(self, nome, ingressi, firme_ingressi, valutati):
+        if nome in ingressi:
+            return ingressi[nome], firme_ingressi[nome]
+        if nome in valutati:
+            return valutati[nome]
+        if nome not in self.nodi:
+            raise KeyError(f"Nodo o ingresso sconosciuto: {nome}")
+
+        funzione, dipendenze = self.nodi[nome]
+        argomenti, firme_dipendenze = [], []
+        for dipendenza in dipendenze:
+            valore, firma_dipendenza = self._valuta(dipendenza, ingressi, firme_ingressi, valutati)
+            argomenti.append(valore)
+            firme_dipendenze.append(firma_dipendenza)
+        firma = chiave_risultato(nome, firme_dipendenze)
+
+        memoria = self.memoria[nome]
+        with self.lucchetto:
+            if firma in memoria:
+                memoria.move_to_end(firma)
+                valutati[nome] = (memoria[firma], firma)
+                return valutati[nome]
+
+        valore = funzione(*argomenti)
+        with self.lucchetto:
+            memoria[firma] = valore
+            while len(memoria) > self.voci_per_nodo:
+                memoria.popitem(last=False)
+        valutati[nome] = (valore, firma)
+        return valutati[nome]
@@ -0,0 +1,201 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from cache_risultati import CARTELLA_CACHE
+from dati_comuni import DatiCondivisi, versione_dati
+from modello_dati import DatiCompatti, costruisci_dati_compatti
+
+# Cartelle delle istantanee binarie, una per versione dei dati
+PREFISSO_ISTANTANEA = 'istantanea-'
+FILE_MANIFESTO = 'manifesto.json'
+
+# Istantanee conservate nella cartella della cache, inclusa quella appena scritta:
+# più cartelle di dati o versioni possono condividere la stessa cache
+ISTANTANEE_CONSERVATE = 4
+
+# Da incrementare quando cambia il formato dei file scritti
+FORMATO_ISTANTANEA = 2
+
+
+def cartella_istantanea(versione, cartella_cache=CARTELLA_CACHE):
+    """Cartella dell'istantanea di una versione dei dati"""
+    impronta = hashlib.sha256(versione.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cartella_cache, PREFISSO_ISTANTANEA + impronta)
+
+
+def _salva_tabella(df, nome, cartella):
+    """Salva ogni colonna in un file .npy.
+
+    Le categorie vanno nel manifesto come codici; gli interi nullable (Int64)
+    sono salvati come float con NaN al posto di pd.NA e il tipo nel manifesto.
+    """
+    colonne = []
+    for posizione, colonna in enumerate(df.columns):
+        valori = df[colonna]
+        descrizione = {'nome': colonna, 'file': f"{nome}_{posizione}.npy", 'categorie': None, 'tipo': None}
+        if isinstance(valori.dtype, pd.CategoricalDtype):
+            descrizione['categorie'] = valori.cat.categories.tolist()
+            valori = valori.cat.codes
+        elif isinstance(valori.dtype, pd.api.extensions.ExtensionDtype):
+            descrizione['tipo'] = str(valori.dtype)
+            valori = valori.astype('float64')
+        np.save(os.path.join(cartella, descrizione['file']), valori.to_numpy())
+        colonne.append(descrizione)
+    return {'righe': len(df), 'colonne': colonne}
+
+
+def _carica_tabella(descrizione, cartella):
+    """DataFrame ricostruito dalle colonne mappate in memoria.
+
+    Le colonne numeriche restano mappate sul file finché pandas non le
+    consolida; le categorie sono ricostruite dai codici senza rileggere testo.
+    """
+    dati = {}
+    for colonna in descrizione['colonne']:
+        valori = np.load(os.path.join(cartella, colonna['file']), mmap_mode='r')
+        if colonna['categorie'] is not None:
+            valori = pd.Categorical.from_codes(valori, categories=colonna['categorie'])
+        elif colonna.get('tipo') is not None:
+            valori = pd.array(valori, dtype=colonna['tipo'])
+        dati[colonna['nome']] = valori
+    return pd.DataFrame(dati, index=pd.RangeIndex(descrizione['righe']))
+
+
+def _elimina_vecchie(destinazione, conservate=ISTANTANEE_CONSERVATE):
+    """Elimina le istantanee meno recenti della cartella di `destinazione` oltre le `conservate`"""
+    cartella = os.path.dirname(destinazione) or '.'
+    istantanee = []
+    for nome in os.listdir(cartella):
+        percorso = os.path.join(cartella, nome)
+        if not nome.startswith(PREFISSO_ISTANTANEA) or nome.endswith('.tmp') or percorso == destinazione:
+            continue
+        try:
+            istantanee.append((os.path.getmtime(percorso), percorso))
+        except OSError:
+            # Eliminata nel frattempo da un altro processo
+            continue
+    istantanee.sort(reverse=True)
+    for _, vecchia in istantanee[max(conservate - 1, 0):]:
+        shutil.rmtree(vecchia, ignore_errors=True)
+
+
+def scrivi_istantanea(dati, versione, cartella_cache=CARTELLA_CACHE):
+    """Scrive un DatiCompatti come istantanea binaria (file .npy più manifesto JSON).
+
+    I file sono scritti in una cartella temporanea poi rinominata, così chi
+    legge vede l'istantanea completa o nessuna. Oltre le ISTANTANEE_CONSERVATE
+    più recenti le istantanee vengono eliminate: i processi che le hanno già
+    mappate continuano a leggerle finché non le chiudono.
+    """
+    destinazione = cartella_istantanea(versione, cartella_cache)
+    temporanea = f"{destinazione}.{os.getpid()}.tmp"
+    shutil.rmtree(temporanea, ignore_errors=True)
+    os.makedirs(temporanea)
+
+    try:
+        for nome, matrice in (('coefficienti', dati.coefficienti), ('quantita', dati.quantita),
+                              ('presenza', dati.presenza)):
+            np.save(os.path.join(temporanea, f"{nome}.npy"), np.ascontiguousarray(matrice))
+
+        tabelle = {'articoli': _salva_tabella(dati.articoli, 'articoli', temporanea)}
+        if dati.consumi is not None:
+            tabelle['consumi'] = _salva_tabella(dati.consumi.reset_index(drop=True), 'consumi', temporanea)
+        if dati.colazioni is not None:
+            tabelle['colazioni'] = _salva_tabella(dati.colazioni.reset_index(drop=True), 'colazioni', temporanea)
+
+        manifesto = {
+            'formato': FORMATO_ISTANTANEA,
+            'versione': versione,
+            'mesi': list(dati.mesi),
+            'decimali_coefficienti': dati.decimali_coefficienti,
+            'decimali_quantita': dati.decimali_quantita,
+            'tabelle': tabelle,
+        }
+        with open(os.path.join(temporanea, FILE_MANIFESTO), 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False)
+
+        shutil.rmtree(destinazione, ignore_errors=True)
+        os.replace(temporanea, destinazione)
+    except Exception:
+        shutil.rmtree(temporanea, ignore_errors=True)
+        raise
+
+    _elimina_vecchie(destinazione)
+    return destinazione
+
+
+def leggi_istantanea(versione, cartella_cache=CARTELLA_CACHE):
+    """DatiCompatti con le matrici mappate in sola lettura.
+
+    None se l'istantanea manca, è di un altro formato o non si riesce a
+    leggere (per esempio perché un altro processo la sta eliminando).
+    """
+    cartella = cartella_istantanea(versione, cartella_cache)
+    try:
+        with open(os.path.join(cartella, FILE_MANIFESTO), encoding='utf-8') as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifesto.get('formato') != FORMATO_ISTANTANEA or manifesto.get('versione') != versione:
+        return None
+
+    try:
+        matrici = {
+            nome: np.load(os.path.join(cartella, f"{nome}.npy"), mmap_mode='r')
+            for nome in ('coefficienti', 'quantita', 'presenza')
+        }
+        tabelle = {nome: _carica_tabella(descrizione, cartella) for nome, descrizione in manifesto['tabelle'].items()}
+    except (OSError, ValueError):
+        return None
+    return DatiCompatti(
+        tabelle['articoli'], manifesto['mesi'],
+        matrici['coefficienti'], matrici['quantita'], matrici['presenza'],
+        manifesto['decimali_coefficienti'], manifesto['decimali_quantita'],
+        consumi=tabelle.get('consumi'),
+        colazioni=tabelle.get('colazioni')
+    )
+
+
+def mappa_istantanea(dati, versione, cartella_cache=CARTELLA_CACHE):
+    """Scrive l'istantanea di `dati` e la restituisce mappata da file.
+
+    Se l'istantanea non si può scrivere (per esempio su un disco in sola
+    lettura) restituisce i dati in memoria così come sono.
+    """
+    try:
+        os.makedirs(cartella_cache, exist_ok=True)
+        scrivi_istantanea(dati, versione, cartella_cache)
+    except OSError:
+        return dati
+    return leggi_istantanea(versione, cartella_cache) or dati
+
+
+def apri_istantanea(costruisci, versione, cartella_cache=CARTELLA_CACHE):
+    """Istantanea della versione indicata, scritta con i dati di costruisci() solo se manca"""
+    dati = leggi_istantanea(versione, cartella_cache)
+    if dati is not None:
+        return dati
+    return mappa_istantanea(costruisci(), versione, cartella_cache)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrive l'istantanea binaria dei dati derivati")
+    parser.add_argument('--dati', default='.', help="cartella con i file di input (default: cartella corrente)")
+    parser.add_argument('--cache', default=CARTELLA_CACHE, help=f"cartella delle istantanee (default: {CARTELLA_CACHE})")
+    args = parser.parse_args(argv)
+
+    dati = DatiCondivisi(args.dati)
+    compatti = costruisci_dati_compatti(dati.fogli_mensili, dati.consumi, dati.colazioni)
+    os.makedirs(args.cache, exist_ok=True)
+    cartella = scrivi_istantanea(compatti, versione_dati(args.dati), args.cache)
+    print(f"Istantanea creata: {cartella} ({len(compatti.articoli)} articoli, {len(compatti.mesi)} mesi)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+
+# Colonne descrittive degli articoli nei fogli mensili
+COLONNE_ARTICOLO = ['Categoria', 'Prodotto', 'Articolo', 'UDM']
+
+# Massimo numero di decimali per cui un float32 riproduce esattamente il valore originale
+MAX_DECIMALI_FLOAT32 = 6
+
+
+def comprimi_valori(valori):
+    """Converte una matrice float64 in float32 se la conversione è reversibile.
+
+    Restituisce la matrice compatta e il numero di decimali con cui
+    arrotondarla per riottenere esattamente i valori originali. Se nessun
+    arrotondamento entro MAX_DECIMALI_FLOAT32 decimali è sufficiente, la
+    matrice resta float64 e i decimali sono None.
+    """
+    valori = np.asarray(valori, dtype=np.float64)
+    compatti = valori.astype(np.float32)
+    noti = ~np.isnan(valori)
+    ripristinati = compatti[noti].astype(np.float64)
+    for decimali in range(MAX_DECIMALI_FLOAT32 + 1):
+        if np.array_equal(np.round(ripristinati, decimali), valori[noti]):
+            return compatti, decimali
+    return valori, None
+
+
+def espandi_valori(valori, decimali):
+    """Operazione inversa di comprimi_valori: restituisce float64 identici agli originali"""
+    valori = valori.astype(np.float64)
+    return valori if decimali is None else np.round(valori, decimali)
+
+
+class DatiCompatti:
+    """Coefficienti di tutti i mesi in forma compatta.
+
+    Un unico dizionario degli articoli (id interi, stringhe categoriche) è
+    condiviso da tutti i mesi, mentre coefficienti e quantità sono matrici
+    articoli × mesi (float32 quando reversibile, NaN se l'articolo non compare
+    nel foglio del mese). Le tab lavorano su viste sottili generate al
+    bisogno da vista_mese() invece di tenere un DataFrame completo per mese.
+
+    Dopo congela() l'oggetto è un'istantanea di sola lettura che può essere
+    condivisa da tutte le sessioni: ogni vista è un nuovo DataFrame piccolo,
+    mai un riferimento modificabile ai dati condivisi.
+    """
+
+    def __init__(self, articoli, mesi, coefficienti, quantita, presenza,
+                 decimali_coefficienti=None, decimali_quantita=None, consumi=None, colazioni=None):
+        self.articoli = articoli
+        self.mesi = tuple(mesi)
+        self.coefficienti = coefficienti
+        self.quantita = quantita
+        self.presenza = presenza
+        self.decimali_coefficienti = decimali_coefficienti
+        self.decimali_quantita = decimali_quantita
+        self.consumi = consumi
+        self.colazioni = colazioni
+
+    def congela(self):
+        """Rende immutabili le matrici condivise: una scrittura accidentale solleva ValueError"""
+        for matrice in (self.coefficienti, self.quantita, self.presenza):
+            matrice.setflags(write=False)
+        return self
+
+    def __bool__(self):
+        return bool(self.mesi) or self.consumi is not None
+
+    def __contains__(self, mese):
+        return mese in self.mesi
+
+    def indice_mese(self, mese):
+        return self.mesi.index(mese)
+
+    def coefficienti_mese(self, mese):
+        """Coefficienti float64 del mese per tutti gli articoli (NaN se assenti)"""
+        return espandi_valori(self.coefficienti[:, self.indice_mese(mese)], self.decimali_coefficienti)
+
+    def matrice_coefficienti(self):
+        """Matrice float64 articoli × mesi di tutti i coefficienti (NaN se assenti)"""
+        return espandi_valori(self.coefficienti, self.decimali_coefficienti)
+
+    def vista_mese(self, mese, solo_positivi=False, categorie_escluse=None, categoria=None):
+        """DataFrame del mese con le sole righe richieste, costruito dalle matrici compatte.
+
+        Le righe seguono l'ordine del foglio originale e l'indice è l'id
+        dell'articolo, così le viste di mesi diversi restano confrontabili.
+        """
+        colonna = self.indice_mese(mese)
+        coefficienti = self.coefficienti_mese(mese)
+
+        righe = self.presenza[:, colonna].copy()
+        if solo_positivi:
+            righe &= coefficienti > 0
+        if categorie_escluse:
+            righe &= ~self.articoli['Categoria'].isin(categorie_escluse).to_numpy()
+        if categoria is not None:
+            righe &= (self.articoli['Categoria'] == categoria).to_numpy()
+
+        ids = np.flatnonzero(righe)
+        vista = self.articoli.iloc[ids].copy()
+        vista['Quantità'] = espandi_valori(self.quantita[ids, colonna], self.decimali_quantita)
+        vista['Coefficiente'] = coefficienti[ids]
+        # Categorie di nuovo come stringhe: le viste finiscono in tabelle, groupby e download
+        for nome in COLONNE_ARTICOLO:
+            vista[nome] = vista[nome].astype(object)
+        return vista
+
+    def colazioni_mese(self, numero_mese):
+        """Righe delle colazioni giornaliere del mese indicato (nuovo DataFrame)"""
+        if self.colazioni is None:
+            return None
+        return self.colazioni[self.colazioni['mese'] == numero_mese]
+
+    def categorie(self, mesi=None):
+        """Categorie presenti (non vuote) negli articoli dei mesi indicati"""
+        mesi = self.mesi if mesi is None else [m for m in mesi if m in self.mesi]
+        if not mesi:
+            return []
+        colonne = [self.indice_mese(m) for m in mesi]
+        presenti = self.presenza[:, colonne].any(axis=1)
+        return self.articoli['Categoria'][presenti].dropna().unique().tolist()
+
+    def memoria(self):
+        """Memoria occupata in byte da dizionario articoli e matrici"""
+        totale = self.articoli.memory_usage(deep=True).sum()
+        totale += self.coefficienti.nbytes + self.quantita.nbytes + self.presenza.nbytes
+        for df in (self.consumi, self.colazioni):
+            if df is not None:
+                totale += df.memory_usage(deep=True).sum()
+        return int(totale)
+
+
+def _chiave_righe(df):
+    """Chiave di riga dei fogli mensili: colonne descrittive più l'occorrenza dei duplicati"""
+    descrittive = df.reindex(columns=COLONNE_ARTICOLO).astype(object).where(lambda x: x.notna(), '')
+    occorrenza = descrittive.groupby(COLONNE_ARTICOLO, sort=False).cumcount()
+    return pd.MultiIndex.from_frame(descrittive.assign(_occorrenza=occorrenza))
+
+
+def costruisci_dati_compatti(fogli_mensili, consumi=None, colazioni=None):
+    """Costruisce DatiCompatti dai fogli mensili (dizionario mese -> DataFrame)"""
+    mesi = list(fogli_mensili)
+
+    # Dizionario condiviso degli articoli, nell'ordine di prima comparsa
+    chiavi = {mese: _chiave_righe(df) for mese, df in fogli_mensili.items()}
+    dizionario = pd.MultiIndex.from_tuples([], names=COLONNE_ARTICOLO + ['_occorrenza'])
+    for chiave in chiavi.values():
+        dizionario = dizionario.append(chiave[~chiave.isin(dizionario)])
+
+    n_articoli, n_mesi = len(dizionario), len(mesi)
+    coefficienti = np.full((n_articoli, n_mesi), np.nan)
+    quantita = np.full((n_articoli, n_mesi), np.nan)
+    presenza = np.zeros((n_articoli, n_mesi), dtype=bool)
+
+    for colonna, mese in enumerate(mesi):
+        df = fogli_mensili[mese]
+        ids = dizionario.get_indexer(chiavi[mese])
+        presenza[ids, colonna] = True
+        if 'Coefficiente' in df.columns:
+            coefficienti[ids, colonna] = pd.to_numeric(df['Coefficiente'], errors='coerce').to_numpy()
+        if 'Quantità' in df.columns:
+            quantita[ids, colonna] = pd.to_numeric(df['Quantità'], errors='coerce').to_numpy()
+
+    articoli = dizionario.to_frame(index=False)[COLONNE_ARTICOLO].replace('', np.nan)
+    for nome in COLONNE_ARTICOLO:
+        articoli[nome] = articoli[nome].astype('category')
+    articoli.index = pd.RangeIndex(n_articoli)
+
+    coefficienti, decimali_coefficienti = comprimi_valori(coefficienti)
+    quantita, decimali_quantita = comprimi_valori(quantita)
+
+    return DatiCompatti(
+        articoli, mesi, coefficienti, quantita, presenza,
+        decimali_coefficienti, decimali_quantita,
+        consumi=compatta_consumi(consumi) if consumi is not None else None,
+        colazioni=colazioni
+    )
+
+
+def compatta_consumi(df_consumi):
+    """Converte le colonne testuali ripetute dei consumi in categorie"""
+    df_consumi = df_consumi.copy()
+    for nome in df_consumi.select_dtypes(include='object').columns:
+        df_consumi[nome] = df_consumi[nome].astype('category')
+    return df_consumi
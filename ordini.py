@@ -0,0 +1,124 @@
+import math
+
+import pandas as pd
+
+# Passi del calcolo dell'ordine. La dashboard li usa come nodi del grafo delle
+# tabelle derivate (vedi carica_grafo_tabelle in breakfast_dashboard.py);
+# ogni passo restituisce un nuovo DataFrame senza modificare quelli ricevuti.
+
+
+def ordine_consumo_previsto(df_mese_filtrato, num_colazioni, consumo_segmenti=None):
+    """Consumo previsto dei prodotti del mese per il numero di colazioni indicato"""
+    df_ordine = df_mese_filtrato.copy()
+    if consumo_segmenti is not None:
+        df_ordine['Consumo Previsto'] = consumo_segmenti
+        # Coefficiente effettivo per il mix di segmenti richiesto
+        df_ordine['Coefficiente'] = df_ordine['Consumo Previsto'] / num_colazioni
+    else:
+        df_ordine['Consumo Previsto'] = df_ordine['Coefficiente'] * num_colazioni
+    return df_ordine
+
+
+def ordine_prezzi(articoli, storico_prezzi, mese_prezzi=None):
+    """Prezzi validi nel mese per gli articoli dell'ordine, None senza storico dei prezzi"""
+    if storico_prezzi is None:
+        return None
+    return storico_prezzi.prezzi(articoli, mese_prezzi)
+
+
+def ordine_costi(df_consumo, prezzi):
+    """Aggiunge costo unitario, unità di misura e costo teorico del consumo"""
+    df_ordine = df_consumo.copy()
+    if prezzi is not None:
+        df_ordine['Costo Unitario'] = prezzi['Costo Unitario'].fillna(0.0)
+        df_ordine['U.M.A.'] = prezzi['U.M.A.'].fillna('')
+        df_ordine['U.M.C.'] = prezzi['U.M.C.'].fillna('')
+        df_ordine['Costo Totale Previsto'] = 0.0
+        # Coefficiente × colazioni × prezzo, come in calcolo_costi_prodotti e varianza_costi
+        df_ordine['Costo Teorico Consumo'] = prezzi['Costo Unitario'] * df_ordine['Consumo Previsto']
+    return df_ordine
+
+
+def ordine_buffer(df_costi, buffer_percentuale):
+    """Quantità con buffer, arrotondata per unità di misura, e relativo costo"""
+    df_ordine = df_costi.copy()
+    if buffer_percentuale > 0:
+        fattore_buffer = 1 + (buffer_percentuale / 100)
+        df_ordine['Quantità con Buffer'] = df_ordine['Consumo Previsto'] * fattore_buffer
+
+        # Per quantità piccole, assicura che il buffer aggiunga almeno 1 unità
+        df_ordine['Quantità con Buffer'] = df_ordine.apply(
+            lambda row: max(row['Quantità con Buffer'], row['Consumo Previsto'] + 1)
+            if row['Consumo Previsto'] < 10 and pd.notna(row.get('UDM')) and row['UDM'] in ['pz', 'kg', 'conf']
+            else row['Quantità con Buffer'],
+            axis=1
+        )
+    else:
+        df_ordine['Quantità con Buffer'] = df_ordine['Consumo Previsto']
+
+    # Calcola il costo dell'ordine con buffer
+    if 'Costo Unitario' in df_ordine.columns:
+        df_ordine['Costo Ordine con Buffer'] = df_ordine['Quantità con Buffer'] * df_ordine['Costo Unitario']
+
+    # Arrotonda quantità preservando l'effetto del buffer
+    df_ordine['Quantità con Buffer'] = df_ordine.apply(
+        lambda row: math.ceil(row['Quantità con Buffer'])  # Arrotonda sempre per eccesso
+        if pd.notna(row.get('UDM')) and row['UDM'] in ['pz', 'kg', 'conf']
+        else round(row['Quantità con Buffer'], 2),
+        axis=1
+    )
+    return df_ordine
+
+
+def ordine_giacenze(df_buffer, include_giacenze=False, df_giacenze=None):
+    """Giacenze, quantità da ordinare al netto delle giacenze e costo effettivo"""
+    df_ordine = df_buffer.copy()
+
+    # Inizializza le colonne 'Giacenza' e 'Da Ordinare'
+    df_ordine['Giacenza'] = 0.0
+    df_ordine['Da Ordinare'] = 0.0
+
+    if include_giacenze and df_giacenze is not None:
+        # Unisce i dati delle giacenze con il dataframe principale, mantenendo l'id articolo come indice
+        df_ordine = df_ordine.drop(columns=['Giacenza']).join(
+            df_giacenze.set_index('Articolo'),
+            on='Articolo',
+            how='left'
+        )
+
+        # Sostituisce le giacenze non trovate (NaN) con 0
+        df_ordine['Giacenza'] = df_ordine['Giacenza'].fillna(0)
+
+    # Calcola la quantità da ordinare usando le giacenze appena caricate
+    df_ordine['Da Ordinare'] = df_ordine['Quantità con Buffer'] - df_ordine['Giacenza']
+    # Assicura che la quantità da ordinare non sia mai negativa
+    df_ordine['Da Ordinare'] = df_ordine['Da Ordinare'].apply(lambda x: max(0, x))
+
+    # Arrotonda la quantità da ordinare
+    df_ordine['Da Ordinare'] = df_ordine.apply(
+        lambda row: round(row['Da Ordinare'])
+        if pd.notna(row.get('UDM')) and row['UDM'] in ['pz', 'kg', 'g', 'conf']
+        else round(row['Da Ordinare'], 2),
+        axis=1
+    )
+
+    # Costo effettivo da ordinare al netto delle giacenze
+    if include_giacenze and 'Costo Unitario' in df_ordine.columns:
+        df_ordine['Costo Ordine Effettivo'] = df_ordine['Da Ordinare'] * df_ordine['Costo Unitario']
+
+    # Aggiungi colonna per mostrare la differenza del buffer
+    df_ordine['Buffer Applicato'] = df_ordine['Quantità con Buffer'] - df_ordine['Consumo Previsto']
+    return df_ordine
+
+
+def calcola_ordine(df_mese_filtrato, storico_prezzi, num_colazioni, buffer_percentuale,
+                   include_giacenze=False, df_giacenze=None, consumo_segmenti=None, mese_prezzi=None):
+    """Quantità da ordinare e costi per i prodotti del mese, eseguendo tutti i passi in sequenza.
+
+    I costi usano l'Euro Medio valido in `mese_prezzi` (vedi
+    prezzi.StoricoPrezzi). La dashboard esegue gli stessi passi attraverso il
+    grafo delle tabelle derivate, che ricalcola solo quelli con ingressi cambiati.
+    """
+    prezzi = ordine_prezzi(df_mese_filtrato['Articolo'], storico_prezzi, mese_prezzi)
+    df_ordine = ordine_costi(ordine_consumo_previsto(df_mese_filtrato, num_colazioni, consumo_segmenti), prezzi)
+    return ordine_giacenze(ordine_buffer(df_ordine, buffer_percentuale), include_giacenze, df_giacenze)
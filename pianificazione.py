@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+# Giorni della settimana (0 = lunedì) in cui ciascuna categoria viene consegnata
+CALENDARI_CONSEGNA = {
+    'Prodotti da Forno': (0, 2, 4),
+    'Pane': (0, 1, 2, 3, 4, 5),
+    'Torte': (0, 3),
+    'Prodotti Caseari': (0, 3),
+    'Latte e Derivati': (0, 2, 4),
+    'Salumi': (0, 3),
+    'Verdure': (0, 2, 4),
+    'Prodotti Salati': (0, 3),
+}
+CALENDARIO_PREDEFINITO = (0,)
+
+# Giorni di conservazione dopo la consegna (None = non deperibile)
+CONSERVAZIONE_GIORNI = {
+    'Prodotti da Forno': 3,
+    'Pane': 2,
+    'Torte': 4,
+    'Prodotti Caseari': 7,
+    'Latte e Derivati': 5,
+    'Salumi': 7,
+    'Verdure': 3,
+    'Prodotti Salati': 5,
+}
+
+NOMI_GIORNI = ['Lun', 'Mar', 'Mer', 'Gio', 'Ven', 'Sab', 'Dom']
+
+# Unità di misura ordinate sempre per intero
+UNITA_INTERE = ['pz', 'kg', 'conf']
+
+
+def regole_categoria(categoria, calendari=None, conservazione=None):
+    """Calendario di consegna e conservazione per una categoria (nomi confrontati senza spazi finali)"""
+    calendari = CALENDARI_CONSEGNA if calendari is None else calendari
+    conservazione = CONSERVAZIONE_GIORNI if conservazione is None else conservazione
+    nome = str(categoria).strip() if pd.notna(categoria) else ''
+    return tuple(sorted(calendari.get(nome, CALENDARIO_PREDEFINITO))), conservazione.get(nome)
+
+
+def finestre_consegna(giorni, giorni_consegna, durata_conservazione):
+    """Finestre di copertura [inizio, fine) di ogni consegna, come posizioni nei giorni del periodo.
+
+    La prima consegna è sempre il primo giorno del periodo; le successive
+    cadono nei giorni della settimana previsti dal calendario. Ogni consegna
+    copre i giorni fino alla successiva, ma non oltre la conservazione del
+    prodotto: i giorni rimasti scoperti vengono segnalati.
+    """
+    giorni_settimana = pd.DatetimeIndex(giorni).dayofweek.to_numpy()
+    inizi = np.flatnonzero(np.isin(giorni_settimana, giorni_consegna))
+    inizi = np.union1d([0], inizi).astype(int)
+    fini_calendario = np.append(inizi[1:], len(giorni))
+    if durata_conservazione is None:
+        fini = fini_calendario
+    else:
+        fini = np.minimum(fini_calendario, inizi + durata_conservazione)
+    return inizi, fini, fini_calendario - fini
+
+
+def ripartisci_previsione(uniforme, previsione):
+    """Ridistribuisce lungo l'ultimo asse i valori uniformi in proporzione alla previsione.
+
+    Solo le finestre con previsione positiva si dividono il loro totale
+    uniforme; le altre mantengono il valore uniforme, così una finestra
+    fuori stagione non sposta quantità oltre la conservazione di quelle
+    coperte e il totale non cambia.
+    """
+    prevista = previsione > 0
+    totale = np.where(prevista, uniforme, 0.0).sum(axis=-1, keepdims=True)
+    somma = np.where(prevista, previsione, 0.0).sum(axis=-1, keepdims=True)
+    return np.where(prevista, totale * previsione / np.where(somma > 0, somma, 1.0), uniforme)
+
+
+def pianifica_consegne(prodotti, giorni, pax_giornalieri, buffer_percentuale=0,
+                       calendari=None, conservazione=None, consumo_giornaliero=None):
+    """Suddivide l'ordine di ogni prodotto nelle consegne del periodo.
+
+    `prodotti` deve avere le colonne Categoria, Articolo, UDM e Coefficiente;
+    `giorni` sono le date del periodo e `pax_giornalieri` le colazioni previste
+    per ciascun giorno. I prodotti con le stesse regole di consegna
+    condividono le stesse finestre: le colazioni di ogni finestra si ricavano
+    dalle somme cumulative delle presenze e le quantità di tutti i prodotti
+    × tutte le consegne sono un unico prodotto esterno coefficienti × colazioni.
+
+    Con `consumo_giornaliero` (previsioni.ConsumoGiornaliero, indice di
+    `prodotti` = id articolo) colazioni e quantità del periodo si ripartiscono
+    invece tra le finestre secondo il consumo previsto nei giorni
+    corrispondenti della stagione rilevata, finestra per finestra con
+    consumo_periodo. I totali restano quelli di `pax_giornalieri`; le finestre
+    senza consumo previsto (fuori stagione, o articolo non consumato in quei
+    giorni) mantengono la ripartizione uniforme (vedi ripartisci_previsione).
+
+    Restituisce un DataFrame in formato lungo con una riga per prodotto e consegna.
+    """
+    giorni = pd.DatetimeIndex(giorni).normalize()
+    pax = np.broadcast_to(np.asarray(pax_giornalieri, dtype=float), (len(giorni),))
+    pax_cumulati = np.concatenate([[0.0], np.cumsum(pax)])
+
+    colonne = ['Categoria', 'Articolo', 'UDM', 'Consegna', 'Data Consegna', 'Copertura Fino Al',
+               'Colazioni Coperte', 'Quantità', 'Giorni Scoperti']
+    if len(giorni) == 0 or prodotti.empty:
+        return pd.DataFrame(columns=colonne)
+
+    # Un gruppo per ogni combinazione distinta di calendario e conservazione delle categorie presenti
+    codici_categoria, categorie = pd.factorize(prodotti['Categoria'].fillna(''))
+    id_regole = {}
+    gruppo_categoria = np.array([
+        id_regole.setdefault(regole_categoria(c, calendari, conservazione), len(id_regole)) for c in categorie
+    ], dtype=int)
+    indice_gruppo = gruppo_categoria[codici_categoria]
+
+    # Finestre dei gruppi in matrici gruppi × slot, completate con slot vuoti
+    finestre = [finestre_consegna(giorni, *regola) for regola in id_regole]
+    n_gruppi = len(finestre)
+    n_slot = max(len(inizi) for inizi, _, _ in finestre)
+    inizi = np.full((n_gruppi, n_slot), -1)
+    fini = np.full((n_gruppi, n_slot), -1)
+    scoperti = np.zeros((n_gruppi, n_slot), dtype=int)
+    for g, (inizio_g, fine_g, scoperti_g) in enumerate(finestre):
+        inizi[g, :len(inizio_g)] = inizio_g
+        fini[g, :len(fine_g)] = fine_g
+        scoperti[g, :len(scoperti_g)] = scoperti_g
+    validi = inizi >= 0
+    pax_slot = np.where(validi, pax_cumulati[np.maximum(fini, 0)] - pax_cumulati[np.maximum(inizi, 0)], 0.0)
+
+    # Quantità prodotti × slot in un'unica operazione
+    coefficienti = prodotti['Coefficiente'].to_numpy(dtype=float)
+    consumo_slot = coefficienti[:, None] * pax_slot[indice_gruppo]
+
+    # Ripartizione secondo la previsione giornaliera, finestra per finestra con consumo_periodo
+    if consumo_giornaliero is not None:
+        date = consumo_giornaliero.date_stagione(giorni)
+        ids = prodotti.index.to_numpy()
+        for g in range(n_gruppi):
+            slot_g = np.flatnonzero(validi[g])
+            periodi = [(date[inizi[g, s]], date[fini[g, s] - 1]) for s in slot_g]
+            presenze = np.array([consumo_giornaliero.presenze_periodo(da, a) for da, a in periodi])
+            pax_slot[g, slot_g] = ripartisci_previsione(pax_slot[g, slot_g], presenze)
+            righe = np.flatnonzero(indice_gruppo == g)
+            consumi = np.column_stack([consumo_giornaliero.consumo_periodo(da, a)[ids[righe]] for da, a in periodi])
+            consumo_slot[np.ix_(righe, slot_g)] = ripartisci_previsione(consumo_slot[np.ix_(righe, slot_g)], consumi)
+
+    fattore_buffer = 1 + buffer_percentuale / 100
+    quantita = consumo_slot * fattore_buffer
+    interi = prodotti['UDM'].isin(UNITA_INTERE).to_numpy()
+    quantita = np.where(interi[:, None], np.ceil(np.round(quantita, 9)), np.round(quantita, 2))
+
+    # Formato lungo, solo slot esistenti
+    righe, slot = np.nonzero(validi[indice_gruppo])
+    gruppo_riga = indice_gruppo[righe]
+    inizio_riga = inizi[gruppo_riga, slot]
+    fine_riga = fini[gruppo_riga, slot]
+    piano = pd.DataFrame({
+        'Categoria': prodotti['Categoria'].to_numpy()[righe],
+        'Articolo': prodotti['Articolo'].to_numpy()[righe],
+        'UDM': prodotti['UDM'].to_numpy()[righe],
+        'Consegna': slot + 1,
+        'Data Consegna': giorni[inizio_riga],
+        'Copertura Fino Al': giorni[np.maximum(fine_riga - 1, inizio_riga)],
+        'Colazioni Coperte': pax_slot[gruppo_riga, slot],
+        'Quantità': quantita[righe, slot],
+        'Giorni Scoperti': scoperti[gruppo_riga, slot]
+    }, index=prodotti.index[righe])
+    return piano[colonne]
+
+
+def tabella_consegne(piano):
+    """Vista prodotti × date di consegna delle quantità pianificate"""
+    if piano.empty:
+        return pd.DataFrame()
+    tabella = piano.fillna({'Categoria': ''}).pivot_table(
+        index=['Categoria', 'Articolo', 'UDM'],
+        columns='Data Consegna',
+        values='Quantità',
+        aggfunc='sum',
+        fill_value=0
+    )
+    tabella.columns = [f"{NOMI_GIORNI[data.dayofweek]} {data.strftime('%d/%m')}" for data in tabella.columns]
+    return tabella
+
+
+def descrivi_calendari(categorie, calendari=None, conservazione=None):
+    """Tabella delle regole di consegna applicate alle categorie indicate (conservazione NA se non deperibile)"""
+    righe = []
+    for categoria in categorie:
+        giorni_consegna, durata = regole_categoria(categoria, calendari, conservazione)
+        righe.append({
+            'Categoria': categoria,
+            'Giorni di Consegna': ', '.join(NOMI_GIORNI[g] for g in giorni_consegna),
+            'Conservazione (giorni)': pd.NA if durata is None else durata
+        })
+    tabella = pd.DataFrame(righe, columns=['Categoria', 'Giorni di Consegna', 'Conservazione (giorni)'])
+    return tabella.astype({'Conservazione (giorni)': 'Int64'})
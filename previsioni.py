@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from dati_comuni import NOMI_MESI
+
+# Colonne delle colazioni previste/prenotate per segmento
+COLONNE_PREVISTE = [
+    'BREAKFAST PREVISTI (HOTEL)',
+    'BREAKFAST PREVISTI (RESIDENCE)',
+    'BREAKFAST PREVISTI (CVM)',
+    'BREAKFAST PRENOTATI (ESTERNI)',
+    'BREAKFAST COMPLEMENTARY'
+]
+
+COLONNA_PRESENZE = 'CONSUMO REALE COLAZIONI'
+
+
+class ConsumoGiornaliero:
+    """Consumo previsto di ogni articolo per ogni giorno rilevato.
+
+    Il consumo mensile di un articolo (coefficiente × colazioni del mese) è
+    ripartito sui giorni in proporzione alle colazioni servite, cioè
+    consumo[articolo, giorno] = coefficiente[articolo, mese del giorno] ×
+    presenze[giorno]. Le somme cumulative lungo i giorni permettono di
+    ottenere il consumo di qualsiasi intervallo di date con una sola
+    sottrazione per articolo; lo stesso vale per le colazioni.
+    """
+
+    def __init__(self, date, mesi, presenze, target, consumo):
+        self.date = date
+        self.mesi = mesi
+        self.presenze = presenze
+        self.target = target
+        self.consumo = consumo
+        # Colonna iniziale di zeri: cumulato[:, j] è il consumo dei primi j giorni
+        self.cumulato = np.concatenate(
+            [np.zeros((consumo.shape[0], 1)), np.cumsum(consumo, axis=1)], axis=1
+        )
+        self.presenze_cumulate = np.concatenate([[0.0], np.cumsum(presenze)])
+
+    def giorni_mese(self, nome_mese):
+        """Posizioni dei giorni del mese indicato"""
+        return np.flatnonzero(self.mesi == nome_mese)
+
+    def target_mese(self, nome_mese):
+        """Serie del target giornaliero del mese, indicizzata per data"""
+        giorni = self.giorni_mese(nome_mese)
+        return pd.Series(self.target[giorni], index=pd.DatetimeIndex(self.date[giorni]), name='Target')
+
+    def intervallo(self, inizio, fine):
+        """Posizioni [da, a) dei giorni rilevati tra due date incluse"""
+        da = np.searchsorted(self.date, np.datetime64(pd.Timestamp(inizio).normalize(), 'ns'), side='left')
+        a = np.searchsorted(self.date, np.datetime64(pd.Timestamp(fine).normalize(), 'ns'), side='right')
+        return da, a
+
+    def consumo_periodo(self, inizio, fine):
+        """Consumo previsto per articolo tra due date incluse (vettore sugli articoli)"""
+        da, a = self.intervallo(inizio, fine)
+        return self.cumulato[:, a] - self.cumulato[:, da]
+
+    def presenze_periodo(self, inizio, fine):
+        """Colazioni rilevate tra due date incluse"""
+        da, a = self.intervallo(inizio, fine)
+        return self.presenze_cumulate[a] - self.presenze_cumulate[da]
+
+    def date_stagione(self, giorni):
+        """Date corrispondenti (stesso giorno e mese) nell'anno della stagione rilevata"""
+        giorni = pd.DatetimeIndex(giorni)
+        if len(giorni) == 0 or len(self.date) == 0:
+            return giorni
+        return giorni + pd.DateOffset(years=pd.Timestamp(self.date[0]).year - giorni[0].year)
+
+    def tabella_mese(self, nome_mese, articoli):
+        """DataFrame articoli × giorni del mese, limitato agli id richiesti"""
+        giorni = self.giorni_mese(nome_mese)
+        colonne = pd.DatetimeIndex(self.date[giorni]).strftime('%d/%m')
+        return pd.DataFrame(self.consumo[np.ix_(articoli, giorni)], index=articoli, columns=colonne)
+
+
+def calcola_target_giornaliero(mesi, previste, target_mensili):
+    """Ripartisce il target mensile sui giorni in proporzione alle colazioni previste.
+
+    Nei mesi senza previsioni il target è diviso in parti uguali tra i giorni
+    rilevati, come nel grafico originale.
+    """
+    giorni = pd.Series(previste, dtype=float)
+    per_mese = giorni.groupby(mesi)
+    totale_previste = per_mese.transform('sum').to_numpy()
+    numero_giorni = per_mese.transform('size').to_numpy()
+    target_mese = pd.Series(mesi).map(target_mensili).fillna(0).to_numpy(dtype=float)
+
+    quota = np.where(totale_previste > 0, previste / np.where(totale_previste > 0, totale_previste, 1), 1 / numero_giorni)
+    return target_mese * quota
+
+
+def calcola_consumo_giornaliero(dati, target_mensili=None):
+    """Costruisce il ConsumoGiornaliero dai coefficienti compatti e dalle colazioni giornaliere"""
+    colazioni = dati.colazioni.sort_values('data')
+    date = colazioni['data'].dt.normalize().to_numpy()
+    mesi = colazioni['mese'].map(NOMI_MESI).to_numpy(dtype=object)
+    presenze = colazioni[COLONNA_PRESENZE].to_numpy(dtype=float, na_value=0.0)
+    previste = colazioni.reindex(columns=COLONNE_PREVISTE).fillna(0).to_numpy(dtype=float).sum(axis=1)
+
+    # Coefficienti di tutti gli articoli per il mese di ciascun giorno (0 se il mese non ha foglio)
+    coefficienti = np.column_stack(
+        [dati.coefficienti_mese(mese) for mese in dati.mesi] or [np.zeros(len(dati.articoli))]
+    )
+    coefficienti = np.nan_to_num(coefficienti, nan=0.0)
+    colonna_mese = np.array([dati.mesi.index(m) if m in dati.mesi else -1 for m in mesi], dtype=int)
+    coefficienti_giorno = np.where(colonna_mese >= 0, coefficienti[:, np.maximum(colonna_mese, 0)], 0.0)
+
+    if target_mensili is None:
+        target_mensili = pd.Series(presenze).groupby(mesi).sum().to_dict()
+    target = calcola_target_giornaliero(mesi, previste, target_mensili)
+
+    return ConsumoGiornaliero(date, mesi, presenze, target, coefficienti_giorno * presenze)
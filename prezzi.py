@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from dati_comuni import chiave_articolo, numero_mese
+
+# Colonne dei consumi usate dallo storico dei prezzi
+COLONNE_PREZZI = ['Codice', 'Descrizione', 'Euro Medio', 'U.M.A.', 'U.M.C.', 'Coeff Conv', 'Classe', 'Mese']
+
+# Moltiplicatore dell'id prodotto nella chiave ordinata id × mese (i mesi vanno da 1 a 12)
+SCALA_MESI = 100
+
+# Colonne restituite da StoricoPrezzi.prezzi()
+COLONNE_RISULTATO = ['Codice', 'Descrizione', 'Costo Unitario', 'U.M.A.', 'U.M.C.', 'Coeff Conv', 'Classe', 'Mese Prezzo']
+
+
+class StoricoPrezzi:
+    """Storico dell'Euro Medio dei consumi per prodotto e mese.
+
+    È l'unica fonte dei prezzi: ordini, classifiche e report dei costi per
+    prodotto leggono tutti da qui. Un prodotto è una chiave articolo (vedi
+    dati_comuni.chiave_articolo), cioè la descrizione normalizzata; le righe
+    con la stessa chiave nello stesso mese danno un'unica osservazione con
+    l'Euro Medio medio e le unità dell'ultima riga. Le osservazioni sono
+    ordinate per prodotto e mese in array numpy, così il prezzo valido in un
+    mese (l'ultimo registrato in quel mese o prima) si trova per tutti i
+    prodotti di un ordine con una sola searchsorted.
+    """
+
+    def __init__(self, df_consumi):
+        consumi = df_consumi[df_consumi['Descrizione'].notna() & df_consumi['Euro Medio'].notna()]
+        # Id dei prodotti nell'ordine di prima comparsa nei consumi; Codice e Descrizione della prima riga
+        prodotti, chiavi = pd.factorize(chiave_articolo(consumi['Descrizione']))
+        prime_righe = np.unique(prodotti, return_index=True)[1]
+        self.codici = consumi['Codice'].to_numpy(dtype=object)[prime_righe]
+        self.descrizioni = consumi['Descrizione'].to_numpy(dtype=object)[prime_righe]
+        # Id del prodotto per chiave e per nome senza formato finale, usato come
+        # riserva solo se identifica un'unica chiave
+        self.indice_chiavi = {chiave: prodotto for prodotto, chiave in enumerate(chiavi)}
+        nomi_base = {}
+        for prodotto, chiave in enumerate(chiavi):
+            nomi_base.setdefault(nome_base(chiave), []).append(prodotto)
+        self.indice_nomi_base = {nome: ids[0] for nome, ids in nomi_base.items() if len(ids) == 1}
+        # Abbinamenti già calcolati, per nome articolo
+        self.abbinamenti = {}
+
+        osservazioni = pd.DataFrame({
+            'prodotto': prodotti,
+            'mese': numero_mese(consumi['Mese'].astype(str)).to_numpy(),
+            'Costo Unitario': consumi['Euro Medio'].to_numpy(dtype=float),
+            'U.M.A.': consumi['U.M.A.'].to_numpy(dtype=object),
+            'U.M.C.': consumi['U.M.C.'].to_numpy(dtype=object),
+            'Coeff Conv': consumi['Coeff Conv'].to_numpy(dtype=float),
+            'Classe': consumi['Classe'].to_numpy(dtype=object),
+        }).groupby(['prodotto', 'mese'], sort=True).agg({
+            'Costo Unitario': 'mean', 'U.M.A.': 'last', 'U.M.C.': 'last', 'Coeff Conv': 'last', 'Classe': 'last'
+        })
+        self.prodotti = osservazioni.index.get_level_values('prodotto').to_numpy(dtype=np.int64)
+        self.mesi = osservazioni.index.get_level_values('mese').to_numpy(dtype=np.int64)
+        self.chiavi = self.prodotti * SCALA_MESI + self.mesi
+        self.valori = {
+            'Costo Unitario': osservazioni['Costo Unitario'].to_numpy(dtype=float),
+            'U.M.A.': osservazioni['U.M.A.'].to_numpy(dtype=object),
+            'U.M.C.': osservazioni['U.M.C.'].to_numpy(dtype=object),
+            'Coeff Conv': osservazioni['Coeff Conv'].to_numpy(dtype=float),
+            'Classe': osservazioni['Classe'].to_numpy(dtype=object),
+        }
+
+    def __len__(self):
+        return len(self.codici)
+
+    def abbina(self, articoli):
+        """Id del prodotto dei consumi per ogni nome articolo dei fogli mensili (-1 se non trovato).
+
+        Un articolo corrisponde alla descrizione con la stessa chiave (vedi
+        dati_comuni.chiave_articolo). In mancanza vale la descrizione con lo
+        stesso nome a meno del formato finale (es. "ACETO DI VINO BIANCO 1 LT"
+        e "ACETO DI VINO BIANCO"), solo se è l'unica con quel nome. Ogni nome
+        distinto viene cercato una volta per storico, cioè per versione dei dati.
+        """
+        articoli = pd.Series(articoli, dtype=object)
+        nuovi = [articolo for articolo in articoli.dropna().unique() if articolo not in self.abbinamenti]
+        if nuovi:
+            for articolo, chiave in zip(nuovi, chiave_articolo(pd.Series(nuovi, dtype=object))):
+                prodotto = self.indice_chiavi.get(chiave)
+                if prodotto is None:
+                    prodotto = self.indice_nomi_base.get(nome_base(chiave), -1)
+                self.abbinamenti[articolo] = prodotto
+        return articoli.map(self.abbinamenti).fillna(-1).to_numpy(dtype=np.int64)
+
+    def posizioni(self, prodotti, mese=None):
+        """Osservazione valida nel mese per ogni id prodotto (-1 per i prodotti non trovati).
+
+        È l'ultima registrata nel mese indicato o prima; se il prodotto non ha
+        prezzi fino a quel mese si usa il primo registrato dopo. Senza mese si
+        usa l'ultimo prezzo disponibile. `mese` è un numero di mese oppure un
+        array con il mese di ogni prodotto.
+        """
+        prodotti = np.asarray(prodotti, dtype=np.int64)
+        mese = SCALA_MESI - 1 if mese is None else np.asarray(mese, dtype=np.int64)
+        if len(self.chiavi) == 0:
+            return np.full(len(prodotti), -1, dtype=np.int64)
+        precedente = np.searchsorted(self.chiavi, prodotti * SCALA_MESI + mese, side='right') - 1
+        stesso_prodotto = (precedente >= 0) & (self.prodotti[precedente.clip(0)] == prodotti)
+        primo = np.searchsorted(self.chiavi, prodotti * SCALA_MESI, side='left')
+        return np.where(prodotti < 0, -1, np.where(stesso_prodotto, precedente, primo))
+
+    def prezzi(self, articoli, mese=None):
+        """Prezzo e unità di misura validi nel mese per ogni articolo, in un'unica operazione.
+
+        `mese` può essere anche un array con il mese di ogni articolo (vedi
+        posizioni). Restituisce un DataFrame con lo stesso indice di `articoli`
+        (se è una Series) e NaN dove l'articolo non ha corrispondenza nei consumi.
+        """
+        indice = articoli.index if isinstance(articoli, pd.Series) else None
+        prodotti = self.abbina(articoli)
+        posizioni = self.posizioni(prodotti, mese)
+
+        risultato = {
+            'Codice': _estrai(self.codici, prodotti),
+            'Descrizione': _estrai(self.descrizioni, prodotti),
+        }
+        for nome, valori in self.valori.items():
+            risultato[nome] = _estrai(valori, posizioni)
+        risultato['Mese Prezzo'] = _estrai(self.mesi, posizioni)
+        return pd.DataFrame(risultato, index=indice, columns=COLONNE_RISULTATO)
+
+
+def nome_base(chiave):
+    """Chiave articolo senza il formato finale: le parole dalla prima che contiene una cifra in poi"""
+    parole = chiave.split(' ')
+    for posizione, parola in enumerate(parole):
+        if any(carattere.isdigit() for carattere in parola):
+            return ' '.join(parole[:posizione])
+    return chiave
+
+
+def _estrai(valori, indici):
+    """valori[indici] con NaN dove l'indice è -1 (float per i valori numerici)"""
+    numerici = valori.dtype.kind in 'fiu'
+    uscita = np.full(len(indici), np.nan, dtype=float if numerici else object)
+    trovati = indici >= 0
+    uscita[trovati] = valori[indici[trovati]]
+    return uscita
@@ -0,0 +1,75 @@
+import cProfile
+import os
+import pstats
+import sys
+
+# Valore usato quando --profile viene passato senza percorso
+PROFILO_AUTOMATICO = '__auto__'
+
+# Criteri di ordinamento accettati per il riepilogo
+ORDINAMENTI_PROFILO = ['cumulative', 'tottime', 'ncalls', 'filename']
+
+
+def aggiungi_opzioni_profilo(parser):
+    """Aggiunge le opzioni --profile, --profile-top e --profile-sort a un parser argparse"""
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const=PROFILO_AUTOMATICO,
+        default=None,
+        metavar='FILE',
+        help="Esegue con cProfile e salva il dump pstats (default: <script>.prof)"
+    )
+    parser.add_argument(
+        '--profile-top',
+        type=int,
+        default=25,
+        metavar='N',
+        help="Numero di funzioni mostrate nel riepilogo del profilo (default: 25)"
+    )
+    parser.add_argument(
+        '--profile-sort',
+        choices=ORDINAMENTI_PROFILO,
+        default='cumulative',
+        help="Criterio di ordinamento del riepilogo (default: cumulative)"
+    )
+    return parser
+
+
+def percorso_profilo(args, nome_script):
+    """Restituisce il percorso del dump pstats richiesto, oppure None se la profilazione è disattivata"""
+    if not getattr(args, 'profile', None):
+        return None
+    if args.profile == PROFILO_AUTOMATICO:
+        nome_base = os.path.splitext(os.path.basename(nome_script))[0]
+        return f"{nome_base}.prof"
+    return args.profile
+
+
+def esegui_con_profilo(funzione, args, nome_script, *parametri, **opzioni):
+    """Esegue la funzione, profilandola con cProfile se richiesto dagli argomenti.
+
+    Il dump viene scritto nel formato pstats (leggibile con snakeviz o
+    `python -m pstats`) e il riepilogo dei top-N viene stampato su stderr,
+    così l'output dei report su stdout resta invariato.
+    """
+    percorso = percorso_profilo(args, nome_script)
+    if percorso is None:
+        return funzione(*parametri, **opzioni)
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return funzione(*parametri, **opzioni)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(percorso)
+        stampa_riepilogo_profilo(percorso, args.profile_sort, args.profile_top)
+
+
+def stampa_riepilogo_profilo(percorso, ordinamento='cumulative', top_n=25, stream=None):
+    """Stampa le top-N funzioni di un dump pstats"""
+    stream = stream if stream is not None else sys.stderr
+    print(f"\nProfilo salvato in {percorso} (top {top_n} per {ordinamento}):", file=stream)
+    statistiche = pstats.Stats(percorso, stream=stream)
+    statistiche.strip_dirs().sort_stats(ordinamento).print_stats(top_n)
@@ -0,0 +1,173 @@
+import pandas as pd
+
+# Formato della data nell'export delle colazioni giornaliere
+FORMATO_DATA_COLAZIONI = '%d/%m/%Y %H.%M.%S'
+
+
+class ErroreSchema(ValueError):
+    """File di input che non rispetta lo schema atteso"""
+
+
+class Colonna:
+    """Colonna attesa in un file di input.
+
+    `tipo` è un dtype pandas oppure 'data' (letta come testo e convertita
+    con il formato dello schema). Le intestazioni del file sono confrontate
+    senza spazi iniziali e finali; `rinomina` dà alla colonna un nome diverso
+    nel DataFrame prodotto. Le colonne numeriche con `predefinito` accettano
+    valori mancanti o non numerici, sostituiti dal valore indicato.
+    """
+
+    def __init__(self, nome, tipo='object', rinomina=None, predefinito=None):
+        self.nome = nome
+        self.tipo = tipo
+        self.rinomina = rinomina or nome
+        self.predefinito = predefinito
+
+
+class Schema:
+    """Colonne e opzioni di lettura di un file di input"""
+
+    def __init__(self, nome, colonne, formato_data=None, righe_da_saltare=0, decimale='.',
+                 scarta_righe_vuote=False):
+        self.nome = nome
+        self.colonne = tuple(colonne)
+        self.formato_data = formato_data
+        self.righe_da_saltare = righe_da_saltare
+        self.decimale = decimale
+        self.scarta_righe_vuote = scarta_righe_vuote
+
+    @property
+    def nomi(self):
+        return [colonna.nome for colonna in self.colonne]
+
+    def tipi_lettura(self, intestazioni):
+        """dtype da passare al parser per le intestazioni originali del file"""
+        tipi = {}
+        for colonna in self.colonne:
+            if colonna.tipo == 'data' or colonna.predefinito is not None:
+                tipi[intestazioni[colonna.nome]] = 'object'
+            else:
+                tipi[intestazioni[colonna.nome]] = colonna.tipo
+        return tipi
+
+
+# Registro degli schemi dei file di input
+SCHEMI = {
+    # Conteggi interi che ammettono giorni non compilati (pd.NA)
+    'colazioni': Schema('colazioni', [
+        Colonna('data', 'data'),
+        Colonna('BREAKFAST PREVISTI (HOTEL)', 'Int64'),
+        Colonna('BREAKFAST SERVITI (HOTEL)', 'Int64'),
+        Colonna('BREAKFAST PREVISTI (RESIDENCE)', 'Int64'),
+        Colonna('BREAKFAST SERVITI (RESIDENCE)', 'Int64'),
+        Colonna('BREAKFAST PREVISTI (CVM)', 'Int64'),
+        Colonna('BREAKFAST SERVITI (CVM)', 'Int64'),
+        Colonna('BREAKFAST PRENOTATI (ESTERNI)', 'Int64'),
+        Colonna('BREAKFAST COMPLEMENTARY', 'float64'),
+        Colonna('CONSUMO REALE COLAZIONI', 'Int64'),
+    ], formato_data=FORMATO_DATA_COLAZIONI),
+    # 'Primo Per.' (valorizzazione del primo periodo) non è usata da nessuna analisi
+    'consumi': Schema('consumi', [
+        Colonna('Classe'),
+        Colonna('Categoria'),
+        Colonna('Codice'),
+        Colonna('Descrizione'),
+        Colonna('U.M.A.'),
+        Colonna('U.M.C.'),
+        Colonna('Coeff Conv', 'int64'),
+        Colonna('Euro Medio', 'float64'),
+        Colonna('Quantita', 'float64'),
+        Colonna('Mese'),
+        Colonna('Costo Totale', 'float64'),
+    ]),
+    # Le prime 3 righe dei fogli mensili contengono l'intestazione del report
+    'foglio_mensile': Schema('foglio_mensile', [
+        Colonna('Categoria'),
+        Colonna('Prodotto'),
+        Colonna('Articolo'),
+        Colonna('UDM'),
+        Colonna('Quantità', 'float64'),
+        Colonna('Coefficiente', 'float64'),
+    ], righe_da_saltare=3, scarta_righe_vuote=True),
+    'giacenze': Schema('giacenze', [
+        Colonna('Descrizione', rinomina='Articolo'),
+        Colonna('Magazz.', 'float64', rinomina='Giacenza', predefinito=0),
+    ], decimale=','),
+}
+
+
+def intestazioni_file(colonne, schema):
+    """Intestazione originale del file per ogni colonna dello schema (spazi esclusi).
+
+    Solleva ErroreSchema se mancano colonne dello schema.
+    """
+    intestazioni = {}
+    for colonna in colonne:
+        intestazioni.setdefault(str(colonna).strip(), colonna)
+    mancanti = [nome for nome in schema.nomi if nome not in intestazioni]
+    if mancanti:
+        raise ErroreSchema(f"File {schema.nome}: colonne mancanti {', '.join(mancanti)}")
+    return {nome: intestazioni[nome] for nome in schema.nomi}
+
+
+def valida(df, schema, intestazioni):
+    """Rinomina, converte e controlla le colonne lette secondo lo schema"""
+    df = df.rename(columns={originale: nome for nome, originale in intestazioni.items()})
+    if schema.scarta_righe_vuote:
+        df = df.dropna(how='all')
+
+    for colonna in schema.colonne:
+        valori = df[colonna.nome]
+        try:
+            if colonna.tipo == 'data':
+                df[colonna.nome] = pd.to_datetime(valori, format=schema.formato_data)
+            elif colonna.predefinito is not None:
+                if schema.decimale != '.':
+                    valori = valori.astype(str).str.replace(schema.decimale, '.', regex=False).where(valori.notna())
+                df[colonna.nome] = pd.to_numeric(valori, errors='coerce').fillna(colonna.predefinito).astype(colonna.tipo)
+            elif df[colonna.nome].dtype != colonna.tipo:
+                df[colonna.nome] = valori.astype(colonna.tipo)
+        except (TypeError, ValueError) as e:
+            raise ErroreSchema(f"File {schema.nome}: colonna '{colonna.nome}' non convertibile in {colonna.tipo} ({e})") from e
+
+    return df[schema.nomi].rename(columns={c.nome: c.rinomina for c in schema.colonne})
+
+
+def leggi_csv(percorso, schema):
+    """Legge un CSV con le sole colonne dello schema, già tipizzate e validate.
+
+    `percorso` è un percorso o un file binario (per esempio un file caricato).
+    """
+    intestazioni = intestazioni_file(
+        pd.read_csv(percorso, nrows=0, skiprows=schema.righe_da_saltare or None).columns, schema
+    )
+    if hasattr(percorso, 'seek'):
+        percorso.seek(0)
+    try:
+        df = pd.read_csv(
+            percorso,
+            usecols=list(intestazioni.values()),
+            dtype=schema.tipi_lettura(intestazioni),
+            skiprows=schema.righe_da_saltare or None,
+            decimal=schema.decimale
+        )
+    except ValueError as e:
+        raise ErroreSchema(f"File {schema.nome}: valori non conformi allo schema ({e})") from e
+    return valida(df, schema, intestazioni)
+
+
+def leggi_excel(sorgente, schema, foglio=0):
+    """Legge un foglio Excel con le sole colonne dello schema, già tipizzate e validate.
+
+    `sorgente` è un percorso, un file caricato o un pd.ExcelFile già aperto.
+    """
+    attese = set(schema.nomi)
+    df = pd.read_excel(
+        sorgente,
+        sheet_name=foglio,
+        skiprows=schema.righe_da_saltare,
+        usecols=lambda intestazione: str(intestazione).strip() in attese,
+        decimal=schema.decimale
+    )
+    return valida(df, schema, intestazioni_file(df.columns, schema))
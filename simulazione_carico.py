@@ -0,0 +1,335 @@
+"""Simulazione di carico della dashboard con più sessioni concorrenti.
+
+Esempi:
+    python simulazione_carico.py --sessioni 8
+    python simulazione_carico.py --sessioni 4 --ripetizioni 10 --output tempi_carico.csv
+
+Ogni sessione è un AppTest di Streamlit che esegue breakfast_dashboard.py
+nello stesso processo, come le sessioni di un unico server: le risorse in
+st.cache_resource, la cache dei risultati e il worker dei caricamenti sono
+condivisi. Le sessioni partono insieme e ripetono le interazioni tipiche
+(cambio mese, buffer, caricamento delle giacenze) sui dati della cartella;
+al termine vengono riportati i percentili di latenza per interazione e la
+memoria del processo. Non serve rete né un server avviato.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+FILE_APP = 'breakfast_dashboard.py'
+
+# Etichetta del caricamento giacenze del tab 3 (il widget non ha chiave)
+ETICHETTA_GIACENZE = "Scegli il file giacenze_magazzino.xlsx"
+
+# Chiave di session_state con i file caricati dalla simulazione, per chiave o etichetta del widget
+CHIAVE_FILE_SIMULATI = '_simulazione_file'
+
+# Pausa tra le esecuzioni mentre si attende la fine di un caricamento in background
+INTERVALLO_ATTESA = 0.1
+
+PERCENTILI = [50, 90, 95, 99]
+
+
+class FileSimulato(io.BytesIO):
+    """File caricato dalla simulazione, con la stessa interfaccia usata dalla dashboard"""
+
+    def __init__(self, contenuto, nome):
+        super().__init__(contenuto)
+        self.name = nome
+        self.size = len(contenuto)
+
+
+def installa_caricamento_simulato():
+    """Sostituisce st.file_uploader con una versione che restituisce i file simulati della sessione.
+
+    AppTest non sa ancora pilotare i file_uploader: i file da caricare sono
+    messi in session_state e restituiti al posto del widget, quindi la
+    dashboard li elabora con il percorso reale (worker, avanzamento, ordine).
+    Le sessioni senza file simulati usano il widget originale.
+    """
+    import streamlit as st
+    if getattr(st.file_uploader, 'simulato', False):
+        return
+
+    originale = st.file_uploader
+
+    def file_uploader(label, *args, **kwargs):
+        simulati = st.session_state.get(CHIAVE_FILE_SIMULATI, {})
+        chiave = kwargs.get('key') or label
+        if chiave in simulati:
+            return simulati[chiave]
+        return originale(label, *args, **kwargs)
+
+    file_uploader.simulato = True
+    st.file_uploader = file_uploader
+
+
+def installa_server_condiviso():
+    """Fa condividere a tutte le sessioni runtime e bytecode della dashboard, come su un server.
+
+    A ogni esecuzione AppTest installa un runtime fittizio globale e lo
+    rimuove al termine: con più sessioni in parallelo la prima che finisce
+    lo toglierebbe a quelle ancora in esecuzione. Inoltre ogni esecuzione
+    ricompila lo script, e compilarlo da più thread insieme può fallire;
+    il server lo compila una volta sola in una cache condivisa.
+    """
+    from unittest.mock import MagicMock
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+    if getattr(Runtime.instance, 'condiviso', False):
+        return
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+
+    def istanza(cls):
+        return runtime
+
+    istanza.condiviso = True
+    Runtime.instance = classmethod(istanza)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    cache_script = ScriptCache()
+    local_script_runner.ScriptCache = lambda: cache_script
+
+
+def file_giacenze(cartella_dati, seme):
+    """File Excel di giacenze per gli articoli dei fogli mensili, con quantità casuali riproducibili"""
+    from dati_comuni import DatiCondivisi
+    articoli = DatiCondivisi(cartella_dati).compatti.articoli['Articolo'].dropna().unique()
+    generatore = random.Random(seme)
+    # Il gestionale esporta le quantità con la virgola decimale
+    df = pd.DataFrame({
+        'Descrizione': articoli,
+        'Magazz.': [f"{generatore.uniform(0, 50):.1f}".replace('.', ',') for _ in articoli],
+    })
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def memoria_processo():
+    """Memoria residente attuale e massima del processo, in MB"""
+    picco = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    try:
+        with open('/proc/self/statm') as f:
+            attuale = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        attuale = picco
+    return attuale, picco
+
+
+class Sessione:
+    """Utente simulato: un AppTest della dashboard e le interazioni con i relativi tempi"""
+
+    def __init__(self, numero, cartella_dati, seme, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.numero = numero
+        self.generatore = random.Random(seme + numero)
+        self.timeout = timeout
+        self.app = AppTest.from_file(os.path.join(cartella_dati, FILE_APP), default_timeout=timeout)
+        # Ogni sessione carica un file diverso, che il worker non può riconoscere come già letto
+        self.giacenze = FileSimulato(file_giacenze(cartella_dati, seme + numero), f"giacenze_sessione_{numero}.xlsx")
+        self.tempi = []
+
+    def esegui(self, interazione, azione):
+        """Esegue un'interazione e ne registra la durata e l'eventuale errore"""
+        inizio = time.perf_counter()
+        errore = None
+        try:
+            azione()
+            if self.app.exception:
+                errore = self.app.exception[0].value
+        except Exception as e:
+            errore = f"{type(e).__name__}: {e}"
+        self.tempi.append({
+            'Sessione': self.numero,
+            'Interazione': interazione,
+            'Secondi': time.perf_counter() - inizio,
+            'Errore': errore,
+        })
+
+    def avvio(self):
+        self.app.run()
+
+    def cambia_mese(self):
+        selettore = self.app.selectbox(key='tab1_mese')
+        selettore.set_value(self.generatore.choice(selettore.options)).run()
+
+    def cambia_buffer(self):
+        slider = next(s for s in self.app.slider if s.label == "Buffer (%)")
+        slider.set_value(self.generatore.randrange(0, 51, 5)).run()
+
+    def carica_giacenze(self):
+        """Carica un file giacenze proprio della sessione e attende che l'ordine lo usi"""
+        self.app.session_state[CHIAVE_FILE_SIMULATI] = {ETICHETTA_GIACENZE: self.giacenze}
+        next(c for c in self.app.checkbox if c.label == "Considera giacenze attuali").check().run()
+        limite = time.perf_counter() + self.timeout
+        while not any(s.value.startswith("File giacenze caricato") for s in self.app.success):
+            if self.app.exception or self.app.error or time.perf_counter() > limite:
+                raise RuntimeError("Caricamento delle giacenze non completato")
+            time.sleep(INTERVALLO_ATTESA)
+            self.app.run()
+
+    def simula(self, ripetizioni, partenza):
+        partenza.wait()
+        self.esegui('avvio', self.avvio)
+        for ripetizione in range(ripetizioni):
+            self.esegui('cambia mese', self.cambia_mese)
+            self.esegui('buffer', self.cambia_buffer)
+            if ripetizione == 0:
+                self.esegui('carica giacenze', self.carica_giacenze)
+        return self.tempi
+
+
+def simula_carico(sessioni=4, ripetizioni=3, cartella_dati='.', seme=0, timeout=120):
+    """Esegue le sessioni in parallelo e restituisce (tempi di ogni interazione, memoria)"""
+    installa_server_condiviso()
+    installa_caricamento_simulato()
+    memoria_iniziale, _ = memoria_processo()
+
+    utenti = [Sessione(numero, cartella_dati, seme, timeout) for numero in range(sessioni)]
+    # Un'esecuzione iniziale, come su un server già avviato: importare gli stessi
+    # moduli (plotly, orjson) da più thread insieme può fallire per import circolari
+    Sessione(sessioni, cartella_dati, seme, timeout).avvio()
+    partenza = threading.Barrier(sessioni)
+    with ThreadPoolExecutor(max_workers=sessioni, thread_name_prefix='sessione') as esecutore:
+        risultati = [esecutore.submit(utente.simula, ripetizioni, partenza) for utente in utenti]
+        tempi = [tempo for risultato in risultati for tempo in risultato.result()]
+
+    memoria_finale, picco = memoria_processo()
+    memoria = {'Iniziale (MB)': memoria_iniziale, 'Finale (MB)': memoria_finale, 'Picco (MB)': picco}
+    return pd.DataFrame(tempi), memoria
+
+
+def primo_avvio(cartella_dati, timeout=120):
+    """Prima esecuzione della dashboard nel processo corrente, in millisecondi.
+
+    Misura il tempo al primo contenuto visibile (il titolo, inviato al
+    browser mentre il resto della pagina è ancora in calcolo) e quello
+    dell'esecuzione completa.
+    """
+    from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+    from streamlit.testing.v1 import AppTest
+
+    tempi = {}
+    originale = ForwardMsgQueue.enqueue
+
+    def enqueue(coda, messaggio):
+        if ('Primo Contenuto (ms)' not in tempi and messaggio.WhichOneof('type') == 'delta'
+                and messaggio.delta.new_element.WhichOneof('type') == 'heading'):
+            tempi['Primo Contenuto (ms)'] = (time.perf_counter() - inizio) * 1000
+        originale(coda, messaggio)
+
+    ForwardMsgQueue.enqueue = enqueue
+    app = AppTest.from_file(os.path.join(cartella_dati, FILE_APP), default_timeout=timeout)
+    inizio = time.perf_counter()
+    app.run()
+    tempi['Esecuzione Completa (ms)'] = (time.perf_counter() - inizio) * 1000
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    return tempi
+
+
+def misura_avvio(cartella_dati, ripetizioni=5, timeout=120):
+    """Tempi della prima esecuzione in `ripetizioni` processi nuovi, come dopo un riavvio del server.
+
+    I file in .cache (istantanea, archivio, risultati) restano quelli già
+    preparati: si misura l'avvio della dashboard, non la lettura degli export.
+    """
+    comando = [sys.executable, os.path.abspath(__file__), '--dati', cartella_dati,
+               '--timeout', str(timeout), '--primo-avvio']
+    misure = []
+    for _ in range(ripetizioni + 1):
+        uscita = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        misure.append(json.loads(uscita.strip().splitlines()[-1]))
+    # Il primo processo prepara le cache su disco e non viene conteggiato
+    return pd.DataFrame(misure[1:])
+
+
+def riepilogo_latenze(df_tempi):
+    """Percentili di latenza in millisecondi per interazione, sulle interazioni senza errori"""
+    righe = []
+    for interazione, gruppo in df_tempi.groupby('Interazione', sort=False):
+        millisecondi = gruppo.loc[gruppo['Errore'].isna(), 'Secondi'].to_numpy() * 1000
+        riga = {'Interazione': interazione, 'N': len(gruppo), 'Errori': int(gruppo['Errore'].notna().sum())}
+        if len(millisecondi):
+            riga.update({f"p{p} (ms)": valore for p, valore in zip(PERCENTILI, np.percentile(millisecondi, PERCENTILI))})
+            riga['Max (ms)'] = millisecondi.max()
+        righe.append(riga)
+    return pd.DataFrame(righe)
+
+
+def crea_parser():
+    parser = argparse.ArgumentParser(description="Simulazione di carico della dashboard colazioni con sessioni concorrenti")
+    parser.add_argument('--sessioni', type=int, default=4, metavar='N',
+                        help="Numero di utenti simulati in parallelo (default: 4)")
+    parser.add_argument('--ripetizioni', type=int, default=3, metavar='N',
+                        help="Cicli di interazioni per sessione (default: 3)")
+    parser.add_argument('--dati', default='.', metavar='CARTELLA',
+                        help="Cartella della dashboard e dei file di input (default: cartella corrente)")
+    parser.add_argument('--seme', type=int, default=0,
+                        help="Seme delle scelte casuali, per ripetere la stessa simulazione (default: 0)")
+    parser.add_argument('--timeout', type=float, default=120, metavar='SECONDI',
+                        help="Tempo massimo di ogni esecuzione della dashboard (default: 120)")
+    parser.add_argument('--output', metavar='FILE', help="Salva i tempi di ogni interazione in CSV")
+    parser.add_argument('--avvio', type=int, metavar='N',
+                        help="Misura invece la prima esecuzione della dashboard in N processi nuovi")
+    # Usata da --avvio per la misura in ogni processo
+    parser.add_argument('--primo-avvio', action='store_true', help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = crea_parser().parse_args(argv)
+    # La dashboard legge i file di input dalla cartella corrente
+    cartella_dati = os.path.abspath(args.dati)
+    os.chdir(cartella_dati)
+    sys.path.insert(0, cartella_dati)
+
+    if args.primo_avvio:
+        print(json.dumps(primo_avvio(cartella_dati, args.timeout)))
+        return 0
+    if args.avvio:
+        df_avvio = misura_avvio(cartella_dati, args.avvio, args.timeout)
+        print(f"\nPrima esecuzione della dashboard in {args.avvio} processi nuovi:")
+        print(df_avvio.describe().loc[['mean', 'min', 'max']].round(0).to_string())
+        return 0
+
+    inizio = time.perf_counter()
+    df_tempi, memoria = simula_carico(args.sessioni, args.ripetizioni, cartella_dati, args.seme, args.timeout)
+    durata = time.perf_counter() - inizio
+
+    with pd.option_context('display.float_format', lambda x: '{:.1f}'.format(x)):
+        print(f"\n{args.sessioni} sessioni, {len(df_tempi)} interazioni in {durata:.1f} s")
+        print(riepilogo_latenze(df_tempi).to_string(index=False))
+        print("\nMemoria del processo: " + ", ".join(f"{nome} {valore:.0f}" for nome, valore in memoria.items()))
+
+    errori = df_tempi[df_tempi['Errore'].notna()]
+    for _, riga in errori.drop_duplicates('Errore').iterrows():
+        print(f"Errore ({riga['Interazione']}, sessione {riga['Sessione']}): {riga['Errore']}", file=sys.stderr)
+
+    if args.output:
+        df_tempi.to_csv(args.output, index=False)
+        print(f"\nFile {args.output} creato con successo!")
+    return 1 if len(errori) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
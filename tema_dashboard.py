@@ -0,0 +1,216 @@
+"""Tema e costanti della dashboard Streamlit.
+
+Il modulo viene eseguito una sola volta per processo: a ogni esecuzione di
+breakfast_dashboard.py Streamlit riusa il modulo già importato invece di
+ricostruire il CSS e le tabelle di costanti. Nomi dei file e dei mesi sono
+quelli di dati_comuni, condivisi con i report.
+"""
+
+# Configurazione della pagina (st.set_page_config)
+CONFIGURAZIONE_PAGINA = dict(
+    page_title="Dashboard Colazioni",
+    page_icon="🍳",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Definizione del tema personalizzato
+CSS_TEMA = """
+    <style>
+    /* Colori principali */
+    :root {
+        --primary-color: #8B6914;
+        --secondary-color: #FFF8DC;
+        --accent-color: #D2691E;
+        --background-color: #FFFFFF;
+        --text-color: #333333;
+        --card-bg: #F8F9FA;
+        --border-color: #E0E0E0;
+    }
+
+    /* Stile generale */
+    .stApp {
+        background-color: var(--background-color);
+        color: var(--text-color);
+    }
+
+    /* Stile titoli */
+    h1, h2, h3 {
+        color: var(--text-color) !important;
+    }
+
+    /* Stile metriche */
+    [data-testid="metric-container"] {
+        background-color: var(--card-bg);
+        border: 1px solid var(--border-color);
+        border-radius: 10px;
+        padding: 15px;
+        margin: 5px 0;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+
+    [data-testid="metric-container"] [data-testid="metric-label"] {
+        color: var(--text-color) !important;
+    }
+
+    [data-testid="metric-container"] [data-testid="metric-value"] {
+        color: var(--primary-color) !important;
+        font-weight: bold;
+    }
+
+    /* Stile tab */
+    .stTabs [data-baseweb="tab-list"] {
+        gap: 2px;
+        background-color: var(--card-bg);
+        border-radius: 10px;
+        padding: 5px;
+    }
+
+    .stTabs [data-baseweb="tab"] {
+        background-color: transparent;
+        border-radius: 5px;
+        padding: 10px 20px;
+        color: var(--text-color);
+        font-weight: 500;
+    }
+
+    .stTabs [aria-selected="true"] {
+        background-color: var(--primary-color);
+        color: white !important;
+    }
+
+    /* Stile bottoni */
+    .stButton button {
+        background-color: var(--primary-color);
+        color: white;
+        border-radius: 5px;
+        padding: 10px 20px;
+        border: none;
+        font-weight: 500;
+        transition: all 0.3s ease;
+    }
+
+    .stButton button:hover {
+        background-color: var(--accent-color);
+        transform: translateY(-2px);
+        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+    }
+
+    /* Stile dataframe */
+    .dataframe {
+        background-color: var(--card-bg);
+        border-radius: 10px;
+        border: 1px solid var(--border-color);
+        overflow: hidden;
+    }
+
+    .dataframe thead tr th {
+        background-color: var(--primary-color) !important;
+        color: white !important;
+        font-weight: bold;
+        padding: 12px !important;
+    }
+
+    .dataframe tbody tr:nth-child(even) {
+        background-color: #F5F5F5;
+    }
+
+    .dataframe tbody tr:hover {
+        background-color: #E8E8E8;
+    }
+
+    /* Stile selectbox e input */
+    .stSelectbox > div > div,
+    .stTextInput > div > div > input,
+    .stNumberInput > div > div > input {
+        background-color: white;
+        color: var(--text-color);
+        border: 1px solid var(--border-color);
+        border-radius: 5px;
+    }
+
+    .stSelectbox > label,
+    .stTextInput > label,
+    .stNumberInput > label {
+        color: var(--text-color) !important;
+        font-weight: 500;
+    }
+
+    /* Stile sidebar */
+    .css-1d391kg {
+        background-color: var(--card-bg);
+    }
+
+    /* Stile alerts */
+    .stAlert {
+        background-color: var(--card-bg);
+        border: 1px solid var(--border-color);
+        border-radius: 10px;
+        color: var(--text-color);
+    }
+
+    /* Miglioramento contrasto per i grafici */
+    .js-plotly-plot .plotly {
+        background-color: white !important;
+    }
+
+    /* Card personalizzate */
+    .custom-card {
+        background-color: var(--card-bg);
+        border: 1px solid var(--border-color);
+        border-radius: 10px;
+        padding: 20px;
+        margin: 10px 0;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+
+    /* Miglioramento leggibilità testo */
+    p, span, div {
+        color: var(--text-color) !important;
+    }
+
+    /* Stile per expander */
+    .streamlit-expanderHeader {
+        background-color: var(--card-bg);
+        border: 1px solid var(--border-color);
+        border-radius: 5px;
+        color: var(--text-color) !important;
+    }
+
+    .streamlit-expanderContent {
+        background-color: white;
+        border: 1px solid var(--border-color);
+        border-top: none;
+        border-radius: 0 0 5px 5px;
+    }
+    </style>
+"""
+
+# Massimo di colazioni servibili in un giorno
+MAX_PAX_GIORNALIERI = 194
+
+# Origini dei coefficienti per la pianificazione ordini (la prima è il foglio del mese)
+FONTI_COEFFICIENTI = ["Mese di riferimento", "Mese normalizzato", "Tutti i mesi (ponderati per copertura)",
+                      "Media degli ultimi mesi"]
+
+# Dizionario dei costi mensili
+COSTI_MENSILI = {
+    'Aprile': 8883.02,
+    'Maggio': 15004.04,
+    'Giugno': 18966.23,
+    'Luglio': 22540.99,
+    'Agosto': 21773.70,
+    'Settembre': 19710.02,
+    'Ottobre': 13749.44
+}
+
+# Colazioni mensili reali (basate sui dati effettivi)
+COLATIONI_MENSILI = {
+    'Aprile': 1279,
+    'Maggio': 3459,
+    'Giugno': 4896,
+    'Luglio': 5199,
+    'Agosto': 5159,
+    'Settembre': 4337,
+    'Ottobre': 3202
+}
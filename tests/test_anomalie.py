@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from anomalie import FATTORE_MAD, Anomalie, anomalie_mensili
+
+
+def colazioni_prova(mesi):
+    """Colazioni registrate ogni giorno dei mesi indicati"""
+    date = pd.concat([pd.Series(pd.date_range(f'2024-{mese:02d}-01', periods=28, freq='D')) for mese in mesi])
+    return pd.DataFrame({'data': date.to_numpy(), 'mese': date.dt.month.to_numpy(), 'CONSUMO REALE COLAZIONI': 100})
+
+
+def test_mediana_e_mad_escludono_il_mese_controllato():
+    """Lo scarto di ogni mese è misurato rispetto a mediana e MAD dei soli altri mesi"""
+    costi = [2.0, 2.2, 2.4, 2.6, 9.0]
+    riepilogo = pd.DataFrame({
+        'Mese': ['04_Aprile', '05_Maggio', '06_Giugno', '07_Luglio', '08_Agosto'],
+        'Costo Medio per Colazione': costi,
+        'Numero Colazioni': 2800
+    })
+    mesi = anomalie_mensili(riepilogo, colazioni_prova(range(4, 9)))
+
+    altri = np.array(costi[:4])
+    mad = np.median(np.abs(altri - np.median(altri)))
+    assert np.isclose(mesi['Scarto Robusto'].iloc[4], FATTORE_MAD * (9.0 - np.median(altri)) / mad)
+    assert mesi['Anomalo'].tolist() == [False, False, False, False, True]
+
+
+def test_mesi_segnalati_esclusi_dai_pesi():
+    """I mesi segnalati pesano zero, a meno che non lo siano tutti i mesi pesati"""
+    mesi = pd.DataFrame({'Mese': ['Aprile', 'Maggio', 'Giugno'], 'Anomalo': [True, False, False],
+                         'Motivo': ['costo per colazione anomalo', '', '']})
+    anomalie = Anomalie(None, mesi, None)
+    assert anomalie.escludi_mesi(['Aprile', 'Maggio', 'Giugno'], [1.0, 1.0, 0.5]).tolist() == [0.0, 1.0, 0.5]
+    assert anomalie.escludi_mesi(['Aprile', 'Maggio', 'Giugno'], [1.0, 0.0, 0.0]).tolist() == [1.0, 0.0, 0.0]
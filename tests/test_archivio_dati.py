@@ -0,0 +1,27 @@
+import os
+
+import pandas as pd
+
+from archivio_dati import costruisci_archivio
+from dati_comuni import NUMERI_MESI, DatiCondivisi
+
+CARTELLA_ESEMPIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example_data')
+
+
+def test_viste_come_dati_compatti(tmp_path):
+    """Viste del mese, categorie e colazioni dell'archivio coincidono con quelle di DatiCompatti"""
+    dati = DatiCondivisi(CARTELLA_ESEMPIO).compatti
+    archivio = costruisci_archivio(dati, 'versione', str(tmp_path / 'archivio.sqlite'))
+    categorie = dati.categorie()
+    assert archivio.mesi == tuple(dati.mesi)
+    assert archivio.categorie() == categorie
+
+    for mese in dati.mesi:
+        for opzioni in ({}, {'solo_positivi': True}, {'solo_positivi': True, 'categorie_escluse': categorie[:2]},
+                        {'categoria': categorie[-1]}):
+            pd.testing.assert_frame_equal(archivio.vista_mese(mese, **opzioni), dati.vista_mese(mese, **opzioni))
+        assert archivio.categorie([mese]) == dati.categorie([mese])
+        pd.testing.assert_frame_equal(archivio.colazioni_mese(NUMERI_MESI[mese]),
+                                      dati.colazioni_mese(NUMERI_MESI[mese]))
+
+    pd.testing.assert_frame_equal(archivio.colazioni(), dati.colazioni)
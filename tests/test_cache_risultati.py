@@ -0,0 +1,29 @@
+from cache_risultati import CacheRisultati
+
+
+def test_risultato_none_salvato(tmp_path):
+    """Un risultato None è un valore salvato come gli altri, non una chiave assente"""
+    cache = CacheRisultati(str(tmp_path / 'risultati.sqlite'))
+    chiamate = []
+
+    def calcola():
+        chiamate.append(1)
+        return None
+
+    assert cache.ottieni('vuoto', calcola) is None
+    assert cache.ottieni('vuoto', calcola) is None
+    assert len(chiamate) == 1
+    assert cache.leggi('mancante', 'assente') == 'assente'
+
+
+def test_elimina_i_meno_usati_oltre_la_dimensione(tmp_path):
+    """Superata la dimensione massima restano i risultati usati più di recente"""
+    cache = CacheRisultati(str(tmp_path / 'risultati.sqlite'), dimensione_massima=2500)
+    for chiave in ('a', 'b'):
+        cache.scrivi(chiave, b'x' * 1000)
+    # Leggere 'a' lo rende più recente di 'b'
+    assert cache.leggi('a') == b'x' * 1000
+    cache.scrivi('c', b'x' * 1000)
+
+    assert cache.leggi('b') is None
+    assert cache.leggi('a') is not None and cache.leggi('c') is not None
@@ -0,0 +1,54 @@
+import os
+import shutil
+
+from caricamenti import ElaborazioneCaricamenti
+from dati_comuni import (FILE_COLAZIONI, DatiCondivisi, anno_file_colazioni, nome_file_colazioni, trova_file_colazioni,
+                         versione_dati)
+from istantanea_dati import leggi_istantanea
+
+CARTELLA_ESEMPIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example_data')
+
+
+def test_pubblica_dopo_aver_preparato_l_istantanea(tmp_path, monkeypatch):
+    """Il nuovo file sostituisce quello dei dati solo dopo che l'istantanea della sua versione è pronta"""
+    cartella = tmp_path / 'dati'
+    shutil.copytree(CARTELLA_ESEMPIO, cartella)
+    monkeypatch.chdir(tmp_path)
+    with open(cartella / FILE_COLAZIONI, 'rb') as f:
+        contenuto = f.read().replace(b'\r\n', b'\n') + b'\n'
+
+    caricamento = ElaborazioneCaricamenti(str(cartella)).invia('colazioni', contenuto, FILE_COLAZIONI)
+    assert caricamento.attendi(60) and caricamento.pronto
+    assert (cartella / FILE_COLAZIONI).read_bytes() == contenuto
+    assert (cartella / f"{FILE_COLAZIONI}.precedente").exists()
+    assert not [nome for nome in os.listdir(cartella) if nome.endswith('.tmp')]
+    assert leggi_istantanea(versione_dati(str(cartella))) is not None
+
+
+def test_file_non_valido_non_pubblicato(tmp_path, monkeypatch):
+    """Un export che non supera la validazione lascia intatto il file dei dati"""
+    cartella = tmp_path / 'dati'
+    shutil.copytree(CARTELLA_ESEMPIO, cartella)
+    monkeypatch.chdir(tmp_path)
+    originale = (cartella / FILE_COLAZIONI).read_bytes()
+
+    caricamento = ElaborazioneCaricamenti(str(cartella)).invia('colazioni', b'data;altro\n1;2\n', FILE_COLAZIONI)
+    assert caricamento.attendi(60) and caricamento.errore is not None
+    assert (cartella / FILE_COLAZIONI).read_bytes() == originale
+    assert not [nome for nome in os.listdir(cartella) if nome.endswith('.tmp')]
+
+
+def test_nuova_stagione_pubblicata_con_il_suo_anno(tmp_path, monkeypatch):
+    """L'export di una nuova stagione prende il nome dal suo anno e diventa quello in uso"""
+    cartella = tmp_path / 'dati'
+    shutil.copytree(CARTELLA_ESEMPIO, cartella)
+    monkeypatch.chdir(tmp_path)
+    with open(cartella / FILE_COLAZIONI, 'rb') as f:
+        contenuto = f.read().replace(b'/2024 ', b'/2025 ')
+
+    caricamento = ElaborazioneCaricamenti(str(cartella)).invia('colazioni', contenuto, 'export.csv')
+    assert caricamento.attendi(60) and caricamento.pronto
+    assert (cartella / nome_file_colazioni(2025)).read_bytes() == contenuto
+    assert trova_file_colazioni(str(cartella)) == nome_file_colazioni(2025)
+    assert DatiCondivisi(str(cartella)).colazioni['data'].dt.year.unique().tolist() == [2025]
+    assert anno_file_colazioni(trova_file_colazioni(str(cartella))) == 2025
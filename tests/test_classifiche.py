@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+
+from calcolo_costi_prodotti import calcola_costi_prodotti
+from classifiche import ClassificheMesi
+from dati_comuni import DatiCondivisi
+from prezzi import StoricoPrezzi
+
+CARTELLA_ESEMPIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example_data')
+
+
+def test_costo_articolo_come_calcolo_costi_prodotti():
+    """Il costo della classifica è quantità × prezzo del mese, senza fattore di conversione"""
+    dati = DatiCondivisi(CARTELLA_ESEMPIO)
+    classifiche = ClassificheMesi(dati.compatti, StoricoPrezzi(dati.consumi))
+    articoli = dati.compatti.articoli['Articolo'].astype(object)
+    articolo = 'EMMENTAL KG 3 L00035'
+    indice = int(np.flatnonzero(articoli == articolo)[0])
+
+    costi = calcola_costi_prodotti(dati.colazioni, dati.fogli_mensili, dati.consumi)
+    riga = costi[(costi['Mese'] == 'Agosto') & (costi['Articolo'] == articolo)].iloc[0]
+    quantita = classifiche.valori['Agosto']['Quantità'][indice]
+    costo = classifiche.valori['Agosto']['Costo'][indice]
+
+    assert np.isclose(costo, quantita * riga['Costo_Unitario'])
+    # Il report usa coefficiente arrotondato × colazioni invece della quantità del foglio
+    assert np.isclose(costo, riga['Costo_Totale_Prodotto'], rtol=1e-3)
+    assert costo > 100
+
+
+def test_classifica_per_costo_decrescente():
+    dati = DatiCondivisi(CARTELLA_ESEMPIO)
+    classifiche = ClassificheMesi(dati.compatti, StoricoPrezzi(dati.consumi))
+    ids = classifiche.classifica('Agosto', 'Costo')
+    costi = classifiche.valori['Agosto']['Costo'][ids]
+    validi = costi[~np.isnan(costi)]
+    assert np.all(np.diff(validi) <= 0)
@@ -0,0 +1,12 @@
+import os
+
+from dati_sintetici import verifica
+
+CARTELLA_ESEMPIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example_data')
+
+
+def test_dati_e_risultati_attesi(tmp_path, monkeypatch, capsys):
+    """Generatore deterministico e risultati di tutta la catena uguali a quelli versionati in example_data"""
+    monkeypatch.chdir(tmp_path)
+    errori = verifica(CARTELLA_ESEMPIO, os.path.join(CARTELLA_ESEMPIO, 'attesi'))
+    assert errori == 0, capsys.readouterr().out
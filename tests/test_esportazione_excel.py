@@ -0,0 +1,28 @@
+import pandas as pd
+
+from cache_risultati import CacheRisultati
+from esportazione_excel import EsportatoreExcel
+
+
+def fogli_prova():
+    return {'Ordine': pd.DataFrame({'Articolo': ['PANE'], 'Quantità': [2.0]})}
+
+
+def test_cache_non_leggibile_genera_subito(tmp_path):
+    """Con il file della cache corrotto pronto() non solleva errori e avvia() genera il file subito"""
+    cache = CacheRisultati(str(tmp_path / 'risultati.sqlite'))
+    (tmp_path / 'risultati.sqlite').write_bytes(b'non un database' * 100)
+    esportatore = EsportatoreExcel(cache)
+
+    assert esportatore.pronto('ordine') is None
+    contenuto = esportatore.avvia('ordine', fogli_prova)
+    assert contenuto[:2] == b'PK'
+    assert not esportatore.in_preparazione('ordine')
+
+
+def test_cache_leggibile_genera_in_background(tmp_path):
+    """Con la cache funzionante il file viene generato in background e ritrovato con pronto()"""
+    esportatore = EsportatoreExcel(CacheRisultati(str(tmp_path / 'risultati.sqlite')))
+    assert esportatore.avvia('ordine', fogli_prova) is None
+    esportatore.esecutore.shutdown(wait=True)
+    assert esportatore.pronto('ordine')[:2] == b'PK'
@@ -0,0 +1,46 @@
+from collections import Counter
+
+from grafo_calcolo import GrafoCalcolo
+
+
+def grafo_prova(chiamate, voci_per_nodo=8):
+    """a <- x, b <- y, somma <- a, b: ogni nodo conta le proprie esecuzioni"""
+    def nodo(nome, funzione):
+        def esegui(*argomenti):
+            chiamate[nome] += 1
+            return funzione(*argomenti)
+        return esegui
+
+    grafo = GrafoCalcolo(voci_per_nodo)
+    grafo.aggiungi('a', nodo('a', lambda x: x * 2), 'x')
+    grafo.aggiungi('b', nodo('b', lambda y: y + 1), 'y')
+    grafo.aggiungi('somma', nodo('somma', lambda a, b: a + b), 'a', 'b')
+    return grafo
+
+
+def test_ricalcola_solo_i_nodi_a_valle():
+    """Cambiando un ingresso si ricalcolano i nodi che ne dipendono, gli altri vengono dalla memoria"""
+    chiamate = Counter()
+    grafo = grafo_prova(chiamate)
+
+    assert grafo.calcola('somma', {'x': 1, 'y': 1}) == 4
+    assert grafo.calcola('somma', {'x': 1, 'y': 1}) == 4
+    assert chiamate == Counter(a=1, b=1, somma=1)
+
+    assert grafo.calcola('somma', {'x': 1, 'y': 5}) == 8
+    assert chiamate == Counter(a=1, b=2, somma=2)
+
+    # Tornando agli ingressi precedenti il risultato è ancora in memoria
+    assert grafo.calcola('somma', {'x': 1, 'y': 1}) == 4
+    assert chiamate == Counter(a=1, b=2, somma=2)
+
+
+def test_voci_per_nodo_limitate():
+    """Ogni nodo conserva al più voci_per_nodo risultati, scartando i meno recenti"""
+    chiamate = Counter()
+    grafo = grafo_prova(chiamate, voci_per_nodo=2)
+    for x in (1, 2, 3):
+        grafo.calcola('a', {'x': x})
+    grafo.calcola('a', {'x': 1})
+    assert chiamate['a'] == 4
+    assert len(grafo.memoria['a']) == 2
@@ -0,0 +1,34 @@
+import os
+
+from dati_comuni import DatiCondivisi
+from istantanea_dati import (ISTANTANEE_CONSERVATE, PREFISSO_ISTANTANEA, cartella_istantanea, leggi_istantanea,
+                             scrivi_istantanea)
+from modello_dati import costruisci_dati_compatti
+
+CARTELLA_ESEMPIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example_data')
+
+
+def dati_esempio():
+    dati = DatiCondivisi(CARTELLA_ESEMPIO)
+    return costruisci_dati_compatti(dati.fogli_mensili, dati.consumi, dati.colazioni)
+
+
+def test_conserva_le_istantanee_piu_recenti(tmp_path):
+    """Scrivere una versione non elimina le istantanee recenti delle altre"""
+    dati = dati_esempio()
+    versioni = [f"versione-{n}" for n in range(ISTANTANEE_CONSERVATE + 2)]
+    for n, versione in enumerate(versioni):
+        cartella = scrivi_istantanea(dati, versione, str(tmp_path))
+        os.utime(cartella, (n, n))
+
+    presenti = sorted(nome for nome in os.listdir(tmp_path) if nome.startswith(PREFISSO_ISTANTANEA))
+    attese = sorted(os.path.basename(cartella_istantanea(v, str(tmp_path))) for v in versioni[-ISTANTANEE_CONSERVATE:])
+    assert presenti == attese
+    assert leggi_istantanea(versioni[-2], str(tmp_path)) is not None
+
+
+def test_istantanea_incompleta_come_assente(tmp_path):
+    """Un file mancante (istantanea eliminata durante la lettura) equivale a un'istantanea assente"""
+    cartella = scrivi_istantanea(dati_esempio(), 'versione', str(tmp_path))
+    os.remove(os.path.join(cartella, 'quantita.npy'))
+    assert leggi_istantanea('versione', str(tmp_path)) is None
@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+
+from calcolo_costi_prodotti import calcola_costi_prodotti
+from dati_comuni import NUMERI_MESI, DatiCondivisi
+from ordini import calcola_ordine
+from prezzi import StoricoPrezzi
+
+CARTELLA_ESEMPIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example_data')
+
+
+def test_costo_teorico_senza_fattore_di_conversione():
+    """Il costo teorico del consumo è coefficiente × colazioni × prezzo anche con Coeff Conv diverso da 1"""
+    dati = DatiCondivisi(CARTELLA_ESEMPIO)
+    articolo = 'EMMENTAL KG 3 L00035'
+    assert (dati.consumi.loc[dati.consumi['Descrizione'] == articolo, 'Coeff Conv'] == 1000).all()
+
+    costi = calcola_costi_prodotti(dati.colazioni, dati.fogli_mensili, dati.consumi)
+    riga = costi[(costi['Mese'] == 'Agosto') & (costi['Articolo'] == articolo)].iloc[0]
+    colazioni = riga['Consumo_Totale'] / riga['Coefficiente']
+    ordine = calcola_ordine(dati.compatti.vista_mese('Agosto', solo_positivi=True), StoricoPrezzi(dati.consumi),
+                            colazioni, 0, mese_prezzi=NUMERI_MESI['Agosto'])
+    costo = ordine.loc[ordine['Articolo'] == articolo, 'Costo Teorico Consumo'].iloc[0]
+
+    assert np.isclose(costo, riga['Costo_Totale_Prodotto'], rtol=1e-3)
+    con_prezzo = ordine['Costo Teorico Consumo'].notna()
+    assert np.allclose(ordine.loc[con_prezzo, 'Costo Teorico Consumo'],
+                       ordine.loc[con_prezzo, 'Consumo Previsto'] * ordine.loc[con_prezzo, 'Costo Unitario'])
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dati_comuni import DatiCondivisi
+from pianificazione import descrivi_calendari, pianifica_consegne
+from previsioni import calcola_consumo_giornaliero
+
+CARTELLA_ESEMPIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example_data')
+
+
+def prodotti_agosto(dati):
+    """Vista con indice = id articolo degli articoli consumati in agosto"""
+    coefficienti = dati.coefficienti_mese('Agosto')
+    ids = np.flatnonzero(coefficienti > 0)
+    return dati.articoli.loc[ids, ['Categoria', 'Articolo']].assign(UDM='lt', Coefficiente=coefficienti[ids])
+
+
+def test_consegne_secondo_previsione_giornaliera():
+    """Le finestre seguono il consumo previsto ma i totali restano quelli della ripartizione uniforme"""
+    dati = DatiCondivisi(CARTELLA_ESEMPIO).compatti
+    consumo_giornaliero = calcola_consumo_giornaliero(dati)
+    prodotti = prodotti_agosto(dati)
+    giorni = pd.date_range('2026-07-25', '2026-08-10')
+
+    uniforme = pianifica_consegne(prodotti, giorni, 100)
+    prevista = pianifica_consegne(prodotti, giorni, 100, consumo_giornaliero=consumo_giornaliero)
+
+    totali_uniformi = uniforme.groupby('Articolo')['Quantità'].sum()
+    totali_previsti = prevista.groupby('Articolo')['Quantità'].sum()
+    assert np.allclose(totali_previsti, totali_uniformi, atol=0.01 * len(giorni))
+    assert not np.allclose(prevista['Colazioni Coperte'], uniforme['Colazioni Coperte'])
+
+    # Fuori stagione la previsione non copre il periodo: resta la ripartizione uniforme
+    inverno = pd.date_range('2026-12-01', '2026-12-10')
+    pd.testing.assert_frame_equal(
+        pianifica_consegne(prodotti, inverno, 100, consumo_giornaliero=consumo_giornaliero),
+        pianifica_consegne(prodotti, inverno, 100)
+    )
+
+
+def test_conservazione_nullable():
+    """Le categorie non deperibili hanno conservazione NA, non una stringa"""
+    tabella = descrivi_calendari(['Pane', 'Cereali'])
+    assert str(tabella['Conservazione (giorni)'].dtype) == 'Int64'
+    assert tabella['Conservazione (giorni)'].iloc[0] == 2
+    assert tabella['Conservazione (giorni)'].isna().iloc[1]
+
+
+def test_periodo_in_parte_fuori_stagione():
+    """Le finestre senza previsione restano uniformi e quelle coperte non ricevono le loro quantità"""
+    dati = DatiCondivisi(CARTELLA_ESEMPIO).compatti
+    consumo_giornaliero = calcola_consumo_giornaliero(dati)
+    prodotti = prodotti_agosto(dati)
+    fine_stagione = consumo_giornaliero.date_stagione(pd.DatetimeIndex([dati.colazioni['data'].max()]))[0]
+    giorni = pd.date_range(fine_stagione - pd.Timedelta(days=6), fine_stagione + pd.Timedelta(days=14))
+
+    uniforme = pianifica_consegne(prodotti, giorni, 100)
+    prevista = pianifica_consegne(prodotti, giorni, 100, consumo_giornaliero=consumo_giornaliero)
+
+    fuori_stagione = (prevista['Data Consegna'] > fine_stagione).to_numpy()
+    assert fuori_stagione.any() and not fuori_stagione.all()
+    assert np.allclose(prevista['Quantità'][fuori_stagione], uniforme['Quantità'][fuori_stagione])
+    assert np.allclose(prevista['Colazioni Coperte'][fuori_stagione], uniforme['Colazioni Coperte'][fuori_stagione])
+    assert np.allclose(prevista.groupby('Articolo')['Quantità'].sum(), uniforme.groupby('Articolo')['Quantità'].sum(),
+                       atol=0.01 * len(giorni))
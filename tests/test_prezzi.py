@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dati_comuni import DatiCondivisi
+from prezzi import StoricoPrezzi
+
+CARTELLA_ESEMPIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example_data')
+
+
+def consumi_prova():
+    righe = [
+        ('P1', 'PANE BIANCO 1 KG', 2.0, '05_Maggio'),
+        ('P1', 'PANE BIANCO 1 KG', 2.5, '07_Luglio'),
+        ('A1', 'ACETO DI VINO BIANCO', 1.0, '06_Giugno'),
+        ('L1', 'LATTE INTERO 1 LT', 1.2, '06_Giugno'),
+        ('L2', 'LATTE INTERO 500 ML', 0.7, '06_Giugno'),
+    ]
+    df = pd.DataFrame(righe, columns=['Codice', 'Descrizione', 'Euro Medio', 'Mese'])
+    return df.assign(**{'U.M.A.': 'PZ', 'U.M.C.': 'PZ', 'Coeff Conv': 1, 'Classe': 'ALIMENTARI'})
+
+
+def test_prezzo_valido_nel_mese():
+    """Ultimo prezzo fino al mese indicato; prima del primo prezzo vale il primo registrato"""
+    storico = StoricoPrezzi(consumi_prova())
+    pane = pd.Series(['PANE BIANCO 1 KG'])
+    assert storico.prezzi(pane, 4)[['Costo Unitario', 'Mese Prezzo']].iloc[0].tolist() == [2.0, 5]
+    assert storico.prezzi(pane, 5)['Costo Unitario'].iloc[0] == 2.0
+    assert storico.prezzi(pane, 6)['Costo Unitario'].iloc[0] == 2.0
+    assert storico.prezzi(pane, 7)['Costo Unitario'].iloc[0] == 2.5
+    assert storico.prezzi(pane)['Costo Unitario'].iloc[0] == 2.5
+
+
+def test_nome_senza_formato_solo_se_univoco():
+    """Il nome senza formato finale abbina un articolo solo se identifica una sola descrizione"""
+    storico = StoricoPrezzi(consumi_prova())
+    prezzi = storico.prezzi(pd.Series(['ACETO DI VINO BIANCO 1 LT', 'LATTE INTERO 2 LT', 'pane  bianco 1 kg']), 6)
+    assert prezzi['Codice'].iloc[0] == 'A1'
+    assert prezzi[['Codice', 'Costo Unitario']].iloc[1].isna().all()
+    assert prezzi['Codice'].iloc[2] == 'P1'
+
+
+def test_come_merge_asof():
+    """Stesso risultato di un merge_asof all'indietro con riserva sul primo prezzo successivo"""
+    storico = StoricoPrezzi(DatiCondivisi(CARTELLA_ESEMPIO).consumi)
+    osservazioni = pd.DataFrame({'prodotto': storico.prodotti, 'mese': storico.mesi,
+                                 'Costo Unitario': storico.valori['Costo Unitario']})
+    richieste = pd.DataFrame(
+        [(prodotto, mese) for prodotto in range(len(storico)) for mese in range(1, 13)], columns=['prodotto', 'mese']
+    ).sort_values('mese', kind='stable')
+
+    indietro = pd.merge_asof(richieste, osservazioni.sort_values('mese'), on='mese', by='prodotto')
+    primo = osservazioni.groupby('prodotto')['Costo Unitario'].first()
+    attesi = indietro['Costo Unitario'].fillna(indietro['prodotto'].map(primo)).to_numpy()
+
+    posizioni = storico.posizioni(indietro['prodotto'].to_numpy(), indietro['mese'].to_numpy())
+    assert np.allclose(storico.valori['Costo Unitario'][posizioni], attesi)
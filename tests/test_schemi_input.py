@@ -0,0 +1,24 @@
+import io
+
+from schemi_input import SCHEMI, Colonna, Schema, leggi_csv
+
+
+def test_colazioni_con_giorni_non_compilati():
+    """I conteggi delle colazioni sono Int64: un valore mancante diventa pd.NA invece di un errore"""
+    colonne = [colonna.nome for colonna in SCHEMI['colazioni'].colonne]
+    righe = [
+        ','.join(colonne),
+        '15/04/2024 11.29.41,' + ','.join(['10'] * (len(colonne) - 1)),
+        '16/04/2024 11.29.41,,' + ','.join(['10'] * (len(colonne) - 2)),
+    ]
+    df = leggi_csv(io.BytesIO('\n'.join(righe).encode('utf-8')), SCHEMI['colazioni'])
+    assert str(df['BREAKFAST PREVISTI (HOTEL)'].dtype) == 'Int64'
+    assert df['BREAKFAST PREVISTI (HOTEL)'].isna().tolist() == [False, True]
+
+
+def test_intestazione_dopo_le_righe_da_saltare():
+    """Le intestazioni sono cercate dopo le righe iniziali da saltare"""
+    schema = Schema('prova', [Colonna('Articolo'), Colonna('Quantità', 'float64')], righe_da_saltare=2)
+    contenuto = 'Report consumi\nStagione 2024\nArticolo,Quantità\nPANE,1.5\n'
+    df = leggi_csv(io.BytesIO(contenuto.encode('utf-8')), schema)
+    assert df['Quantità'].tolist() == [1.5]
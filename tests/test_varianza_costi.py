@@ -0,0 +1,23 @@
+import os
+
+import numpy as np
+
+from calcolo_costi_prodotti import calcola_costi_prodotti
+from dati_comuni import DatiCondivisi
+from varianza_costi import scomponi_variazioni, totali_variazioni
+
+CARTELLA_ESEMPIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example_data')
+
+
+def test_costo_teorico_come_calcolo_costi_prodotti():
+    """Il costo teorico del mese è la somma di coefficiente × colazioni × prezzo degli articoli abbinati"""
+    dati = DatiCondivisi(CARTELLA_ESEMPIO)
+    variazioni = scomponi_variazioni(dati.consumi, dati.colazioni, dati.compatti)
+    totali = totali_variazioni(variazioni).set_index('Mese')
+    costi = calcola_costi_prodotti(dati.colazioni, dati.fogli_mensili, dati.consumi)
+    attesi = costi.groupby('Mese')['Costo_Totale_Prodotto'].sum().astype(float)
+
+    assert np.allclose(totali['Costo Teorico'], attesi.reindex(totali.index))
+    # I prodotti senza articolo nei fogli non hanno costo teorico né scostamento
+    senza_teorico = variazioni['Costo Teorico'].isna()
+    assert senza_teorico.any() and variazioni.loc[senza_teorico, 'Scostamento da Teorico'].isna().all()
@@ -0,0 +1,169 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dati_comuni import NOMI_MESI, chiave_articolo, numero_mese, presenze_mensili
+from prezzi import StoricoPrezzi
+
+FILE_OUTPUT = 'analisi_varianza_costi.csv'
+
+# Effetti in cui si scompone la variazione di costo tra due mesi
+EFFETTI = ['Effetto Volume', 'Effetto Mix', 'Effetto Prezzo', 'Residuo']
+
+# Confronto del costo reale del mese con quello previsto dai coefficienti dei fogli mensili
+COLONNE_TEORICHE = ['Costo Teorico', 'Scostamento da Teorico']
+
+
+def matrici_consumi(df_consumi):
+    """Quantità, Euro Medio e costi dei consumi come matrici prodotti × mesi.
+
+    Un prodotto è una coppia Codice-Descrizione; le righe ripetute nello
+    stesso mese sommano quantità e costi, il prezzo è quello dell'ultima riga.
+    I mesi sono ordinati per numero.
+    """
+    prodotti = df_consumi.groupby(['Codice', 'Descrizione'], sort=False, dropna=False).ngroup().to_numpy()
+    elenco = (
+        df_consumi[['Codice', 'Descrizione', 'Categoria', 'Classe']].astype(object)
+        .drop_duplicates(['Codice', 'Descrizione']).reset_index(drop=True)
+    )
+    numeri = numero_mese(df_consumi['Mese'].astype(str)).to_numpy()
+    mesi, colonne = np.unique(numeri, return_inverse=True)
+
+    forma = (len(elenco), len(mesi))
+    quantita = np.zeros(forma)
+    costi = np.zeros(forma)
+    prezzi = np.full(forma, np.nan)
+    np.add.at(quantita, (prodotti, colonne), df_consumi['Quantita'].to_numpy(dtype=float))
+    np.add.at(costi, (prodotti, colonne), df_consumi['Costo Totale'].to_numpy(dtype=float))
+    prezzi[prodotti, colonne] = df_consumi['Euro Medio'].to_numpy(dtype=float)
+    return elenco, mesi, quantita, prezzi, costi
+
+
+def costi_teorici(dati, storico_prezzi, elenco, mesi, colazioni):
+    """Costo teorico di ogni prodotto dei consumi per mese (matrice prodotti × mesi).
+
+    È il costo previsto dai fogli mensili, come in calcolo_costi_prodotti:
+    coefficiente × colazioni del mese × prezzo del mese. Gli articoli dei
+    fogli sono abbinati ai prodotti dei consumi sulla chiave della
+    descrizione (vedi prezzi.StoricoPrezzi); i prodotti senza articolo
+    corrispondente restano NaN.
+    """
+    # Riga dell'elenco di ogni prodotto dello storico (la prima con quella descrizione)
+    prodotti_elenco = chiave_articolo(elenco['Descrizione']).map(storico_prezzi.indice_chiavi).fillna(-1)
+    prodotti_elenco = prodotti_elenco.to_numpy(dtype=np.int64)
+    prime = np.flatnonzero((prodotti_elenco >= 0) & ~pd.Series(prodotti_elenco).duplicated().to_numpy())
+    riga_prodotto = np.full(len(storico_prezzi), -1)
+    riga_prodotto[prodotti_elenco[prime]] = prime
+
+    articoli = dati.articoli['Articolo']
+    prodotti_articoli = storico_prezzi.abbina(articoli)
+    righe = np.where(prodotti_articoli >= 0, riga_prodotto[prodotti_articoli.clip(0)], -1)
+    abbinati = np.flatnonzero(righe >= 0)
+
+    teorici = np.full((len(elenco), len(mesi)), np.nan)
+    teorici[np.unique(righe[abbinati])] = 0.0
+    for colonna, mese in enumerate(mesi):
+        nome = NOMI_MESI.get(mese)
+        if nome not in dati:
+            continue
+        prezzi = storico_prezzi.prezzi(articoli, mese)['Costo Unitario'].to_numpy(dtype=float)
+        costi = np.nan_to_num(dati.coefficienti_mese(nome) * colazioni[colonna] * prezzi)
+        np.add.at(teorici[:, colonna], righe[abbinati], costi[abbinati])
+    return teorici
+
+
+def scomponi_variazioni(df_consumi, df_colazioni, dati=None, storico_prezzi=None):
+    """Scompone la variazione di costo di ogni prodotto tra mesi consecutivi.
+
+    Con B le colazioni del mese, k = quantità / B il consumo per colazione e
+    P l'Euro Medio, il costo è B·k·P e la variazione dal mese 0 al mese 1 è:
+        volume = (B1 - B0)·k0·P0
+        mix    = B1·(k1 - k0)·P0
+        prezzo = B1·k1·(P1 - P0)
+    La somma dei tre effetti è B1·k1·P1 - B0·k0·P0; il residuo è la parte
+    della variazione di Costo Totale dovuta agli arrotondamenti dell'export.
+    Sono confrontati solo i mesi con colazioni registrate, tutti i prodotti
+    in un'unica operazione sulle matrici prodotti × mesi.
+
+    Con i dati dei fogli mensili (DatiCompatti) si aggiungono il costo teorico
+    del mese (vedi costi_teorici) e lo scostamento del costo reale da esso.
+    """
+    elenco, mesi, quantita, prezzi, costi = matrici_consumi(df_consumi)
+    colazioni = presenze_mensili(df_colazioni)['sum'].reindex(mesi, fill_value=0).to_numpy(dtype=float)
+    validi = np.flatnonzero(colazioni > 0)
+    if len(validi) < 2:
+        return pd.DataFrame(columns=['Mese', 'Mese Precedente', 'Codice', 'Descrizione', 'Categoria', 'Classe',
+                                     'Costo Precedente', 'Costo', 'Variazione'] + EFFETTI
+                            + (COLONNE_TEORICHE if dati is not None else []))
+
+    # Coppie di mesi consecutivi tra quelli con colazioni: colonne 0 e 1 di ogni confronto
+    prima, dopo = validi[:-1], validi[1:]
+    b0, b1 = colazioni[prima], colazioni[dopo]
+    k0, k1 = quantita[:, prima] / b0, quantita[:, dopo] / b1
+    # Un prodotto assente in uno dei due mesi prende il prezzo dell'altro: nessun effetto prezzo
+    p0, p1 = prezzi[:, prima], prezzi[:, dopo]
+    p0, p1 = np.where(np.isnan(p0), p1, p0), np.where(np.isnan(p1), p0, p1)
+    p0, p1 = np.nan_to_num(p0), np.nan_to_num(p1)
+
+    effetto_volume = (b1 - b0) * k0 * p0
+    effetto_mix = b1 * (k1 - k0) * p0
+    effetto_prezzo = b1 * k1 * (p1 - p0)
+    costo0, costo1 = costi[:, prima], costi[:, dopo]
+    variazione = costo1 - costo0
+    residuo = variazione - effetto_volume - effetto_mix - effetto_prezzo
+
+    # Formato lungo: una riga per prodotto e confronto, solo prodotti con costi in uno dei due mesi
+    righe, confronti = np.nonzero((costo0 != 0) | (costo1 != 0))
+    nomi_mesi = np.array([NOMI_MESI.get(m, str(m)) for m in mesi], dtype=object)
+    risultato = pd.DataFrame({
+        'Mese': nomi_mesi[dopo][confronti],
+        'Mese Precedente': nomi_mesi[prima][confronti],
+        'Codice': elenco['Codice'].to_numpy()[righe],
+        'Descrizione': elenco['Descrizione'].to_numpy()[righe],
+        'Categoria': elenco['Categoria'].to_numpy()[righe],
+        'Classe': elenco['Classe'].to_numpy()[righe],
+        'Costo Precedente': costo0[righe, confronti],
+        'Costo': costo1[righe, confronti],
+        'Variazione': variazione[righe, confronti],
+        'Effetto Volume': effetto_volume[righe, confronti],
+        'Effetto Mix': effetto_mix[righe, confronti],
+        'Effetto Prezzo': effetto_prezzo[righe, confronti],
+        'Residuo': residuo[righe, confronti],
+    })
+    if dati is not None:
+        storico_prezzi = StoricoPrezzi(df_consumi) if storico_prezzi is None else storico_prezzi
+        teorici = costi_teorici(dati, storico_prezzi, elenco, mesi, colazioni)[:, dopo][righe, confronti]
+        risultato['Costo Teorico'] = teorici
+        risultato['Scostamento da Teorico'] = risultato['Costo'] - teorici
+    # Ordine per confronto (mese) e poi per prodotto
+    return risultato.iloc[np.lexsort((righe, confronti))].reset_index(drop=True)
+
+
+def totali_variazioni(df_variazioni, chiave=None):
+    """Somma costi ed effetti per confronto di mesi e, se indicata, per chiave (es. Categoria)"""
+    gruppi = ['Mese', 'Mese Precedente'] + ([chiave] if chiave else [])
+    colonne = ['Costo Precedente', 'Costo', 'Variazione'] + EFFETTI
+    colonne += [colonna for colonna in COLONNE_TEORICHE if colonna in df_variazioni.columns]
+    return df_variazioni.groupby(gruppi, sort=False, dropna=False)[colonne].sum().reset_index()
+
+
+def genera_report(dati, cartella_output='.'):
+    """Report 'varianza': effetti volume, mix e prezzo tra mesi consecutivi e scostamento dal costo teorico"""
+    df_variazioni = scomponi_variazioni(dati.consumi, dati.colazioni, dati.compatti)
+    df_variazioni.to_csv(os.path.join(cartella_output, FILE_OUTPUT), index=False)
+
+    with pd.option_context('display.float_format', lambda x: '{:.2f}'.format(x)):
+        print("\nScomposizione della variazione dei costi tra mesi consecutivi:")
+        print(totali_variazioni(df_variazioni).to_string(index=False))
+    print(f"\nFile {FILE_OUTPUT} creato con successo!")
+    return df_variazioni
+
+
+def main(argv=None):
+    from colazioni_cli import esegui_report_singolo
+    esegui_report_singolo('varianza', argv)
+
+
+if __name__ == '__main__':
+    main()